@@ -4,7 +4,6 @@
 import os
 import shutil
 import threading
-import queue
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from pathlib import Path
@@ -13,6 +12,13 @@ import math
 import sys
 import hashlib
 import json
+from collections import OrderedDict
+import queue
+from deduplicacao import deduplicar_linhas
+from duplicados import ACOES_DUPLICADOS, encontrar_duplicados, resumo_duplicados, aplicar_acao_duplicados
+from organizador import planejar_organizacao, resumo_plano, executar_plano, ultimo_log, desfazer_organizacao, organizar_continuamente
+from paralelo import WORKERS_PADRAO, encerrar_pool, mapear_em_ordem
+from hashes import ALGORITMOS, WORKERS_HASH, IndiceHashes, hash_diretorio, gravar_manifesto, verificar_manifesto, resumo_verificacao
 
 # --- 2. IMPORTAÇÕES DE BIBLIOTECAS EXTERNAS ---
 try:
@@ -20,6 +26,10 @@ try:
     from PIL import Image, ImageTk
     import fitz  # PyMuPDF
     import qrcode
+    from divisor import gravar_partes, dividir_csv_bruto, dividir_xlsx_streaming
+    from juncao import juntar_fora_da_memoria, codificar_chaves, juntar_por_codigos, analisar_chaves, bytes_por_linha, excede_limites, resumo_analise, TIPOS_JUNCAO, ACOES_EXCESSO, LIMITE_LINHAS_JUNCAO
+    from pdfs import rasterizar_pdf, CachePaginas, FORMATOS_IMAGEM
+    from planilhas import CacheParquet, EscritorEmBlocos, gravar_tabela, ler_cabecalho, ler_colunas, otimizar_tipos, resumo_memoria, FORMATOS_SAIDA, extensao_saida, formato_por_caminho
     LIBS_INSTALADAS = True
 except ImportError:
     LIBS_INSTALADAS = False
@@ -30,6 +40,11 @@ FONT_LABEL = ("Segoe UI", 11)
 FONT_TITLE = ("Segoe UI", 14, "bold")
 FONT_BUTTON = ("Segoe UI", 10, "bold")
 CONFIG_FILE = Path.home() / ".toolbox_config.json"
+INTERVALO_PROGRESSO_MS = 100  # A interface lê o progresso das tarefas 10 vezes por segundo
+MAX_TAREFAS_SIMULTANEAS = 2   # Tarefas pesadas executadas ao mesmo tempo; as demais esperam na fila
+HISTORICO_TAREFAS = 50        # Tarefas finalizadas mantidas na janela "Tarefas"
+GRUPOS_NO_RELATORIO = 500     # Grupos de arquivos duplicados listados na tela (o resumo conta todos)
+OPCOES_COMPRESSAO = ["padrão", "nenhuma", "gzip", "bz2", "xz", "snappy", "zstd", "lz4"]
 LAST_PATHS = {}
 
 # --- Paletas de Cores para os Temas ---
@@ -80,49 +95,257 @@ def ask_save_as_with_memory(key, **options):
     if filepath: _save_last_path(key, filepath)
     return filepath
 
+def resolver_compressao(opcao, padrao):
+    """Traduz a opção de compressão da interface ('padrão', 'nenhuma' ou o nome do codec)."""
+    return padrao if opcao == "padrão" else None if opcao == "nenhuma" else opcao
+
 # ############################################################################
 # --- ARQUITETURA DE OTIMIZAÇÃO E COMPONENTES AUXILIARES ---
 # ############################################################################
 
-class TaskRunner:
-    """Gerencia a execução de uma função pesada em uma thread separada."""
-    def __init__(self, tab_frame):
-        self.tab_frame = tab_frame
-        self.task_queue = queue.Queue()
-
-    def run_task(self, task_func, on_done, *args, progress_bar=None, status_label=None):
-        self.progress_bar = progress_bar
-        self.status_label = status_label
-        self.on_done = on_done
-        thread = threading.Thread(target=self._task_wrapper, args=(task_func, args), daemon=True)
-        thread.start()
-        self.tab_frame.after(100, self.monitor_queue)
-
-    def _task_wrapper(self, task_func, args):
+class TarefaCancelada(Exception):
+    """Levantada dentro da tarefa quando o usuário pede o cancelamento."""
+
+class CanalProgresso:
+    """Canal entre a tarefa e a interface que guarda só o estado mais recente do progresso.
+
+    Oferece o mesmo q.put das filas usadas pelas tarefas, mas as mensagens de progresso são
+    mescladas num único estado, então a memória não cresce e a interface nunca fica atrasada.
+    Também serve de token de cancelamento: depois de cancelar(), o próximo q.put da tarefa
+    levanta TarefaCancelada, então toda tarefa que informa progresso pode ser interrompida.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estado = {}
+        self._mudou = False
+        self._final = None
+        self._cancelado = threading.Event()
+
+    def put(self, msg):
+        if msg['type'] == 'progress': self.verificar_cancelamento()
+        with self._lock:
+            if msg['type'] == 'progress':
+                self._estado.update((k, v) for k, v in msg.items() if k != 'type')
+                self._mudou = True
+            else:
+                self._final = msg  # 'done', 'error' ou 'cancelled'
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def verificar_cancelamento(self):
+        """Levanta TarefaCancelada se o cancelamento foi pedido (para laços que não informam progresso)."""
+        if self._cancelado.is_set(): raise TarefaCancelada()
+
+    def ler(self):
+        """Retorna (estado do progresso, se mudou desde a última leitura; mensagem final, se houver)."""
+        with self._lock:
+            estado = dict(self._estado) if self._mudou else None
+            self._mudou = False
+            return estado, self._final
+
+def _formatar_quantidade(n):
+    for sufixo in ("", "k", "M", "G", "T"):
+        if n < 1000: return f"{n:.0f}{sufixo}" if not sufixo else f"{n:.1f}{sufixo}"
+        n /= 1000
+    return f"{n:.1f}P"
+
+def _formatar_tempo(segundos):
+    segundos = int(segundos)
+    if segundos >= 3600: return f"{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+    if segundos >= 60: return f"{segundos // 60}m{segundos % 60:02d}s"
+    return f"{segundos}s"
+
+class GerenciadorTarefas:
+    """Executor central de todas as abas: limite global de tarefas simultâneas, fila visível e cancelamento.
+
+    As tarefas rodam em um pool próprio de threads daemon (o trabalho de CPU pesado delas vai para o
+    pool de processos compartilhado de paralelo.py); o que passar do limite espera na fila. Como as
+    threads são daemon, uma tarefa travada não impede o programa de fechar.
+    """
+    def __init__(self, max_simultaneas=MAX_TAREFAS_SIMULTANEAS):
+        self.max_simultaneas = max_simultaneas
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._tarefas = OrderedDict()  # id -> {'nome', 'estado', 'canal'}
+        self._proximo_id = 1
+        self._encerrado = False
+        for i in range(max_simultaneas):
+            threading.Thread(target=self._trabalhar, name=f"tarefa_{i}", daemon=True).start()
+
+    def enviar(self, nome, task_func, canal, *args, dedicada=False):
+        """Coloca a tarefa na fila e retorna o id dela; o resultado chega pelo canal ('done', 'error' ou 'cancelled').
+
+        Com dedicada=True a tarefa ganha uma thread daemon só para ela e começa na hora, fora do limite de
+        simultâneas: é para tarefas que ficam abertas até serem canceladas (como a observação de pastas).
+        """
+        with self._lock:
+            if self._encerrado: raise RuntimeError("O programa está sendo fechado.")
+            id_tarefa = self._proximo_id; self._proximo_id += 1
+            self._tarefas[id_tarefa] = {'nome': nome, 'estado': "Na fila", 'canal': canal}
+            self._podar_historico()
+        if dedicada: threading.Thread(target=self._executar, args=(id_tarefa, task_func, canal, args), name=f"tarefa_dedicada_{id_tarefa}", daemon=True).start()
+        else: self._fila.put((id_tarefa, task_func, canal, args))
+        return id_tarefa
+
+    def _trabalhar(self):
+        while True:
+            item = self._fila.get()
+            if item is None: return  # Sinal de encerramento
+            self._executar(*item)
+
+    def _executar(self, id_tarefa, task_func, canal, args):
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None or tarefa['estado'] != "Na fila": return  # Cancelada enquanto esperava
+            tarefa['estado'] = "Executando"
+        if canal.cancelado: return self._finalizar(id_tarefa, "Cancelada", {'type': 'cancelled'})
         try:
-            result = task_func(self.task_queue, *args)
-            self.task_queue.put({'type': 'done', 'result': result})
+            result = task_func(canal, *args)
+            self._finalizar(id_tarefa, "Concluída", {'type': 'done', 'result': result})
+        except TarefaCancelada:
+            self._finalizar(id_tarefa, "Cancelada", {'type': 'cancelled'})
         except Exception as e:
-            self.task_queue.put({'type': 'error', 'message': str(e)})
+            self._finalizar(id_tarefa, "Cancelada" if canal.cancelado else "Erro", {'type': 'cancelled'} if canal.cancelado else {'type': 'error', 'message': str(e)})
+
+    def _definir_estado(self, id_tarefa, estado):
+        with self._lock:
+            if id_tarefa in self._tarefas: self._tarefas[id_tarefa]['estado'] = estado
+
+    def _finalizar(self, id_tarefa, estado, msg):
+        self._definir_estado(id_tarefa, estado)
+        with self._lock: canal = self._tarefas[id_tarefa]['canal'] if id_tarefa in self._tarefas else None
+        if canal is not None: canal.put(msg)
+
+    def _podar_historico(self):
+        finalizadas = [i for i, t in self._tarefas.items() if t['estado'] in ("Concluída", "Cancelada", "Erro")]
+        for i in finalizadas[:max(0, len(finalizadas) - HISTORICO_TAREFAS)]: del self._tarefas[i]
+
+    def cancelar(self, id_tarefa):
+        """Pede o cancelamento: tarefas na fila nem começam; as em execução param no próximo q.put."""
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None or tarefa['estado'] not in ("Na fila", "Executando"): return
+            tarefa['canal'].cancelar()
+            na_fila = tarefa['estado'] == "Na fila"
+            tarefa['estado'] = "Cancelada" if na_fila else "Cancelando"
+        if na_fila: tarefa['canal'].put({'type': 'cancelled'})  # Ainda não tinha começado
+
+    def cancelar_todas(self):
+        for id_tarefa in [i for i, _, _ in self.listar()]: self.cancelar(id_tarefa)
+
+    def listar(self):
+        """Lista (id, nome, estado) de todas as tarefas conhecidas, das mais antigas para as mais novas."""
+        with self._lock:
+            return [(i, t['nome'], t['estado']) for i, t in self._tarefas.items()]
+
+    def ativas(self):
+        return sum(1 for _, _, estado in self.listar() if estado in ("Na fila", "Executando", "Cancelando"))
+
+    def resumo(self):
+        """Texto curto para a barra de status."""
+        estados = [estado for _, _, estado in self.listar()]
+        executando, na_fila = estados.count("Executando") + estados.count("Cancelando"), estados.count("Na fila")
+        if not executando and not na_fila: return "Nenhuma tarefa em andamento."
+        return f"{executando} em execução • {na_fila} na fila (máx. {self.max_simultaneas} simultâneas)"
+
+    def encerrar(self):
+        """Cancela tudo e libera os pools sem esperar as tarefas terminarem (usado ao fechar a janela)."""
+        with self._lock: self._encerrado = True
+        self.cancelar_todas()
+        for _ in range(self.max_simultaneas): self._fila.put(None)
+        encerrar_pool()
+
+GERENCIADOR_TAREFAS = GerenciadorTarefas()
 
-    def monitor_queue(self):
-        try:
-            msg = self.task_queue.get(block=False)
-            if msg['type'] == 'progress':
-                if self.progress_bar:
-                    if 'max' in msg: self.progress_bar['maximum'] = msg['max']
-                    self.progress_bar['value'] = msg.get('value', 0)
-                if self.status_label and 'text' in msg: self.status_label.config(text=msg['text'])
-            elif msg['type'] == 'done':
-                self.on_done(True, msg.get('result'))
-                return
-            elif msg['type'] == 'error':
-                messagebox.showerror("Erro na Tarefa", msg['message'], parent=self.tab_frame)
-                self.on_done(False, None)
-                return
-        except queue.Empty:
-            pass
-        self.tab_frame.after(100, self.monitor_queue)
+class TaskRunner:
+    """Envia funções pesadas ao gerenciador central e acompanha o progresso delas na aba."""
+    def __init__(self, tab_frame):
+        self.tab_frame = tab_frame
+        self.canal = CanalProgresso()
+        self.id_tarefa = None
+
+    def _nome_tarefa(self, task_func):
+        try: aba = self.tab_frame.master.tab(self.tab_frame, 'text')
+        except (tk.TclError, AttributeError): aba = ""
+        return f"{aba} ({task_func.__name__})" if aba else task_func.__name__
+
+    def run_task(self, task_func, on_done, *args, progress_bar=None, status_label=None, dedicada=False):
+        self.canal = canal = CanalProgresso()
+        tarefa = {'canal': canal, 'on_done': on_done, 'progress_bar': progress_bar, 'status_label': status_label,
+                  'medicao': None}  # medicao: (instante, valor, máximo) do início da fase atual, para taxa e ETA
+        self.id_tarefa = GERENCIADOR_TAREFAS.enviar(self._nome_tarefa(task_func), task_func, canal, *args, dedicada=dedicada)
+        if status_label: status_label.config(text="Na fila...")
+        self.tab_frame.after(INTERVALO_PROGRESSO_MS, self.monitor_queue, tarefa)
+
+    def cancelar(self):
+        """Cancela a última tarefa enviada por esta aba."""
+        if self.id_tarefa is not None: GERENCIADOR_TAREFAS.cancelar(self.id_tarefa)
+
+    def _velocidade(self, tarefa, estado):
+        """Texto com taxa e tempo restante, medidos desde o início da fase (ou '' se ainda não dá para estimar)."""
+        valor, maximo, agora = estado.get('value', 0), estado.get('max'), time.monotonic()
+        medicao = tarefa['medicao']
+        if medicao is None or maximo != medicao[2] or valor < medicao[1]:
+            tarefa['medicao'] = (agora, valor, maximo)  # Nova fase: máximo mudou ou o valor recomeçou
+            return ""
+        decorrido = agora - medicao[0]
+        taxa = (valor - medicao[1]) / decorrido if decorrido > 0 else 0
+        if decorrido < 1 or taxa <= 0: return ""
+        texto = f"{_formatar_quantidade(taxa)}/s"
+        if maximo and valor < maximo: texto += f" • ~{_formatar_tempo((maximo - valor) / taxa)} restantes"
+        return texto
+
+    def monitor_queue(self, tarefa):
+        # Amostra o estado mais recente a uma taxa fixa, não importa quantas mensagens a tarefa enviou
+        estado, final = tarefa['canal'].ler()
+        progress_bar, status_label = tarefa['progress_bar'], tarefa['status_label']
+        if estado:
+            if progress_bar:
+                if 'max' in estado: progress_bar['maximum'] = estado['max']
+                progress_bar['value'] = estado.get('value', 0)
+            if status_label and 'text' in estado:
+                velocidade = self._velocidade(tarefa, estado) if final is None else ""
+                status_label.config(text=f"{estado['text']}  •  {velocidade}" if velocidade else estado['text'])
+        if final is not None:
+            if final['type'] == 'done':
+                tarefa['on_done'](True, final.get('result'))
+            elif final['type'] == 'cancelled':
+                if status_label: status_label.config(text="Tarefa cancelada.")
+                tarefa['on_done'](False, None)
+            else:
+                messagebox.showerror("Erro na Tarefa", final['message'], parent=self.tab_frame)
+                tarefa['on_done'](False, None)
+            return
+        self.tab_frame.after(INTERVALO_PROGRESSO_MS, self.monitor_queue, tarefa)
+
+def abrir_janela_tarefas(root):
+    """Janela com a fila de tarefas de todas as abas, permitindo cancelar as selecionadas."""
+    janela = tk.Toplevel(root); janela.title("Tarefas"); janela.geometry("560x300"); janela.transient(root)
+    arvore = ttk.Treeview(janela, columns=("tarefa", "estado"), show="headings", selectmode="extended")
+    arvore.heading("tarefa", text="Tarefa"); arvore.heading("estado", text="Estado")
+    arvore.column("tarefa", width=380); arvore.column("estado", width=120)
+    arvore.pack(fill='both', expand=True, padx=PAD_X, pady=PAD_Y)
+    f_botoes = ttk.Frame(janela); f_botoes.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Button(f_botoes, text="Cancelar Selecionadas", command=lambda: [GERENCIADOR_TAREFAS.cancelar(int(i)) for i in arvore.selection()]).pack(side='left')
+    ttk.Button(f_botoes, text="Cancelar Todas", command=GERENCIADOR_TAREFAS.cancelar_todas).pack(side='left', padx=PAD_X)
+    ttk.Button(f_botoes, text="Fechar", command=janela.destroy).pack(side='right')
+
+    def atualizar():
+        if not janela.winfo_exists(): return
+        tarefas = GERENCIADOR_TAREFAS.listar()
+        ids = {str(i) for i, _, _ in tarefas}
+        for item in arvore.get_children():
+            if item not in ids: arvore.delete(item)
+        for i, nome, estado in tarefas:
+            if arvore.exists(str(i)): arvore.set(str(i), "estado", estado)
+            else: arvore.insert("", 'end', iid=str(i), values=(nome, estado))
+        janela.after(500, atualizar)
+    atualizar()
 
 def criar_widgets_progresso(parent_frame):
     """Cria e retorna um frame contendo uma barra de progresso e um label de status."""
@@ -175,10 +398,16 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
     if not LIBS_INSTALADAS:
         ttk.Label(tab_frame, text="Instale 'pandas' e 'openpyxl'.", font=FONT_LABEL, foreground="red").pack(pady=50); return
 
+    task_runner = TaskRunner(tab_frame)
+    try: cache_parquet = CacheParquet()
+    except OSError: cache_parquet = None  # Pasta de cache inacessível: Excel é lido direto
     state = {
         "p1_path": tk.StringVar(), "p2_path": tk.StringVar(), "saida_path": tk.StringVar(),
-        "chave": tk.StringVar(), "df1": None, "df2": None,
+        "chave": tk.StringVar(), "colunas_p1": [], "colunas_p2": [],
         "colunas_selecionadas_df1": set(), "colunas_selecionadas_df2": set(),
+        "tipo_juncao": tk.StringVar(value=list(TIPOS_JUNCAO)[0]), "modo_disco": tk.BooleanVar(value=False), "otimizar": tk.BooleanVar(value=True),
+        "limite_linhas": tk.StringVar(value=str(LIMITE_LINHAS_JUNCAO)), "acao_excesso": tk.StringVar(value=list(ACOES_EXCESSO)[0]),
+        "compressao": tk.StringVar(value=OPCOES_COMPRESSAO[0]),
     }
     main_frame = ttk.Frame(tab_frame)
     selection_frame = ttk.Frame(tab_frame)
@@ -188,7 +417,7 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
         main_frame.pack_forget(); selection_frame.pack_forget()
         frame_to_show.pack(fill="both", expand=True)
 
-    def popular_tela_selecao(df, nome_planilha, state_key):
+    def popular_tela_selecao(colunas, nome_planilha, state_key):
         for widget in selection_frame.winfo_children(): widget.destroy()
         
         ttk.Label(selection_frame, text=f"Selecionar Colunas - {nome_planilha}", font=FONT_TITLE).pack(pady=(PAD_Y, PAD_Y * 2))
@@ -206,7 +435,7 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
         f_selecionadas.rowconfigure(0, weight=1)
         list_selecionadas = tk.Listbox(f_selecionadas, selectmode='extended', exportselection=False); list_selecionadas.pack(fill='both', expand=True, padx=5, pady=5)
 
-        todas_colunas = sorted(list(df.columns))
+        todas_colunas = sorted(colunas, key=str); nomes_originais = {str(col): col for col in colunas}
         colunas_ja_selecionadas = state[state_key]
         for col in todas_colunas:
             if col in colunas_ja_selecionadas: list_selecionadas.insert(tk.END, col)
@@ -216,7 +445,7 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
             termo = search_var.get().lower()
             list_disponiveis.delete(0, tk.END)
             for col in todas_colunas:
-                if termo in col.lower() and col not in list_selecionadas.get(0, tk.END): list_disponiveis.insert(tk.END, col)
+                if termo in str(col).lower() and str(col) not in list_selecionadas.get(0, tk.END): list_disponiveis.insert(tk.END, col)
         search_var.trace_add("write", update_search)
 
         f_botoes = ttk.Frame(dual_list_frame); f_botoes.grid(row=1, column=1, sticky='ns', padx=5)
@@ -256,7 +485,7 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
             list_selecionadas.itemconfig(idx, {'foreground':'gray'})
 
         def on_confirm():
-            state[state_key] = set(list_selecionadas.get(0, tk.END))
+            state[state_key] = {nomes_originais.get(col, col) for col in list_selecionadas.get(0, tk.END)}
             if state_key == "colunas_selecionadas_df1": btn_selecionar_cols1.config(text=f"Alterar Colunas P1 ({len(state[state_key])} sel.)")
             else: btn_selecionar_cols2.config(text=f"Alterar Colunas P2 ({len(state[state_key])} sel.)")
             btn_unir['state'] = 'normal' if state["colunas_selecionadas_df1"] and state["colunas_selecionadas_df2"] else 'disabled'
@@ -265,22 +494,29 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
         ttk.Button(selection_frame, text="Confirmar e Voltar", command=on_confirm, style="Accent.TButton").pack(pady=PAD_Y * 2)
         show_frame(selection_frame)
 
+    def processo_cabecalhos(q, p1, p2, chave):
+        # Lê só os cabeçalhos, dos dois arquivos ao mesmo tempo; os dados são carregados na união, apenas com as colunas escolhidas
+        q.put({'type': 'progress', 'text': "Lendo os cabeçalhos das planilhas..."})
+        colunas_p1, colunas_p2 = mapear_em_ordem(cache_parquet.colunas if cache_parquet else ler_cabecalho, [(p1,), (p2,)], min(2, WORKERS_PADRAO))
+        if chave not in colunas_p1 or chave not in colunas_p2: raise ValueError(f"A chave '{chave}' não existe em ambas as planilhas.")
+        return colunas_p1, colunas_p2
+
+    def on_carregar_done(success, result):
+        btn_carregar.config(state='normal')
+        if not success: return
+        state["colunas_p1"], state["colunas_p2"] = result
+        state["colunas_selecionadas_df1"] = set(state["colunas_p1"])
+        state["colunas_selecionadas_df2"] = set(state["colunas_p2"])
+        btn_selecionar_cols1.config(state='normal', text=f"Selecionar Colunas P1 ({len(state['colunas_p1'])} sel.)")
+        btn_selecionar_cols2.config(state='normal', text=f"Selecionar Colunas P2 ({len(state['colunas_p2'])} sel.)")
+        btn_unir.config(state='normal'); label_progresso.config(text="Planilhas carregadas.")
+        btn_selecionar_cols1.focus_set()
+
     def carregar_planilhas():
-        try:
-            p1, p2, chave = state["p1_path"].get(), state["p2_path"].get(), state["chave"].get()
-            if not all([p1, p2, chave]): raise ValueError("Preencha todos os campos.")
-            state["df1"] = pd.read_excel(p1) if p1.endswith(('.xlsx', '.xls')) else pd.read_csv(p1)
-            state["df2"] = pd.read_excel(p2) if p2.endswith(('.xlsx', '.xls')) else pd.read_csv(p2)
-            if chave not in state["df1"].columns or chave not in state["df2"].columns: raise ValueError(f"A chave '{chave}' não existe em ambas as planilhas.")
-            
-            state["colunas_selecionadas_df1"] = set(state["df1"].columns)
-            state["colunas_selecionadas_df2"] = set(state["df2"].columns)
-            btn_selecionar_cols1.config(state='normal', text=f"Selecionar Colunas P1 ({len(state['df1'].columns)} sel.)")
-            btn_selecionar_cols2.config(state='normal', text=f"Selecionar Colunas P2 ({len(state['df2'].columns)} sel.)")
-            btn_unir.config(state='normal')
-            messagebox.showinfo("Pronto", "Planilhas carregadas.", parent=tab_frame)
-            btn_selecionar_cols1.focus_set()
-        except Exception as e: messagebox.showerror("Erro ao Carregar", str(e), parent=tab_frame)
+        p1, p2, chave = state["p1_path"].get(), state["p2_path"].get(), state["chave"].get()
+        if not all([p1, p2, chave]): messagebox.showerror("Erro ao Carregar", "Preencha todos os campos.", parent=tab_frame); return
+        btn_carregar.config(state='disabled'); btn_unir.config(state='disabled')
+        task_runner.run_task(processo_cabecalhos, on_carregar_done, p1, p2, chave, progress_bar=progresso, status_label=label_progresso)
 
     def executar_uniao_final(q):
         saida, chave = state["saida_path"].get(), state["chave"].get()
@@ -288,13 +524,38 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
         if not state["colunas_selecionadas_df1"] or not state["colunas_selecionadas_df2"]: raise ValueError("Selecione as colunas.")
         if chave not in state["colunas_selecionadas_df1"] or chave not in state["colunas_selecionadas_df2"]: raise ValueError(f"A chave '{chave}' deve estar selecionada.")
         
-        df1_copy, df2_copy = state["df1"].copy(), state["df2"].copy()
-        df1_copy[chave] = df1_copy[chave].astype(str).str.strip().str.lower()
-        df2_copy[chave] = df2_copy[chave].astype(str).str.strip().str.lower()
+        how = TIPOS_JUNCAO[state["tipo_juncao"].get()]
+        formato, compressao = formato_por_caminho(saida); compressao = resolver_compressao(state["compressao"].get(), compressao)
+        try: limite_linhas = int(state["limite_linhas"].get())
+        except ValueError: limite_linhas = LIMITE_LINHAS_JUNCAO
+        
+        if not state["modo_disco"].get():
+            q.put({'type': 'progress', 'text': "Lendo as colunas selecionadas das duas planilhas..."})
+            otimizar = state["otimizar"].get()
+            # Excel é lido da cópia Parquet (criada na primeira leitura e reaproveitada enquanto o arquivo não mudar)
+            leituras = [(state["p1_path"].get(), state["colunas_selecionadas_df1"], otimizar, cache_parquet, chave), (state["p2_path"].get(), state["colunas_selecionadas_df2"], otimizar, cache_parquet, chave)]
+            df1_sel, df2_sel = mapear_em_ordem(ler_colunas, leituras, min(2, WORKERS_PADRAO))
+            memoria = f"\n\nP1 — {resumo_memoria(df1_sel)}\nP2 — {resumo_memoria(df2_sel)}" if otimizar else ""
+            # Só a chave é normalizada, fora das tabelas, e codificada em inteiros comuns às duas
+            codigos1, codigos2, valores = codificar_chaves(df1_sel[chave], df2_sel[chave])
+            
+            # Estima o resultado pelas contagens da chave antes do merge (evita explosões muitos-para-muitos)
+            analise = analisar_chaves(codigos1, codigos2, how, bytes_por_linha(df1_sel, df2_sel), valores=valores)
+            q.put({'type': 'progress', 'text': resumo_analise(analise)})
+            if not excede_limites(analise, limite_linhas):
+                df_final = juntar_por_codigos(df1_sel, df2_sel, chave, codigos1, codigos2, valores, how)
+                gravar_tabela(df_final, saida, formato, compressao)
+                return f"Planilha unida com {len(df_final)} linhas salva!{memoria}"
+            if ACOES_EXCESSO[state["acao_excesso"].get()] == "recusar":
+                raise ValueError(f"Junção recusada: o resultado passaria do limite de {limite_linhas} linhas.\n\n{resumo_analise(analise)}")
+            del df1_sel, df2_sel, codigos1, codigos2, valores
         
-        df_final = pd.merge(df1_copy[list(state["colunas_selecionadas_df1"])], df2_copy[list(state["colunas_selecionadas_df2"])], on=chave, how="inner")
-        df_final.to_excel(saida, index=False)
-        return f"Planilha unida com {len(df_final)} linhas salva!"
+        # Junção particionada em disco: lê os arquivos de novo em blocos e grava o resultado em streaming
+        q.put({'type': 'progress', 'text': "Particionando planilhas em disco..."})
+        with EscritorEmBlocos(saida, formato, compressao) as escritor:
+            for bloco in juntar_fora_da_memoria(state["p1_path"].get(), state["p2_path"].get(), chave, how=how, colunas1=list(state["colunas_selecionadas_df1"]), colunas2=list(state["colunas_selecionadas_df2"])):
+                escritor.escrever(bloco); q.put({'type': 'progress', 'text': f"{escritor.linhas} linhas gravadas..."})
+        return f"Planilha unida com {escritor.linhas} linhas salva!"
 
     def on_unir_done(success, result):
         if success and result: messagebox.showinfo("Sucesso", result, parent=tab_frame)
@@ -307,19 +568,33 @@ def criar_aba_unir_planilhas(tab_frame, vcmd):
     ttk.Button(f2, text="Procurar...", command=lambda: state['p2_path'].set(ask_open_file_with_memory("unir_p2", filetypes=[("Planilhas", "*.xlsx *.xls *.csv")]) or "")).pack(side='left')
     f_chave = ttk.Labelframe(main_frame, text="3. Chave de União (Nome da coluna em comum)", padding=PAD_X); f_chave.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     ttk.Entry(f_chave, textvariable=state['chave'], font=FONT_LABEL).pack(fill='x')
-    ttk.Button(main_frame, text="Carregar Planilhas", command=carregar_planilhas).pack(pady=(PAD_Y*2, PAD_Y))
+    btn_carregar = ttk.Button(main_frame, text="Carregar Planilhas", command=carregar_planilhas); btn_carregar.pack(pady=(PAD_Y*2, PAD_Y))
     f_selecao = ttk.Labelframe(main_frame, text="4. Selecionar Colunas", padding=PAD_X); f_selecao.pack(fill='x', padx=PAD_X, pady=PAD_Y)
-    btn_selecionar_cols1 = ttk.Button(f_selecao, text="Selecionar Colunas P1", state="disabled", command=lambda: popular_tela_selecao(state["df1"], "Planilha Principal", "colunas_selecionadas_df1"))
+    btn_selecionar_cols1 = ttk.Button(f_selecao, text="Selecionar Colunas P1", state="disabled", command=lambda: popular_tela_selecao(state["colunas_p1"], "Planilha Principal", "colunas_selecionadas_df1"))
     btn_selecionar_cols1.pack(side='left', expand=True, fill='x', padx=PAD_X, pady=PAD_Y)
-    btn_selecionar_cols2 = ttk.Button(f_selecao, text="Selecionar Colunas P2", state="disabled", command=lambda: popular_tela_selecao(state["df2"], "Planilha Secundária", "colunas_selecionadas_df2"))
+    btn_selecionar_cols2 = ttk.Button(f_selecao, text="Selecionar Colunas P2", state="disabled", command=lambda: popular_tela_selecao(state["colunas_p2"], "Planilha Secundária", "colunas_selecionadas_df2"))
     btn_selecionar_cols2.pack(side='left', expand=True, fill='x', padx=PAD_X, pady=PAD_Y)
     f_saida = ttk.Labelframe(main_frame, text="5. Salvar Resultado", padding=PAD_X); f_saida.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     ttk.Entry(f_saida, textvariable=state['saida_path'], font=FONT_LABEL).pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
-    ttk.Button(f_saida, text="Salvar em...", command=lambda: state['saida_path'].set(ask_save_as_with_memory("unir_save", defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")]) or "")).pack(side='left')
-    btn_unir = ttk.Button(main_frame, text="Unir Planilhas", command=lambda: TaskRunner(tab_frame).run_task(executar_uniao_final, on_unir_done), style="Accent.TButton", state="disabled")
+    ttk.Button(f_saida, text="Salvar em...", command=lambda: state['saida_path'].set(ask_save_as_with_memory("unir_save", defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv *.csv.gz *.csv.bz2 *.csv.xz"), ("Parquet", "*.parquet"), ("Feather", "*.feather")]) or "")).pack(side='left')
+    ttk.Label(f_saida, text="Compressão:").pack(side='left', padx=PAD_X)
+    ttk.Combobox(f_saida, textvariable=state['compressao'], values=OPCOES_COMPRESSAO, state="readonly", width=9).pack(side='left')
+    f_opcoes = ttk.Frame(main_frame); f_opcoes.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Label(f_opcoes, text="Tipo de junção:").pack(side='left', padx=(0, PAD_X))
+    ttk.Combobox(f_opcoes, textvariable=state['tipo_juncao'], values=list(TIPOS_JUNCAO), state="readonly", width=18).pack(side='left')
+    ttk.Checkbutton(f_opcoes, text="Baixa memória (junção em disco)", variable=state['modo_disco']).pack(side='left', padx=PAD_X)
+    ttk.Checkbutton(f_opcoes, text="Otimizar tipos", variable=state['otimizar']).pack(side='left', padx=PAD_X)
+    f_limite = ttk.Frame(main_frame); f_limite.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Label(f_limite, text="Limite de linhas do resultado:").pack(side='left', padx=(0, PAD_X))
+    ttk.Entry(f_limite, textvariable=state['limite_linhas'], width=12, validate='key', validatecommand=vcmd).pack(side='left')
+    ttk.Label(f_limite, text="Se passar:").pack(side='left', padx=PAD_X)
+    ttk.Combobox(f_limite, textvariable=state['acao_excesso'], values=list(ACOES_EXCESSO), state="readonly", width=22).pack(side='left')
+    btn_unir = ttk.Button(main_frame, text="Unir Planilhas", command=lambda: task_runner.run_task(executar_uniao_final, on_unir_done, progress_bar=progresso, status_label=label_progresso), style="Accent.TButton", state="disabled")
     btn_unir.pack(pady=(PAD_Y*2, PAD_Y), ipadx=10, ipady=5)
+    progress_frame, progresso, label_progresso = criar_widgets_progresso(main_frame); progress_frame.pack(fill='x', padx=PAD_X)
 
 def criar_aba_detector_duplicatas(tab_frame, vcmd):
+    task_runner = TaskRunner(tab_frame)
     caminho_arquivo_var = tk.StringVar()
     def selecionar_arquivo():
         caminho = ask_open_file_with_memory("duplicatas_open", title="Selecione o arquivo .txt", filetypes=[("Arquivos de texto", "*.txt")])
@@ -327,34 +602,119 @@ def criar_aba_detector_duplicatas(tab_frame, vcmd):
             caminho_arquivo_var.set(caminho)
             btn_processar['state'] = 'normal'
             btn_processar.focus_set()
+    def processo_duplicatas(q, caminho_arquivo, pasta_destino):
+        def ao_progredir(fase, feito, total):
+            if fase == "leitura": q.put({'type': 'progress', 'max': max(total, 1), 'value': feito, 'text': f"Lendo: {feito / 1024**2:,.0f} de {total / 1024**2:,.0f} MB"})
+            else: q.put({'type': 'progress', 'max': total, 'value': feito, 'text': f"Deduplicando no disco: partição {feito} de {total}"})
+        saida = Path(pasta_destino)
+        r = deduplicar_linhas(caminho_arquivo, saida / "lista_unicos.txt", saida / "lista_duplicados.txt", ao_progredir=ao_progredir)
+        q.put({'type': 'progress', 'text': "Concluído!"})
+        return f"{r['unicos']} únicos e {r['duplicados']} duplicados encontrados em {r['linhas']} linhas.\n\nArquivos salvos em:\n{pasta_destino}"
+    def on_done(success, result):
+        btn_processar['state'] = 'normal'; btn_selecionar['state'] = 'normal'
+        if success: messagebox.showinfo("Sucesso", result, parent=tab_frame)
     def executar_processo():
         caminho_arquivo = caminho_arquivo_var.get()
         if not caminho_arquivo: return
-        try:
-            lista = [item.strip() for item in Path(caminho_arquivo).read_text(encoding='utf-8').splitlines() if item.strip()]
-            unicos, vistos, duplicados = [], set(), set()
-            for item in lista:
-                if item in vistos: duplicados.add(item)
-                else: vistos.add(item); unicos.append(item)
-            pasta_destino = ask_directory_with_memory("duplicatas_save", title="Escolha onde salvar os arquivos de resultado")
-            if not pasta_destino: return
-            saida = Path(pasta_destino)
-            (saida / "lista_unicos.txt").write_text('\n'.join(unicos), encoding='utf-8')
-            (saida / "lista_duplicados.txt").write_text('\n'.join(sorted(list(duplicados))), encoding='utf-8')
-            messagebox.showinfo("Sucesso", f"{len(unicos)} únicos e {len(duplicados)} duplicados encontrados.\n\nArquivos salvos em:\n{pasta_destino}", parent=tab_frame)
-        except Exception as e: messagebox.showerror("Erro", str(e), parent=tab_frame)
+        pasta_destino = ask_directory_with_memory("duplicatas_save", title="Escolha onde salvar os arquivos de resultado")
+        if not pasta_destino: return
+        btn_processar['state'] = 'disabled'; btn_selecionar['state'] = 'disabled'; progresso['value'] = 0
+        task_runner.run_task(processo_duplicatas, on_done, caminho_arquivo, pasta_destino, progress_bar=progresso, status_label=label_progresso)
     ttk.Label(tab_frame, text="Encontrar Itens Únicos e Duplicados", font=FONT_TITLE).pack(pady=(PAD_Y, PAD_Y * 2))
     f_sel = ttk.Labelframe(tab_frame, text="1. Selecionar Arquivo de Texto", padding=PAD_X); f_sel.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     entry_arquivo = ttk.Entry(f_sel, textvariable=caminho_arquivo_var, font=FONT_LABEL, state='readonly'); entry_arquivo.pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
     btn_selecionar = ttk.Button(f_sel, text="Procurar...", command=selecionar_arquivo); btn_selecionar.pack(side='left')
     f_exec = ttk.Labelframe(tab_frame, text="2. Executar", padding=PAD_X); f_exec.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     btn_processar = ttk.Button(f_exec, text="Processar e Salvar em...", style="Accent.TButton", command=executar_processo, state='disabled'); btn_processar.pack(pady=PAD_Y)
+    f_prog, progresso, label_progresso = criar_widgets_progresso(f_exec); f_prog.pack(fill='x', pady=PAD_Y)
+
+def criar_aba_arquivos_duplicados(tab_frame, vcmd):
+    task_runner = TaskRunner(tab_frame); pasta_var = tk.StringVar(); threads_var = tk.StringVar(value=str(WORKERS_HASH))
+    acao_var = tk.StringVar(value=list(ACOES_DUPLICADOS)[0]); usar_indice_var = tk.BooleanVar(value=True)
+    busca = {'raiz': None, 'grupos': []}
+    try: indice_hashes = IndiceHashes()
+    except Exception: indice_hashes = None
+    ETAPAS = {"tamanho": "Comparando tamanhos", "amostra": "Lendo início e fim dos candidatos", "completo": "Hash completo dos empates"}
+
+    def selecionar_pasta():
+        pasta = ask_directory_with_memory("duplicados_open", title="Selecione a pasta a analisar")
+        if pasta: pasta_var.set(pasta); btn_buscar['state'] = 'normal'; btn_buscar.focus_set()
+    def definir_botoes(estado):
+        btn_buscar['state'] = estado if pasta_var.get() else 'disabled'; btn_selecionar['state'] = estado
+        btn_aplicar['state'] = estado if busca['grupos'] else 'disabled'
+    def processo_busca(q, pasta, workers, indice):
+        def ao_progredir(etapa, feito, total):
+            q.put({'type': 'progress', 'max': max(total, 1), 'value': feito, 'text': f"{ETAPAS[etapa]}: {feito} de {total}"})
+        q.put({'type': 'progress', 'max': 1, 'value': 0, 'text': "Listando arquivos..."})
+        resultado = encontrar_duplicados(pasta, workers=workers, ao_progredir=ao_progredir, indice=indice)
+        q.put({'type': 'progress', 'text': "Busca concluída!"})
+        return pasta, resultado
+    def on_busca_done(success, result):
+        busca['grupos'] = []
+        if success:
+            busca['raiz'], resultado = result; busca['grupos'] = resultado['grupos']
+            linhas = [resumo_duplicados(resultado), ""]
+            for g in resultado['grupos'][:GRUPOS_NO_RELATORIO]:
+                linhas.append(f"{len(g['arquivos'])} arquivos de {g['tamanho'] / 1024**2:,.2f} MB ({g['recuperavel'] / 1024**2:,.2f} MB recuperáveis) {g['digest'][:16]}")
+                linhas.extend(f"  {'[mantido] ' if i == 0 else ''}{rel}" for i, rel in enumerate(g['arquivos']))
+            if len(resultado['grupos']) > GRUPOS_NO_RELATORIO: linhas.append(f"... e mais {len(resultado['grupos']) - GRUPOS_NO_RELATORIO} grupo(s).")
+            linhas.extend(f"ERRO {rel}: {erro}" for rel, erro in resultado['erros'])
+            texto_relatorio.delete('1.0', tk.END); texto_relatorio.insert(tk.END, "\n".join(linhas))
+        definir_botoes('normal')
+    def iniciar_busca():
+        pasta = pasta_var.get()
+        if not os.path.isdir(pasta): messagebox.showerror("Erro", "Selecione uma pasta válida.", parent=tab_frame); return
+        try: workers = int(threads_var.get()); assert workers > 0
+        except: messagebox.showerror("Erro de Entrada", "O número de threads deve ser um inteiro > 0.", parent=tab_frame); return
+        definir_botoes('disabled'); progresso['value'] = 0
+        task_runner.run_task(processo_busca, on_busca_done, pasta, workers, indice_hashes if usar_indice_var.get() else None, progress_bar=progresso, status_label=label_progresso)
+
+    def processo_acao(q, raiz, grupos, acao, destino):
+        r = aplicar_acao_duplicados(raiz, grupos, acao, destino, ao_progredir=lambda i, n: q.put({'type': 'progress', 'max': n, 'value': i, 'text': f"Grupo {i} de {n}"}))
+        texto = f"{r['processados']} cópia(s) tratada(s), {r['bytes_liberados'] / 1024**2:,.1f} MB liberados."
+        if r['erros']: texto += "\n\nNão foi possível tratar:\n" + "\n".join(f"{rel}: {erro}" for rel, erro in r['erros'][:20])
+        return texto
+    def on_acao_done(success, result):
+        busca['grupos'] = []  # A pasta mudou: é preciso buscar de novo antes de outra ação
+        definir_botoes('normal')
+        if success: messagebox.showinfo("Concluído", result, parent=tab_frame)
+    def aplicar_acao():
+        acao, destino = ACOES_DUPLICADOS[acao_var.get()], None
+        if acao == "mover":
+            destino = ask_directory_with_memory("duplicados_move", title="Para onde mover as cópias?")
+            if not destino: return
+        copias = sum(len(g['arquivos']) - 1 for g in busca['grupos'])
+        if not messagebox.askyesno("Confirmar", f"{acao_var.get()}: {copias} cópia(s) em {len(busca['grupos'])} grupo(s).\nO primeiro arquivo de cada grupo é mantido. Continuar?", parent=tab_frame): return
+        definir_botoes('disabled'); progresso['value'] = 0
+        task_runner.run_task(processo_acao, on_acao_done, busca['raiz'], busca['grupos'], acao, destino, progress_bar=progresso, status_label=label_progresso)
+
+    ttk.Label(tab_frame, text="Arquivos Duplicados", font=FONT_TITLE).pack(pady=(PAD_Y, PAD_Y * 2))
+    f_sel = ttk.Labelframe(tab_frame, text="1. Selecionar Pasta", padding=PAD_X); f_sel.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Entry(f_sel, textvariable=pasta_var, font=FONT_LABEL, state='readonly').pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
+    btn_selecionar = ttk.Button(f_sel, text="Procurar...", command=selecionar_pasta); btn_selecionar.pack(side='left')
+    f_busca = ttk.Labelframe(tab_frame, text="2. Buscar (tamanho → início/fim → hash completo)", padding=PAD_X); f_busca.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Label(f_busca, text="Threads:").pack(side='left')
+    ttk.Entry(f_busca, textvariable=threads_var, width=4, validate='key', validatecommand=vcmd).pack(side='left', padx=(5, PAD_X))
+    ttk.Checkbutton(f_busca, text="Usar índice de hashes", variable=usar_indice_var, state='normal' if indice_hashes else 'disabled').pack(side='left', padx=PAD_X)
+    btn_buscar = ttk.Button(f_busca, text="Buscar Duplicados", style="Accent.TButton", command=iniciar_busca, state='disabled'); btn_buscar.pack(side='right')
+    f_res = ttk.Labelframe(tab_frame, text="3. Resultado", padding=PAD_X); f_res.pack(fill='both', expand=True, padx=PAD_X, pady=PAD_Y)
+    progress_frame, progresso, label_progresso = criar_widgets_progresso(f_res); progress_frame.pack(fill='x')
+    texto_relatorio = scrolledtext.ScrolledText(f_res, height=10, font=("Courier New", 9)); texto_relatorio.pack(fill='both', expand=True)
+    f_acao = ttk.Labelframe(tab_frame, text="4. Ação nas Cópias", padding=PAD_X); f_acao.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Combobox(f_acao, textvariable=acao_var, values=list(ACOES_DUPLICADOS), state="readonly", width=30).pack(side='left')
+    btn_aplicar = ttk.Button(f_acao, text="Aplicar", command=aplicar_acao, state='disabled'); btn_aplicar.pack(side='left', padx=PAD_X)
 
 def criar_aba_hash(tab_frame, vcmd):
     task_runner = TaskRunner(tab_frame)
     arquivo_var = tk.StringVar()
     md5_var = tk.StringVar()
     sha256_var = tk.StringVar()
+    pasta_var = tk.StringVar()
+    algoritmo_var = tk.StringVar(value="SHA-256")
+    threads_var = tk.StringVar(value=str(WORKERS_HASH))
+    usar_indice_var = tk.BooleanVar(value=True)
+    try: indice_hashes = IndiceHashes()
+    except Exception: indice_hashes = None
 
     def selecionar_arquivo():
         caminho = ask_open_file_with_memory("hash_open", title="Selecione um arquivo")
@@ -365,7 +725,15 @@ def criar_aba_hash(tab_frame, vcmd):
             btn_calcular['state'] = 'normal'
             btn_calcular.focus_set()
 
-    def processo_hash(q, arquivo):
+    def processo_hash(q, arquivo, indice=None):
+        # Arquivo inalterado (mesmo tamanho, inode e mtime): os hashes vêm do índice, sem ler o conteúdo
+        caminho, st = os.path.abspath(arquivo), os.stat(arquivo)
+        if indice:
+            md5_salvo, sha256_salvo = indice.obter(caminho, "MD5", st), indice.obter(caminho, "SHA-256", st)
+            if md5_salvo and sha256_salvo:
+                q.put({'type': 'progress', 'max': 1, 'value': 1, 'text': "Arquivo inalterado: hashes reaproveitados do índice."})
+                return {'md5': md5_salvo, 'sha256': sha256_salvo}
+
         md5 = hashlib.md5()
         sha256 = hashlib.sha256()
         tamanho_total = os.path.getsize(arquivo)
@@ -385,9 +753,33 @@ def criar_aba_hash(tab_frame, vcmd):
                 q.put({'type': 'progress', 'value': lido})
         
         q.put({'type': 'progress', 'text': "Cálculo concluído!"})
+        if indice:
+            indice.guardar(caminho, "MD5", st, md5.hexdigest())
+            indice.guardar(caminho, "SHA-256", st, sha256.hexdigest())
+            indice.salvar()
         return {'md5': md5.hexdigest(), 'sha256': sha256.hexdigest()}
 
+    def indice_ativo():
+        return indice_hashes if usar_indice_var.get() else None
+
+    def atualizar_resumo_indice():
+        label_indice.config(text=indice_hashes.resumo() if indice_hashes else "Índice de hashes indisponível.")
+
+    def podar_indice(q):
+        q.put({'type': 'progress', 'text': "Removendo entradas de arquivos alterados ou apagados..."})
+        return indice_hashes.podar()
+
+    def on_podar_done(success, result):
+        atualizar_resumo_indice()
+        if success: messagebox.showinfo("Índice", f"{result} entrada(s) removida(s) do índice.", parent=tab_frame)
+
+    def limpar_indice():
+        if indice_hashes and messagebox.askyesno("Índice", "Apagar todos os hashes guardados?", parent=tab_frame):
+            indice_hashes.limpar()
+            atualizar_resumo_indice()
+
     def on_hash_done(success, result):
+        atualizar_resumo_indice()
         if success:
             md5_var.set(result['md5'])
             sha256_var.set(result['sha256'])
@@ -405,8 +797,74 @@ def criar_aba_hash(tab_frame, vcmd):
         md5_var.set("Calculando...")
         sha256_var.set("Calculando...")
         
-        task_runner.run_task(processo_hash, on_hash_done, arquivo, progress_bar=progresso, status_label=label_progresso)
+        task_runner.run_task(processo_hash, on_hash_done, arquivo, indice_ativo(), progress_bar=progresso, status_label=label_progresso)
     
+    def selecionar_pasta():
+        pasta = ask_directory_with_memory("hash_pasta", title="Selecione a pasta")
+        if pasta:
+            pasta_var.set(pasta)
+            btn_manifesto['state'] = 'normal'
+
+    def criar_ao_progredir(q):
+        def ao_progredir(feitos, total, bytes_feitos, total_bytes):
+            q.put({'type': 'progress', 'max': max(total_bytes, 1), 'value': bytes_feitos, 'text': f"{feitos}/{total} arquivos"})
+        return ao_progredir
+
+    def processo_manifesto(q, pasta, destino, algoritmo, workers, indice=None):
+        q.put({'type': 'progress', 'value': 0, 'text': "Listando arquivos..."})
+        # O próprio manifesto não entra no cálculo; em outra unidade (Windows) ele não pode estar dentro da pasta
+        try: ignorar = {os.path.relpath(destino, pasta).replace(os.sep, "/")}
+        except ValueError: ignorar = set()
+        resultados, erros = [], []
+        for rel, digest, erro in hash_diretorio(pasta, algoritmo, workers, ignorar=ignorar, ao_progredir=criar_ao_progredir(q), indice=indice):
+            if erro: erros.append(f"ERRO: {rel} ({erro})")
+            else: resultados.append((rel, digest))
+        gravar_manifesto(resultados, destino)
+        q.put({'type': 'progress', 'text': "Manifesto gravado!"})
+        return "\n".join([f"{len(resultados)} arquivo(s) gravados em {destino}."] + erros)
+
+    def processo_verificacao(q, manifesto, algoritmo, workers, indice=None):
+        q.put({'type': 'progress', 'value': 0, 'text': "Listando arquivos..."})
+        relatorio = verificar_manifesto(manifesto, algoritmo=algoritmo, workers=workers, ao_progredir=criar_ao_progredir(q), indice=indice)
+        q.put({'type': 'progress', 'text': "Verificação concluída!"})
+        return resumo_verificacao(relatorio)
+
+    def on_pasta_done(success, result):
+        atualizar_resumo_indice()
+        btn_manifesto['state'] = 'normal' if pasta_var.get() else 'disabled'
+        btn_verificar['state'] = 'normal'
+        if success:
+            texto_relatorio.delete('1.0', tk.END)
+            texto_relatorio.insert(tk.END, result)
+
+    def ler_threads():
+        try:
+            workers = int(threads_var.get()); assert workers > 0
+            return workers
+        except:
+            messagebox.showerror("Erro de Entrada", "O número de threads deve ser um inteiro > 0.", parent=tab_frame)
+
+    def iniciar_manifesto():
+        pasta, algoritmo, workers = pasta_var.get(), algoritmo_var.get(), ler_threads()
+        if not workers: return
+        if not pasta or not os.path.isdir(pasta):
+            messagebox.showerror("Erro", "Por favor, selecione uma pasta válida.", parent=tab_frame)
+            return
+        destino = ask_save_as_with_memory("hash_manifesto", title="Salvar manifesto como...", initialfile=f"{algoritmo.replace('-', '').upper()}SUMS")
+        if not destino: return
+        btn_manifesto['state'] = 'disabled'
+        btn_verificar['state'] = 'disabled'
+        task_runner.run_task(processo_manifesto, on_pasta_done, pasta, destino, algoritmo, workers, indice_ativo(), progress_bar=progresso_pasta, status_label=label_progresso_pasta)
+
+    def iniciar_verificacao():
+        workers = ler_threads()
+        if not workers: return
+        manifesto = ask_open_file_with_memory("hash_manifesto", title="Selecione o manifesto (a pasta dele será verificada)")
+        if not manifesto: return
+        btn_manifesto['state'] = 'disabled'
+        btn_verificar['state'] = 'disabled'
+        task_runner.run_task(processo_verificacao, on_pasta_done, manifesto, algoritmo_var.get(), workers, indice_ativo(), progress_bar=progresso_pasta, status_label=label_progresso_pasta)
+
     def copiar_para_clipboard(valor):
         if not valor: return
         root = tab_frame.winfo_toplevel()
@@ -439,9 +897,34 @@ def criar_aba_hash(tab_frame, vcmd):
     entry_sha256 = ttk.Entry(f_sha256, textvariable=sha256_var, state='readonly', font=("Courier New", 10)); entry_sha256.pack(side='left', fill='x', expand=True, padx=5)
     ttk.Button(f_sha256, text="Copiar", command=lambda: copiar_para_clipboard(sha256_var.get())).pack(side='left')
 
+    f_pasta = ttk.Labelframe(tab_frame, text="4. Pasta Inteira (Manifesto sha256sum)", padding=PAD_X); f_pasta.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    f_pasta_sel = ttk.Frame(f_pasta); f_pasta_sel.pack(fill='x', pady=(0, PAD_Y))
+    ttk.Entry(f_pasta_sel, textvariable=pasta_var, font=FONT_LABEL, state='readonly').pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
+    ttk.Button(f_pasta_sel, text="Procurar...", command=selecionar_pasta).pack(side='left')
+    f_pasta_opc = ttk.Frame(f_pasta); f_pasta_opc.pack(fill='x', pady=(0, PAD_Y))
+    ttk.Label(f_pasta_opc, text="Algoritmo:").pack(side='left')
+    ttk.Combobox(f_pasta_opc, textvariable=algoritmo_var, values=list(ALGORITMOS), state="readonly", width=9).pack(side='left', padx=(5, PAD_X))
+    ttk.Label(f_pasta_opc, text="Threads:").pack(side='left')
+    ttk.Entry(f_pasta_opc, textvariable=threads_var, width=4, validate='key', validatecommand=vcmd).pack(side='left', padx=(5, PAD_X))
+    btn_manifesto = ttk.Button(f_pasta_opc, text="Gerar Manifesto", command=iniciar_manifesto, state='disabled'); btn_manifesto.pack(side='left', padx=(PAD_X, 5))
+    btn_verificar = ttk.Button(f_pasta_opc, text="Verificar Manifesto", command=iniciar_verificacao); btn_verificar.pack(side='left')
+    progress_frame_pasta, progresso_pasta, label_progresso_pasta = criar_widgets_progresso(f_pasta)
+    progress_frame_pasta.pack(fill='x')
+    texto_relatorio = scrolledtext.ScrolledText(f_pasta, height=8, font=("Courier New", 9)); texto_relatorio.pack(fill='both', expand=True)
+
+    f_indice = ttk.Labelframe(tab_frame, text="5. Índice de Hashes", padding=PAD_X); f_indice.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Checkbutton(f_indice, text="Reaproveitar hashes de arquivos inalterados", variable=usar_indice_var, state='normal' if indice_hashes else 'disabled').pack(anchor='w')
+    f_indice_acoes = ttk.Frame(f_indice); f_indice_acoes.pack(fill='x', pady=(PAD_Y, 0))
+    label_indice = ttk.Label(f_indice_acoes, text=""); label_indice.pack(side='left')
+    ttk.Button(f_indice_acoes, text="Limpar Índice", command=limpar_indice, state='normal' if indice_hashes else 'disabled').pack(side='right')
+    ttk.Button(f_indice_acoes, text="Podar Índice", command=lambda: task_runner.run_task(podar_indice, on_podar_done, status_label=label_indice), state='normal' if indice_hashes else 'disabled').pack(side='right', padx=5)
+    atualizar_resumo_indice()
+
 def criar_aba_divisor_planilhas(tab_frame, vcmd):
     if not LIBS_INSTALADAS: ttk.Label(tab_frame, text="Instale 'pandas' e 'openpyxl'.", font=FONT_LABEL, foreground="red").pack(pady=50); return
     task_runner = TaskRunner(tab_frame); arquivo_selecionado = tk.StringVar(); linhas_por_arquivo = tk.StringVar(value="10000")
+    workers_var = tk.StringVar(value=str(WORKERS_PADRAO)); constant_memory_var = tk.BooleanVar(value=False)
+    formato_var = tk.StringVar(value="mesmo da origem"); compressao_var = tk.StringVar(value=OPCOES_COMPRESSAO[0]); todas_abas_var = tk.BooleanVar(value=False); otimizar_var = tk.BooleanVar(value=True)
     def selecionar_arquivo():
         tipos = [("Planilhas", "*.csv *.xlsx *.xls"), ("Todos", "*.*")]
         arquivo = ask_open_file_with_memory("divisor_open", title="Selecione a planilha", filetypes=tipos)
@@ -453,25 +936,44 @@ def criar_aba_divisor_planilhas(tab_frame, vcmd):
         arquivo = arquivo_selecionado.get()
         try: num_linhas = int(linhas_por_arquivo.get()); assert num_linhas > 0
         except: messagebox.showerror("Erro de Entrada", "O número de linhas deve ser um inteiro > 0."); return
+        try: workers = int(workers_var.get()); assert workers > 0
+        except: messagebox.showerror("Erro de Entrada", "O número de processos deve ser um inteiro > 0."); return
         if not os.path.isfile(arquivo): messagebox.showerror("Erro", "Selecione um arquivo válido."); return
         pasta_destino = ask_directory_with_memory("divisor_save", title="Salvar os arquivos em...")
         if not pasta_destino: return
         btn_dividir['state'] = 'disabled'; btn_selecionar['state'] = 'disabled'
-        task_runner.run_task(processo_divisor, on_done, arquivo, num_linhas, pasta_destino, progress_bar=progresso, status_label=label_progresso)
+        task_runner.run_task(processo_divisor, on_done, arquivo, num_linhas, pasta_destino, workers, constant_memory_var.get(), formato_var.get(), compressao_var.get(), todas_abas_var.get(), otimizar_var.get(), progress_bar=progresso, status_label=label_progresso)
     def on_done(success, result):
         btn_dividir['state'] = 'normal'; btn_selecionar['state'] = 'normal'
         if success: messagebox.showinfo("Sucesso", f"Planilha dividida em {result} arquivo(s)!", parent=tab_frame)
-    def processo_divisor(q, arquivo_path, chunk_size, pasta_destino):
-        p_arquivo = Path(arquivo_path); q.put({'type': 'progress', 'text': "Lendo arquivo de origem..."})
-        df = pd.read_csv(arquivo_path) if p_arquivo.suffix.lower() == '.csv' else pd.read_excel(arquivo_path)
+    def processo_divisor(q, arquivo_path, chunk_size, pasta_destino, workers=1, constant_memory=False, formato="mesmo da origem", opcao_compressao="padrão", todas_abas=False, otimizar=True):
+        p_arquivo = Path(arquivo_path); origem_csv = p_arquivo.suffix.lower() == '.csv'
+        if formato not in FORMATOS_SAIDA: formato = 'csv' if origem_csv else 'xlsx'
+        compressao = resolver_compressao(opcao_compressao, FORMATOS_SAIDA[formato]["compressoes"][0])
+        if compressao not in FORMATOS_SAIDA[formato]["compressoes"]: raise ValueError(f"Compressão '{compressao}' não suportada para {formato}.")
+        if origem_csv and formato == 'csv' and compressao is None:
+            # CSV -> CSV: copia os bytes registro a registro, sem pandas (velocidade de disco, memória constante)
+            q.put({'type': 'progress', 'max': max(p_arquivo.stat().st_size, 1), 'value': 0, 'text': "Dividindo o CSV..."})
+            partes = dividir_csv_bruto(arquivo_path, chunk_size, pasta_destino, ao_progredir=lambda lidos, total: q.put({'type': 'progress', 'value': lidos, 'text': f"Dividindo: {lidos / 1024**2:,.0f} de {total / 1024**2:,.0f} MB"}))
+            q.put({'type': 'progress', 'text': "Divisão concluída!"}); return len(partes)
+        if p_arquivo.suffix.lower() in ('.xlsx', '.xlsm') and formato == 'xlsx':
+            # Excel -> Excel: linhas lidas em modo somente leitura e gravadas em constant_memory, parte a parte
+            def ao_progredir(aba, lidas, total):
+                if total: q.put({'type': 'progress', 'max': total, 'value': lidas, 'text': f"Aba '{aba}': {lidas} de {total} linhas"})
+                else: q.put({'type': 'progress', 'text': f"Aba '{aba}': {lidas} linhas"})
+            partes = dividir_xlsx_streaming(arquivo_path, chunk_size, pasta_destino, todas_abas=todas_abas, ao_progredir=ao_progredir)
+            q.put({'type': 'progress', 'text': "Divisão concluída!"}); return len(partes)
+        q.put({'type': 'progress', 'text': "Lendo arquivo de origem..."})
+        df = pd.read_csv(arquivo_path) if origem_csv else pd.read_excel(arquivo_path)
+        if otimizar: df = otimizar_tipos(df)  # Partes menores na memória e no envio aos processos
         total_linhas = len(df); num_arquivos = math.ceil(total_linhas / chunk_size)
-        q.put({'type': 'progress', 'max': num_arquivos, 'text': f"Total de {total_linhas} linhas."}); time.sleep(1)
-        for i, start_row in enumerate(range(0, total_linhas, chunk_size)):
-            q.put({'type': 'progress', 'value': i, 'text': f"Gerando arquivo {i+1}/{num_arquivos}..."})
-            df_chunk = df.iloc[start_row : start_row + chunk_size]; novo_nome = f"{p_arquivo.stem}_parte_{i+1}{p_arquivo.suffix}"; caminho_saida = Path(pasta_destino) / novo_nome
-            if p_arquivo.suffix.lower() == '.csv': df_chunk.to_csv(caminho_saida, index=False)
-            else: df_chunk.to_excel(caminho_saida, index=False)
-        q.put({'type': 'progress', 'value': num_arquivos, 'text': "Divisão concluída!"}); return num_arquivos
+        q.put({'type': 'progress', 'max': num_arquivos, 'value': 0, 'text': f"Total de {total_linhas} linhas. {resumo_memoria(df)}"})
+        sufixo = extensao_saida(formato, compressao)
+        partes = ((Path(pasta_destino) / f"{p_arquivo.stem}_parte_{i+1}{sufixo}", df.iloc[start_row : start_row + chunk_size]) for i, start_row in enumerate(range(0, total_linhas, chunk_size)))
+        # As partes são gravadas em paralelo por um pool de processos, na ordem original
+        for i, _ in enumerate(gravar_partes(partes, workers, constant_memory, formato, compressao)):
+            q.put({'type': 'progress', 'value': i + 1, 'text': f"Arquivo {i+1}/{num_arquivos} gravado..."})
+        q.put({'type': 'progress', 'value': num_arquivos, 'text': f"Divisão concluída! {resumo_memoria(df)}".strip()}); return num_arquivos
     ttk.Label(tab_frame, text="Divisor de Planilhas", font=FONT_TITLE).pack(pady=(PAD_Y, PAD_Y * 2))
     f_sel = ttk.Labelframe(tab_frame, text="1. Selecionar Planilha (CSV ou Excel)", padding=PAD_X); f_sel.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     entry_arquivo = ttk.Entry(f_sel, textvariable=arquivo_selecionado, font=FONT_LABEL); entry_arquivo.pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
@@ -480,6 +982,16 @@ def criar_aba_divisor_planilhas(tab_frame, vcmd):
     ttk.Label(f_conf, text="Máximo de linhas por arquivo:").pack(side='left', padx=(0, PAD_X))
     entry_linhas = ttk.Entry(f_conf, textvariable=linhas_por_arquivo, width=15, font=FONT_LABEL, validate='key', validatecommand=vcmd)
     entry_linhas.pack(side='left')
+    ttk.Label(f_conf, text="Processos:").pack(side='left', padx=(PAD_X * 2, PAD_X))
+    ttk.Entry(f_conf, textvariable=workers_var, width=5, font=FONT_LABEL, validate='key', validatecommand=vcmd).pack(side='left')
+    ttk.Checkbutton(f_conf, text="Memória constante (XLSX)", variable=constant_memory_var).pack(side='left', padx=PAD_X)
+    ttk.Checkbutton(f_conf, text="Todas as abas (Excel → Excel)", variable=todas_abas_var).pack(side='left')
+    ttk.Checkbutton(f_conf, text="Otimizar tipos", variable=otimizar_var).pack(side='left', padx=PAD_X)
+    f_formato = ttk.Frame(tab_frame); f_formato.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    ttk.Label(f_formato, text="Formato de saída:").pack(side='left', padx=(0, PAD_X))
+    ttk.Combobox(f_formato, textvariable=formato_var, values=["mesmo da origem", *FORMATOS_SAIDA], state="readonly", width=16).pack(side='left')
+    ttk.Label(f_formato, text="Compressão:").pack(side='left', padx=PAD_X)
+    ttk.Combobox(f_formato, textvariable=compressao_var, values=OPCOES_COMPRESSAO, state="readonly", width=9).pack(side='left')
     f_exec = ttk.Labelframe(tab_frame, text="3. Executar", padding=PAD_X); f_exec.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     btn_dividir = ttk.Button(f_exec, text="Dividir e Salvar em...", style="Accent.TButton", command=iniciar_divisao, state='disabled'); btn_dividir.pack(pady=PAD_Y)
     
@@ -488,38 +1000,80 @@ def criar_aba_divisor_planilhas(tab_frame, vcmd):
 
 
 def criar_aba_organizador(tab_frame, vcmd):
-    task_runner = TaskRunner(tab_frame); pasta_selecionada = tk.StringVar(); modo_organizacao = tk.StringVar(value="categoria")
-    CATEGORIAS = {
-        "Imagens": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp"], "Vídeos": [".mp4", ".mov", ".avi", ".mkv", ".wmv"], "Músicas": [".mp3", ".wav", ".aac", ".flac"],
-        "Documentos": [".pdf", ".docx", ".doc", ".xlsx", ".xls", ".pptx", ".ppt", ".txt", ".csv"], "Compactados": [".zip", ".rar", ".7z", ".tar", ".gz"], "Executáveis": [".exe", ".msi"],
-    }
+    task_runner = TaskRunner(tab_frame); pasta_selecionada = tk.StringVar(); modo_organizacao = tk.StringVar(value="categoria"); destino_var = tk.StringVar()
+    recursivo_var = tk.BooleanVar(value=False); observar_var = tk.BooleanVar(value=False)
     def selecionar_pasta():
         pasta = ask_directory_with_memory("organizador_open", title="Selecione a pasta para organizar")
         if pasta: 
             pasta_selecionada.set(pasta)
-            btn_organizar['state'] = 'normal'
+            definir_botoes('normal')
             btn_organizar.focus_set()
-    def iniciar_organizacao():
+    def selecionar_destino():
+        pasta = ask_directory_with_memory("organizador_destino", title="Pasta de destino (opcional)")
+        if pasta: destino_var.set(pasta)
+    def definir_botoes(estado):
+        for btn in (btn_previa, btn_organizar, btn_desfazer): btn['state'] = estado if pasta_selecionada.get() else 'disabled'
+        btn_selecionar['state'] = estado; btn_parar['state'] = 'disabled'
+    def validar_pasta():
         pasta = pasta_selecionada.get()
-        if not os.path.isdir(pasta): messagebox.showerror("Erro", "Selecione uma pasta válida."); return
-        btn_organizar['state'] = 'disabled'; btn_selecionar['state'] = 'disabled'
-        task_runner.run_task(processo_organizador, on_done, pasta, modo_organizacao.get(), progress_bar=progresso, status_label=label_progresso)
+        if not os.path.isdir(pasta): messagebox.showerror("Erro", "Selecione uma pasta válida.", parent=tab_frame); return None
+        return pasta
+    def mostrar_relatorio(texto):
+        texto_plano.delete('1.0', tk.END); texto_plano.insert(tk.END, texto)
+    def processo_previa(q, pasta, modo, destino, recursivo):
+        q.put({'type': 'progress', 'text': "Planejando..."})
+        plano = planejar_organizacao(pasta, modo, destino, recursivo)
+        q.put({'type': 'progress', 'text': f"Pré-visualização: {len(plano)} arquivo(s). Nada foi movido."})
+        return resumo_plano(plano)
+    def processo_organizador(q, pasta, modo, destino, recursivo):
+        q.put({'type': 'progress', 'max': 1, 'value': 0, 'text': "Planejando..."})
+        plano = planejar_organizacao(pasta, modo, destino, recursivo)
+        q.put({'type': 'progress', 'max': max(len(plano), 1), 'text': f"Movendo {len(plano)} arquivo(s)..."})
+        r = executar_plano(plano, pasta_log=pasta, ao_progredir=lambda i, n: q.put({'type': 'progress', 'value': i, 'text': f"Movendo: {i} de {n}"}))
+        q.put({'type': 'progress', 'value': len(plano), 'text': "Organização concluída!"})
+        texto = f"{r['movidos']} arquivo(s) organizado(s)!"
+        if r['copiados']: texto += f"\n{r['copiados']} copiado(s) para outro disco."
+        if r['erros']: texto += f"\n\n{len(r['erros'])} erro(s):\n" + "\n".join(f"{os.path.basename(o)}: {e}" for o, e in r['erros'][:20])
+        return texto
+    def processo_observar(q, pasta, modo, destino, recursivo):
+        # Roda até o usuário parar (cancelamento da tarefa); cada lote de arquivos novos é organizado ao chegar
+        q.put({'type': 'progress', 'text': "Organizando o que já existe e observando a pasta..."})
+        def ao_organizar(r, totais):
+            q.put({'type': 'progress', 'text': f"Observando... {totais['movidos']} arquivo(s) organizado(s) em {totais['lotes']} lote(s). Último: {r['movidos']}"})
+        totais = organizar_continuamente(pasta, lambda: q.cancelado, modo, destino, recursivo, ao_organizar)
+        return f"Observação encerrada: {totais['movidos']} arquivo(s) organizado(s)."
+    def processo_desfazer(q, caminho_log):
+        q.put({'type': 'progress', 'max': 1, 'value': 0, 'text': "Desfazendo..."})
+        r = desfazer_organizacao(caminho_log, ao_progredir=lambda i, n: q.put({'type': 'progress', 'max': n, 'value': i, 'text': f"Restaurando: {i} de {n}"}))
+        texto = f"{r['restaurados']} arquivo(s) devolvido(s) ao lugar original."
+        if r['erros']: texto += f"\n\n{len(r['erros'])} não puderam ser restaurados (o log foi mantido):\n" + "\n".join(f"{os.path.basename(c)}: {e}" for c, e in r['erros'][:20])
+        return texto
+    def on_previa_done(success, result):
+        definir_botoes('normal')
+        if success: mostrar_relatorio(result)
     def on_done(success, result):
-        btn_organizar['state'] = 'normal'; btn_selecionar['state'] = 'normal'
-        if success: messagebox.showinfo("Sucesso", f"{result} arquivo(s) organizado(s)!", parent=tab_frame)
-    def processo_organizador(q, pasta, modo):
-        arquivos = [f for f in os.listdir(pasta) if os.path.isfile(os.path.join(pasta, f))]
-        total = len(arquivos); q.put({'type': 'progress', 'max': total, 'text': "Analisando..."}); time.sleep(1)
-        movidos = 0
-        for i, nome in enumerate(arquivos):
-            q.put({'type': 'progress', 'value': i, 'text': f"Movendo: {nome}"})
-            caminho_arq = os.path.join(pasta, nome); ext = Path(nome).suffix.lower(); pasta_dest_nome = "Outros"
-            if modo == "categoria":
-                for cat, exts in CATEGORIAS.items():
-                    if ext in exts: pasta_dest_nome = cat; break
-            elif modo == "extensao" and ext: pasta_dest_nome = ext[1:].upper()
-            caminho_dest = os.path.join(pasta, pasta_dest_nome); os.makedirs(caminho_dest, exist_ok=True); shutil.move(caminho_arq, caminho_dest); movidos += 1; time.sleep(0.05)
-        q.put({'type': 'progress', 'value': total, 'text': "Organização concluída!"}); return movidos
+        definir_botoes('normal')
+        if success: mostrar_relatorio(result); messagebox.showinfo("Sucesso", result, parent=tab_frame)
+    def iniciar(processo, callback, *args, dedicada=False):
+        definir_botoes('disabled'); progresso['value'] = 0
+        task_runner.run_task(processo, callback, *args, progress_bar=progresso, status_label=label_progresso, dedicada=dedicada)
+    def iniciar_previa():
+        pasta = validar_pasta()
+        if pasta: iniciar(processo_previa, on_previa_done, pasta, modo_organizacao.get(), destino_var.get() or None, recursivo_var.get())
+    def iniciar_organizacao():
+        pasta = validar_pasta()
+        if not pasta: return
+        if not observar_var.get(): iniciar(processo_organizador, on_done, pasta, modo_organizacao.get(), destino_var.get() or None, recursivo_var.get()); return
+        # A observação só termina quando o usuário para: roda fora do pool para não prender uma das vagas de tarefa
+        iniciar(processo_observar, on_done, pasta, modo_organizacao.get(), destino_var.get() or None, recursivo_var.get(), dedicada=True)
+        btn_parar['state'] = 'normal'
+    def iniciar_desfazer():
+        pasta = validar_pasta()
+        if not pasta: return
+        caminho_log = ultimo_log(pasta)
+        if not caminho_log: messagebox.showinfo("Desfazer", "Nenhuma organização registrada nesta pasta.", parent=tab_frame); return
+        if messagebox.askyesno("Desfazer", f"Desfazer a organização registrada em {os.path.basename(caminho_log)}?", parent=tab_frame):
+            iniciar(processo_desfazer, on_done, caminho_log)
     ttk.Label(tab_frame, text="Organizador de Arquivos", font=FONT_TITLE).pack(pady=(PAD_Y, PAD_Y * 2))
     f_sel = ttk.Labelframe(tab_frame, text="1. Selecionar Pasta", padding=PAD_X); f_sel.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     ttk.Entry(f_sel, textvariable=pasta_selecionada, font=FONT_LABEL).pack(side='left', fill='x', expand=True, padx=(0, PAD_X))
@@ -527,14 +1081,28 @@ def criar_aba_organizador(tab_frame, vcmd):
     f_modo = ttk.Labelframe(tab_frame, text="2. Modo de Organização", padding=PAD_X); f_modo.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     ttk.Radiobutton(f_modo, text="Por Categoria (Imagens, Documentos...)", variable=modo_organizacao, value="categoria").pack(anchor='w')
     ttk.Radiobutton(f_modo, text="Por Extensão (.JPG, .PDF...)", variable=modo_organizacao, value="extensao").pack(anchor='w')
-    f_exec = ttk.Labelframe(tab_frame, text="3. Executar", padding=PAD_X); f_exec.pack(fill='x', padx=PAD_X, pady=PAD_Y)
-    btn_organizar = ttk.Button(f_exec, text="Organizar Pasta", style="Accent.TButton", command=iniciar_organizacao, state='disabled'); btn_organizar.pack(pady=PAD_Y)
+    ttk.Checkbutton(f_modo, text="Incluir subpastas", variable=recursivo_var).pack(anchor='w')
+    ttk.Checkbutton(f_modo, text="Modo contínuo: organizar arquivos novos assim que chegarem", variable=observar_var).pack(anchor='w')
+    f_destino = ttk.Frame(f_modo); f_destino.pack(fill='x', pady=(PAD_Y, 0))
+    ttk.Label(f_destino, text="Destino (opcional):").pack(side='left')
+    ttk.Entry(f_destino, textvariable=destino_var, font=FONT_LABEL).pack(side='left', fill='x', expand=True, padx=PAD_X)
+    ttk.Button(f_destino, text="Escolher...", command=selecionar_destino).pack(side='left')
+    f_exec = ttk.Labelframe(tab_frame, text="3. Executar", padding=PAD_X); f_exec.pack(fill='both', expand=True, padx=PAD_X, pady=PAD_Y)
+    f_botoes = ttk.Frame(f_exec); f_botoes.pack(pady=PAD_Y)
+    btn_previa = ttk.Button(f_botoes, text="Pré-visualizar", command=iniciar_previa, state='disabled'); btn_previa.pack(side='left', padx=5)
+    btn_organizar = ttk.Button(f_botoes, text="Organizar Pasta", style="Accent.TButton", command=iniciar_organizacao, state='disabled'); btn_organizar.pack(side='left', padx=5)
+    btn_desfazer = ttk.Button(f_botoes, text="Desfazer Última", command=iniciar_desfazer, state='disabled'); btn_desfazer.pack(side='left', padx=5)
+    btn_parar = ttk.Button(f_botoes, text="Parar Observação", command=task_runner.cancelar, state='disabled'); btn_parar.pack(side='left', padx=5)
     
     progress_frame, progresso, label_progresso = criar_widgets_progresso(f_exec)
     progress_frame.pack(fill='x')
+    texto_plano = scrolledtext.ScrolledText(f_exec, height=8, font=("Courier New", 9)); texto_plano.pack(fill='both', expand=True)
 
 def criar_aba_conversor(tab_frame, vcmd):
     task_runner = TaskRunner(tab_frame); arquivos = []; limpar_auto_var = tk.BooleanVar(value=False)
+    try: cache_paginas = CachePaginas() if LIBS_INSTALADAS else None
+    except OSError: cache_paginas = None  # Pasta de cache inacessível: converte sem cache
+    dpi_var = tk.StringVar(value="200"); formato_img_var = tk.StringVar(value="JPEG"); qualidade_var = tk.StringVar(value="85"); workers_img_var = tk.StringVar(value=str(WORKERS_PADRAO))
     def selecionar():
         nonlocal arquivos
         tipos = [("Arquivos Suportados", "*.pdf *.jpg *.jpeg *.png *.webp"), ("Todos", "*.*")]
@@ -547,24 +1115,29 @@ def criar_aba_conversor(tab_frame, vcmd):
     def iniciar():
         if not arquivos: return
         modo = combo_conversao.get(); nome_pdf = nome_pdf_var.get().strip()
+        try: opcoes_imagem = (int(dpi_var.get()), formato_img_var.get(), int(qualidade_var.get()), int(workers_img_var.get())); assert opcoes_imagem[0] > 0 and 1 <= opcoes_imagem[2] <= 100 and opcoes_imagem[3] > 0
+        except: messagebox.showerror("Erro de Entrada", "DPI e processos devem ser inteiros > 0 e a qualidade deve estar entre 1 e 100."); return
         destino = ask_directory_with_memory("conversor_save", title="Salvar arquivos convertidos em...")
         if not destino: return
         btn_converter['state'] = 'disabled'; btn_selecionar['state'] = 'disabled'; btn_limpar['state'] = 'disabled'
-        task_runner.run_task(processo_conversao, on_done, modo, destino, arquivos.copy(), nome_pdf, progress_bar=progresso, status_label=label_progresso)
+        task_runner.run_task(processo_conversao, on_done, modo, destino, arquivos.copy(), nome_pdf, opcoes_imagem, progress_bar=progresso, status_label=label_progresso)
     def on_done(success, result):
         btn_converter['state'] = 'normal'; btn_selecionar['state'] = 'normal'; btn_limpar['state'] = 'normal'
+        if cache_paginas: label_cache.config(text=cache_paginas.resumo())
         if success: 
             messagebox.showinfo("Sucesso", "Conversão concluída!", parent=tab_frame)
             if limpar_auto_var.get(): limpar()
-    def processo_conversao(q, modo, pasta_destino, lista_arquivos, nome_pdf_unico=""):
+    def processo_conversao(q, modo, pasta_destino, lista_arquivos, nome_pdf_unico="", opcoes_imagem=(200, "JPEG", 85, 1)):
         total = len(lista_arquivos); q.put({'type': 'progress', 'max': total, 'value': 0, 'text': "Iniciando..."}); time.sleep(0.5); imagens_para_pdf = []
         for i, path in enumerate(lista_arquivos):
             nome_base = Path(path).stem
             q.put({'type': 'progress', 'value': i, 'text': f"Processando {i+1}/{total}: {Path(path).name}"})
-            if modo == "PDF para Imagens (JPG)" and path.lower().endswith(".pdf"):
-                doc = fitz.open(path)
-                for pag_num, pag in enumerate(doc):
-                    pix = pag.get_pixmap(dpi=200); pix.save(Path(pasta_destino) / f"{nome_base}_pag_{pag_num+1}.jpg")
+            if modo == "PDF para Imagens" and path.lower().endswith(".pdf"):
+                # As páginas são renderizadas por um pool de processos e gravadas na ordem
+                dpi, formato, qualidade, workers = opcoes_imagem; extensao = FORMATOS_IMAGEM[formato]
+                for pag_num, dados in rasterizar_pdf(path, dpi, formato, qualidade, workers, cache=cache_paginas):
+                    (Path(pasta_destino) / f"{nome_base}_pag_{pag_num+1}{extensao}").write_bytes(dados)
+                    q.put({'type': 'progress', 'text': f"Processando {i+1}/{total}: {Path(path).name} (página {pag_num+1})"})
             elif modo.startswith("Imagens para PDF") and Path(path).suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']:
                 try:
                     img = Image.open(path).convert("RGB")
@@ -586,14 +1159,25 @@ def criar_aba_conversor(tab_frame, vcmd):
     f_nome_pdf = ttk.Frame(f_modo)
     ttk.Label(f_nome_pdf, text="Nome do arquivo PDF (opcional):").pack(side='left', padx=(0, 5))
     ttk.Entry(f_nome_pdf, textvariable=nome_pdf_var).pack(side='left', fill='x', expand=True)
+    f_img = ttk.Frame(f_modo)
+    ttk.Label(f_img, text="DPI:").pack(side='left'); ttk.Entry(f_img, textvariable=dpi_var, width=5, validate='key', validatecommand=vcmd).pack(side='left', padx=(5, PAD_X))
+    ttk.Label(f_img, text="Formato:").pack(side='left'); ttk.Combobox(f_img, textvariable=formato_img_var, values=list(FORMATOS_IMAGEM) if LIBS_INSTALADAS else [], state="readonly", width=6).pack(side='left', padx=(5, PAD_X))
+    ttk.Label(f_img, text="Qualidade:").pack(side='left'); ttk.Entry(f_img, textvariable=qualidade_var, width=4, validate='key', validatecommand=vcmd).pack(side='left', padx=(5, PAD_X))
+    ttk.Label(f_img, text="Processos:").pack(side='left'); ttk.Entry(f_img, textvariable=workers_img_var, width=4, validate='key', validatecommand=vcmd).pack(side='left', padx=5)
     def on_combo_select(event=None):
         if combo_conversao.get() == "Imagens para PDF (Único arquivo)": f_nome_pdf.pack(fill='x', pady=(PAD_Y, 0), before=combo_conversao)
         else: f_nome_pdf.pack_forget()
-    combo_conversao = ttk.Combobox(f_modo, state="readonly", font=FONT_LABEL, values=["PDF para Imagens (JPG)", "Imagens para PDF (Separados)", "Imagens para PDF (Único arquivo)"]); combo_conversao.pack(fill='x'); combo_conversao.current(0); combo_conversao.bind("<<ComboboxSelected>>", on_combo_select); on_combo_select()
+        if combo_conversao.get() == "PDF para Imagens": f_img.pack(fill='x', pady=(PAD_Y, 0))
+        else: f_img.pack_forget()
+    combo_conversao = ttk.Combobox(f_modo, state="readonly", font=FONT_LABEL, values=["PDF para Imagens", "Imagens para PDF (Separados)", "Imagens para PDF (Único arquivo)"]); combo_conversao.pack(fill='x'); combo_conversao.current(0); combo_conversao.bind("<<ComboboxSelected>>", on_combo_select); on_combo_select()
     f_exec = ttk.Labelframe(tab_frame, text="3. Executar", padding=PAD_X); f_exec.pack(fill='x', padx=PAD_X, pady=PAD_Y)
     btn_converter = ttk.Button(f_exec, text="Iniciar Conversão", style="Accent.TButton", command=iniciar, state='disabled'); btn_converter.pack(side='left', pady=PAD_Y, padx=(0, PAD_X))
     ttk.Checkbutton(f_exec, text="Limpar seleção após concluir", variable=limpar_auto_var).pack(side='left')
     progress_frame, progresso, label_progresso = criar_widgets_progresso(tab_frame); progress_frame.pack(fill='x', padx=PAD_X, pady=PAD_Y)
+    f_cache = ttk.Frame(tab_frame); f_cache.pack(fill='x', padx=PAD_X)
+    label_cache = ttk.Label(f_cache, text=cache_paginas.resumo() if cache_paginas else ""); label_cache.pack(side='left')
+    def limpar_cache(): cache_paginas.limpar(); label_cache.config(text=cache_paginas.resumo())
+    if cache_paginas: ttk.Button(f_cache, text="Limpar Cache", command=limpar_cache).pack(side='right')
 
 def criar_aba_renomeador_arquivos(tab_frame, vcmd):
     task_runner = TaskRunner(tab_frame); entrada_origem_str, entrada_destino_str = tk.StringVar(), tk.StringVar(); limpar_auto_var = tk.BooleanVar(value=False)
@@ -883,6 +1467,21 @@ def main():
     options_menu = tk.Menu(menu_bar, tearoff=0); menu_bar.add_cascade(label="Opções", menu=options_menu)
     options_menu.add_command(label="Mudar Tema", command=toggle_theme)
     
+    # Barra de status com a fila global de tarefas (empacotada antes do notebook para ficar sempre visível)
+    barra_status = ttk.Frame(root); barra_status.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
+    label_tarefas = ttk.Label(barra_status, text=GERENCIADOR_TAREFAS.resumo()); label_tarefas.pack(side='left')
+    ttk.Button(barra_status, text="Tarefas...", command=lambda: abrir_janela_tarefas(root)).pack(side='right')
+    def atualizar_barra_status():
+        label_tarefas.config(text=GERENCIADOR_TAREFAS.resumo()); root.after(500, atualizar_barra_status)
+    atualizar_barra_status()
+
+    def ao_fechar():
+        if GERENCIADOR_TAREFAS.ativas() and not messagebox.askyesno("Sair", "Há tarefas em andamento. Cancelá-las e sair?", parent=root):
+            return
+        GERENCIADOR_TAREFAS.encerrar()
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", ao_fechar)
+
     notebook = ttk.Notebook(root, style="TNotebook"); notebook.pack(pady=10, padx=10, fill="both", expand=True)
     style.configure("TNotebook", tabposition='wn')
     
@@ -897,6 +1496,7 @@ def main():
         "Conversor PDF/Img": criar_aba_conversor,
         "Renomeador": criar_aba_renomeador_arquivos,
         "Duplicatas": criar_aba_detector_duplicatas,
+        "Arquivos Duplicados": criar_aba_arquivos_duplicados,
         "Calculadora de Hash": criar_aba_hash,
         "Compressor Img": criar_aba_compressor_imagem,
         "Separador Listas": criar_aba_separador_lista,
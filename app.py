@@ -10,6 +10,13 @@ import zipfile
 import os
 import base64
 import json
+import tempfile
+from planilhas import CacheIngestao, CacheParquet, EscritorEmBlocos, gravar_tabela, projecao, resumo_memoria, FORMATOS_SAIDA, extensao_saida
+from divisor import dividir_csv_em_zip, serializar_partes, WORKERS_PADRAO
+from hashes import CacheHashes, ALGORITMOS
+from pdfs import unir_pdfs, rasterizar_pdf, CachePaginas, FORMATOS_IMAGEM
+from juncao import (juntar_fora_da_memoria, analisar_chaves, bytes_por_linha, excede_limites, resumo_analise,
+                    codificar_chaves, juntar_por_codigos, TIPOS_JUNCAO, ACOES_EXCESSO, LIMITE_LINHAS_JUNCAO)
 
 # --- CONFIGURAÇÃO INICIAL DA PÁGINA ---
 st.set_page_config(
@@ -350,6 +357,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- CACHE DE PLANILHAS (COMPARTILHADO ENTRE SESSÕES) ---
+@st.cache_resource
+def obter_cache_planilhas():
+    """Cache único de DataFrames lidos, reaproveitado entre reruns e sessões (Excel também ganha cópia Parquet em disco)"""
+    try:
+        parquet = CacheParquet()
+    except OSError:
+        parquet = None  # Pasta de cache inacessível: Excel é lido direto
+    return CacheIngestao(parquet=parquet)
+
+cache_planilhas = obter_cache_planilhas()
+
+@st.cache_resource
+def obter_cache_paginas():
+    """Cache em disco de páginas de PDF renderizadas, compartilhado entre sessões (None se a pasta for inacessível)"""
+    try:
+        return CachePaginas()
+    except OSError:
+        return None  # Pasta de cache inacessível: converte sem cache
+
+cache_paginas = obter_cache_paginas()
+
+@st.cache_resource
+def obter_cache_hashes():
+    """Hashes já calculados por upload, para não reler o arquivo a cada rerun"""
+    return CacheHashes()
+
+cache_hashes = obter_cache_hashes()
+
+def seletor_formato_saida(chave, padrao="xlsx"):
+    """Mostra a escolha de formato e compressão da saída e retorna (formato, compressao, extensao, mime)"""
+    col_fmt, col_comp = st.columns(2)
+    with col_fmt:
+        formato = st.selectbox("Formato de saída:", list(FORMATOS_SAIDA), index=list(FORMATOS_SAIDA).index(padrao),
+                               format_func=lambda f: FORMATOS_SAIDA[f]["rotulo"], key=f"fmt_{chave}")
+    with col_comp:
+        compressao = st.selectbox("Compressão:", FORMATOS_SAIDA[formato]["compressoes"],
+                                  format_func=lambda c: c or "nenhuma", key=f"comp_{chave}_{formato}")
+    mime = FORMATOS_SAIDA[formato]["mime"] if compressao is None or formato != "csv" else "application/octet-stream"
+    return formato, compressao, extensao_saida(formato, compressao), mime
+
+def seletor_otimizacao(chave):
+    """Mostra as opções de otimização de tipos na leitura e retorna (otimizar, texto_arrow)"""
+    col_otm, col_arrow = st.columns(2)
+    with col_otm:
+        otimizar = st.checkbox("🪶 Otimizar memória", value=True, key=f"otm_{chave}",
+                               help="Textos repetitivos viram categorias e números usam tipos menores, sem mudar os valores.")
+    with col_arrow:
+        texto_arrow = st.checkbox("Textos em Arrow", key=f"arrow_{chave}", disabled=not otimizar,
+                                  help="Guarda os demais textos como string[pyarrow], mais compacto que objetos Python.")
+    return otimizar, texto_arrow
+
 # --- GERENCIAMENTO DE NAVEGAÇÃO INTERNA ---
 if 'page' not in st.session_state:
     st.session_state.page = "Dashboard"
@@ -613,28 +672,82 @@ elif st.session_state.page == "Unir Planilhas":
     st.markdown("<br>", unsafe_allow_html=True)
     chave = st.text_input("🔑 Nome da Coluna Chave:", placeholder="Ex: cpf, email, id_produto")
     
+    # Só o cabeçalho é lido aqui; os dados são carregados depois apenas com as colunas escolhidas
+    selecao1, selecao2 = [], []
+    if file1 and file2:
+        col_sel1, col_sel2 = st.columns(2)
+        with col_sel1:
+            selecao1 = st.multiselect("Colunas da Planilha 1 (vazio = todas):", cache_planilhas.colunas(file1))
+        with col_sel2:
+            selecao2 = st.multiselect("Colunas da Planilha 2 (vazio = todas):", cache_planilhas.colunas(file2))
+    
+    col_tipo, col_modo = st.columns(2)
+    with col_tipo:
+        tipo_juncao = TIPOS_JUNCAO[st.selectbox("Tipo de junção:", list(TIPOS_JUNCAO))]
+    with col_modo:
+        modo_disco = st.checkbox("💾 Baixa memória (junção em disco)",
+                                 help="Particiona as duas planilhas em disco pela chave e une parte por parte. Use para arquivos com milhões de linhas.")
+    
+    with st.expander("🛡️ Proteção contra explosão de linhas"):
+        limite_linhas = st.number_input("Limite de linhas do resultado:", min_value=1, value=LIMITE_LINHAS_JUNCAO, step=100000)
+        acao_excesso = ACOES_EXCESSO[st.radio("Se a estimativa passar do limite:", list(ACOES_EXCESSO), horizontal=True)]
+    
+    otimizar, texto_arrow = seletor_otimizacao("unir")
+    formato_saida, compressao_saida, extensao, mime = seletor_formato_saida("unir")
+    
     if file1 and file2 and chave:
         if st.button("🚀 Processar e Unir Arquivos", type="primary"):
             try:
-                df1 = pd.read_excel(file1) if file1.name.endswith('.xlsx') else pd.read_csv(file1)
-                df2 = pd.read_excel(file2) if file2.name.endswith('.xlsx') else pd.read_csv(file2)
-                
-                # Normalização
-                df1[chave] = df1[chave].astype(str).str.strip().str.lower()
-                df2[chave] = df2[chave].astype(str).str.strip().str.lower()
-                
-                df_final = pd.merge(df1, df2, on=chave, how="inner")
-                
-                st.success(f"✅ Sucesso! {len(df_final)} linhas combinadas.")
-                st.dataframe(df_final.head())
-                
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df_final.to_excel(writer, index=False)
+                usar_disco = modo_disco
+                usecols1, usecols2 = projecao(chave, selecao1), projecao(chave, selecao2)
+                if not modo_disco:
+                    df1 = cache_planilhas.ler(file1, usecols=usecols1, colunas_texto=[chave], otimizar=otimizar, texto_arrow=texto_arrow, preservar=[chave])
+                    df2 = cache_planilhas.ler(file2, usecols=usecols2, colunas_texto=[chave], otimizar=otimizar, texto_arrow=texto_arrow, preservar=[chave])
+                    if otimizar: st.caption(f"Planilha 1 — {resumo_memoria(df1)} • Planilha 2 — {resumo_memoria(df2)}")
+                    
+                    # Normaliza só a chave, fora das tabelas, e a codifica em inteiros comuns às duas
+                    codigos1, codigos2, valores = codificar_chaves(df1[chave], df2[chave])
+                    
+                    # Estima o resultado pelas contagens da chave, antes de qualquer merge
+                    analise = analisar_chaves(codigos1, codigos2, tipo_juncao, bytes_por_linha(df1, df2), valores=valores)
+                    with st.expander("📊 Análise da chave"):
+                        st.caption(resumo_analise(analise))
+                        if len(analise["top_duplicadas"]): st.dataframe(analise["top_duplicadas"])
+                    
+                    if not excede_limites(analise, limite_linhas):
+                        df_final = juntar_por_codigos(df1, df2, chave, codigos1, codigos2, valores, tipo_juncao)
+                        
+                        st.success(f"✅ Sucesso! {len(df_final)} linhas combinadas.")
+                        st.dataframe(df_final.head())
+                        
+                        output = io.BytesIO()
+                        gravar_tabela(df_final, output, formato_saida, compressao_saida)
+                        
+                        st.download_button("⬇️ Baixar Resultado", output.getvalue(), f"unido{extensao}", mime)
+                    elif acao_excesso == "disco":
+                        st.warning(f"⚠️ {resumo_analise(analise)} Usando a junção em disco.")
+                        usar_disco = True
+                    else:
+                        st.error(f"⛔ Junção recusada: o resultado passaria do limite. {resumo_analise(analise)}")
                 
-                st.download_button("⬇️ Baixar Resultado", output.getvalue(), "unido.xlsx", "application/vnd.ms-excel")
+                if usar_disco:
+                    # Junção particionada: nenhuma das tabelas (nem o resultado) fica inteira na memória
+                    with tempfile.SpooledTemporaryFile(max_size=32 * 1024**2) as saida:
+                        escritor = EscritorEmBlocos(saida, formato_saida, compressao_saida); previa = None
+                        for bloco in juntar_fora_da_memoria(file1, file2, chave, how=tipo_juncao, colunas1=usecols1, colunas2=usecols2, nome1=file1.name, nome2=file2.name):
+                            if previa is None: previa = bloco.head()
+                            escritor.escrever(bloco)
+                        escritor.fechar()
+                        
+                        st.success(f"✅ Sucesso! {escritor.linhas} linhas combinadas.")
+                        if previa is not None: st.dataframe(previa)
+                        saida.seek(0)
+                        st.download_button("⬇️ Baixar Resultado", saida.read(), f"unido{extensao}", mime)
             except Exception as e:
                 st.error(f"❌ Erro: {e}. Verifique o nome da coluna chave.")
+            st.caption(cache_planilhas.resumo())
+            if cache_planilhas.parquet is not None:
+                st.caption(cache_planilhas.parquet.resumo())
 
 # ==============================================================================
 # PÁGINA: DIVISOR DE PLANILHAS (NOVO)
@@ -646,23 +759,43 @@ elif st.session_state.page == "Divisor Planilhas":
     
     file_div = st.file_uploader("Upload da Planilha Grande", type=['xlsx', 'csv'])
     
-    if file_div:
-        df = pd.read_excel(file_div) if file_div.name.endswith('.xlsx') else pd.read_csv(file_div)
+    # CSVs grandes podem ser divididos em streaming, sem carregar o arquivo inteiro
+    modo_streaming = bool(file_div) and file_div.name.lower().endswith('.csv') and st.checkbox(
+        "⚡ Modo streaming (memória constante)",
+        help="Lê o CSV em blocos e grava cada parte direto no ZIP. Recomendado para arquivos de vários GB.")
+    
+    if modo_streaming:
+        qtd = st.number_input("Linhas por arquivo:", min_value=1, value=100000)
+        formato_saida, compressao_saida, extensao, _ = seletor_formato_saida("divisor_stream", padrao="csv")
+        if st.button("Dividir Agora"):
+            with st.spinner("Dividindo em streaming..."):
+                zip_temp, num_partes, total_linhas = dividir_csv_em_zip(file_div, int(qtd), formato=formato_saida, compressao=compressao_saida)
+            with zip_temp:
+                st.success(f"Divisão concluída! {total_linhas} linhas em {num_partes} arquivo(s).")
+                st.download_button("⬇️ Baixar Todos (ZIP)", zip_temp.read(), "planilhas_divididas.zip", "application/zip")
+    
+    elif file_div:
+        otimizar, texto_arrow = seletor_otimizacao("divisor")
+        df = cache_planilhas.ler(file_div, otimizar=otimizar, texto_arrow=texto_arrow)
         st.info(f"Arquivo carregado com {len(df)} linhas.")
+        st.caption(" • ".join(filter(None, [resumo_memoria(df), cache_planilhas.resumo()])))
         
         metodo = st.radio("Como deseja dividir?", ["Por quantidade de linhas", "Por valor de uma coluna"])
+        formato_saida, compressao_saida, extensao, _ = seletor_formato_saida("divisor")
+        
+        with st.expander("⚙️ Desempenho"):
+            workers = st.number_input("Processos em paralelo:", min_value=1, max_value=WORKERS_PADRAO, value=WORKERS_PADRAO)
+            constant_memory = st.checkbox("Modo de memória constante do xlsxwriter", help="Usa menos memória por parte, mas grava linha a linha (só para saída XLSX).")
         
         if metodo == "Por quantidade de linhas":
             qtd = st.number_input("Linhas por arquivo:", min_value=1, value=1000)
             if st.button("Dividir Agora"):
                 zip_buffer = io.BytesIO()
+                partes = ((f"parte_{i//qtd + 1}{extensao}", df[i:i+qtd]) for i in range(0, len(df), qtd))
                 with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for i in range(0, len(df), qtd):
-                        chunk = df[i:i+qtd]
-                        # Salva chunk
-                        buf = io.BytesIO()
-                        chunk.to_excel(buf, index=False)
-                        zf.writestr(f"parte_{i//qtd + 1}.xlsx", buf.getvalue())
+                    # As partes são serializadas em paralelo, mas chegam na ordem original
+                    for nome_parte, dados_parte in serializar_partes(partes, int(workers), constant_memory, formato_saida, compressao_saida):
+                        zf.writestr(nome_parte, dados_parte)
                 
                 st.success("Divisão concluída!")
                 st.download_button("⬇️ Baixar Todos (ZIP)", zip_buffer.getvalue(), "planilhas_divididas.zip", "application/zip")
@@ -673,12 +806,10 @@ elif st.session_state.page == "Divisor Planilhas":
             if st.button("Dividir por Coluna"):
                 zip_buffer = io.BytesIO()
                 with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                    grupos = df.groupby(col_escolhida)
-                    for nome, dados in grupos:
-                        nome_limpo = str(nome).replace("/","-")
-                        buf = io.BytesIO()
-                        dados.to_excel(buf, index=False)
-                        zf.writestr(f"{col_escolhida}_{nome_limpo}.xlsx", buf.getvalue())
+                    grupos = df.groupby(col_escolhida, observed=True)
+                    partes = ((f"{col_escolhida}_{str(nome).replace('/','-')}{extensao}", dados) for nome, dados in grupos)
+                    for nome_parte, dados_parte in serializar_partes(partes, int(workers), constant_memory, formato_saida, compressao_saida):
+                        zf.writestr(nome_parte, dados_parte)
                 
                 st.success(f"Divisão concluída! {len(grupos)} arquivos gerados.")
                 st.download_button("⬇️ Baixar Todos (ZIP)", zip_buffer.getvalue(), "planilhas_por_grupo.zip", "application/zip")
@@ -691,62 +822,77 @@ elif st.session_state.page == "PDF Tools":
     st.markdown("Manipule seus documentos sem instalar programas pesados.")
     st.markdown("---")
     
-    tab1, tab2 = st.tabs(["🔗 Unir PDFs", "🖼️ PDF para Imagem (Novo)"])
+    tab1, tab2 = st.tabs(["🔗 Unir PDFs", "🖼️ PDF para Imagem"])
     
     with tab1:
         st.markdown("#### Unir Múltiplos PDFs")
         files = st.file_uploader("Selecione os PDFs (Ctrl+Click)", type=['pdf'], accept_multiple_files=True)
         if files and st.button("Juntar PDFs Agora"):
-            doc_final = fitz.open()
-            for pdf_file in files:
-                with fitz.open(stream=pdf_file.read(), filetype="pdf") as doc:
-                    doc_final.insert_pdf(doc)
-            output = io.BytesIO()
-            doc_final.save(output)
-            st.success("✅ PDFs unidos!")
-            st.download_button("⬇️ Baixar PDF Completo", output.getvalue(), "unido.pdf", "application/pdf")
+            # Cada upload é anexado a partir do disco e o resultado é salvo num arquivo temporário
+            barra = st.progress(0.0, text="Unindo PDFs...")
+            try:
+                with tempfile.TemporaryDirectory(prefix="unir_pdfs_") as pasta:
+                    destino = os.path.join(pasta, "unido.pdf")
+                    paginas = unir_pdfs(files, destino, pasta_temp=pasta,
+                                        ao_progredir=lambda i, total: barra.progress(i / total, text=f"Unindo PDFs... {i}/{total}"))
+                    barra.empty()
+                    st.success(f"✅ PDFs unidos! {paginas} páginas ({os.path.getsize(destino) / 1024**2:.1f} MB).")
+                    with open(destino, "rb") as f:
+                        st.download_button("⬇️ Baixar PDF Completo", f.read(), "unido.pdf", "application/pdf")
+            except Exception as e:
+                barra.empty()
+                st.error(f"❌ Erro ao unir os PDFs: {e}")
 
     with tab2:
-        st.markdown("#### Converter PDF em Imagens (JPG)")
+        st.markdown("#### Converter PDF em Imagens")
         file_pdf_img = st.file_uploader("Upload do PDF", type=['pdf'])
+        col_dpi, col_fmt, col_q, col_w = st.columns(4)
+        with col_dpi: dpi = st.number_input("DPI:", min_value=36, max_value=600, value=150, step=25)
+        with col_fmt: formato_img = st.selectbox("Formato:", list(FORMATOS_IMAGEM))
+        with col_q: qualidade = st.slider("Qualidade:", 10, 100, 85, disabled=formato_img == "PNG")
+        with col_w: workers_img = st.number_input("Processos:", min_value=1, max_value=WORKERS_PADRAO, value=WORKERS_PADRAO, key="workers_img")
         if file_pdf_img and st.button("Converter Páginas"):
-            with fitz.open(stream=file_pdf_img.read(), filetype="pdf") as doc:
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for i, page in enumerate(doc):
-                        pix = page.get_pixmap(dpi=150)
-                        img_data = pix.tobytes("jpg")
-                        zf.writestr(f"pagina_{i+1}.jpg", img_data)
-                
-                st.success(f"Conversão concluída! {len(doc)} páginas processadas.")
-                st.download_button("⬇️ Baixar Imagens (ZIP)", zip_buffer.getvalue(), "paginas_pdf.zip", "application/zip")
+            # As páginas são renderizadas em paralelo e chegam em ordem; imagens já comprimidas vão sem deflate
+            barra = st.progress(0.0, text="Renderizando páginas...")
+            zip_buffer = io.BytesIO(); extensao_img = FORMATOS_IMAGEM[formato_img]; paginas = 0
+            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED) as zf:
+                for i, img_data in rasterizar_pdf(file_pdf_img, int(dpi), formato_img, qualidade, int(workers_img), cache=cache_paginas,
+                                                  ao_progredir=lambda n, total: barra.progress(n / total, text=f"Renderizando páginas... {n}/{total}")):
+                    zf.writestr(f"pagina_{i+1}{extensao_img}", img_data); paginas += 1
+            barra.empty()
+            
+            st.success(f"Conversão concluída! {paginas} páginas processadas.")
+            st.download_button("⬇️ Baixar Imagens (ZIP)", zip_buffer.getvalue(), "paginas_pdf.zip", "application/zip")
+        
+        if cache_paginas is not None:
+            col_cache, col_limpar = st.columns([4, 1])
+            col_cache.caption(cache_paginas.resumo())
+            if col_limpar.button("Limpar cache", key="limpar_cache_paginas"):
+                cache_paginas.limpar(); st.rerun()
 
 # ==============================================================================
 # PÁGINA: CALCULADORA HASH (NOVO)
 # ==============================================================================
 elif st.session_state.page == "Calc Hash":
     st.markdown("## 🔐 Calculadora de Hash")
-    st.markdown("Verifique a integridade dos seus arquivos (MD5, SHA256).")
+    st.markdown("Verifique a integridade dos seus arquivos (MD5, SHA-1, SHA-256, SHA-512, BLAKE2b).")
     st.markdown("---")
     
     file_hash = st.file_uploader("Arraste o arquivo para calcular o Hash")
+    algoritmos = st.multiselect("Algoritmos:", list(ALGORITMOS), default=["MD5", "SHA-256"])
     
-    if file_hash:
-        bytes_data = file_hash.getvalue()
-        
-        col_res1, col_res2 = st.columns(2)
-        
-        md5 = hashlib.md5(bytes_data).hexdigest()
-        sha256 = hashlib.sha256(bytes_data).hexdigest()
-        
-        with col_res1:
-            st.markdown("### MD5")
-            st.code(md5, language="text")
+    if file_hash and algoritmos:
+        # Uma única leitura do upload alimenta todos os algoritmos; reruns reaproveitam o resultado
+        with st.spinner("Calculando hashes..."):
+            resultados = cache_hashes.calcular(file_hash, file_hash.file_id, algoritmos)
         
-        with col_res2:
-            st.markdown("### SHA256")
-            st.code(sha256, language="text")
+        colunas_hash = st.columns(min(len(algoritmos), 2))
+        for i, algoritmo in enumerate(algoritmos):
+            with colunas_hash[i % len(colunas_hash)]:
+                st.markdown(f"### {algoritmo}")
+                st.code(resultados[algoritmo], language="text")
         
+        st.caption(cache_hashes.resumo())
         st.info("Dica: Use hashes para garantir que um arquivo baixado não foi corrompido ou alterado.")
 
 # ==============================================================================
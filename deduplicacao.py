@@ -0,0 +1,151 @@
+import heapq
+import os
+import tempfile
+
+# --- CONFIGURAÇÕES ---
+LIMITE_ITENS_MEMORIA = 2_000_000    # Itens distintos mantidos na memória antes de passar para o disco
+BYTES_POR_PARTICAO = 64 * 1024 ** 2  # Tamanho alvo de cada partição em disco
+PARTICOES_MIN, PARTICOES_MAX = 16, 512
+LINHAS_POR_AVISO = 50_000           # Frequência dos avisos de progresso durante a leitura
+
+
+# --- LEITURA E ESCRITA EM STREAMING ---
+
+class _SaidaLinhas:
+    """Grava itens separados por quebra de linha, sem quebra no final (como '\\n'.join)."""
+    def __init__(self, caminho, encoding):
+        self.arquivo = open(caminho, "w", encoding=encoding)
+        self.total = 0
+
+    def escrever(self, item):
+        if self.total:
+            self.arquivo.write("\n")
+        self.arquivo.write(item)
+        self.total += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.arquivo.close()
+
+def _ler_itens(caminho, encoding, ao_progredir):
+    """Gera os itens não vazios (sem espaços nas pontas), lendo o arquivo linha a linha."""
+    total, lidos = os.path.getsize(caminho), 0
+    with open(caminho, "rb") as f:
+        for n, linha in enumerate(f, 1):
+            lidos += len(linha)
+            item = linha.decode(encoding).strip()
+            if item:
+                yield item
+            if ao_progredir and n % LINHAS_POR_AVISO == 0:
+                ao_progredir("leitura", lidos, total)
+    if ao_progredir:
+        ao_progredir("leitura", total, total)
+
+
+# --- DEDUPLICAÇÃO EM PARTIÇÕES NO DISCO ---
+
+def _deduplicar_particao(caminho):
+    """Agrupa os registros de uma partição: (primeiras ocorrências novas por ordem, duplicados ordenados).
+
+    Cada registro é "posição<TAB>item"; a posição -1 marca itens que já foram gravados antes do disco.
+    """
+    itens = {}  # item -> [posição da primeira ocorrência, contagem]
+    with open(caminho, encoding="utf-8", newline="\n") as f:
+        for registro in f:
+            posicao, item = registro[:-1].split("\t", 1)
+            if item in itens:
+                itens[item][1] += 1
+            else:
+                itens[item] = [int(posicao), 1]
+    novos = sorted((posicao, item) for item, (posicao, _) in itens.items() if posicao >= 0)
+    duplicados = sorted(item for item, (_, contagem) in itens.items() if contagem > 1)
+    return novos, duplicados
+
+def _ler_sequencia(caminho, com_posicao):
+    with open(caminho, encoding="utf-8", newline="\n") as f:
+        for registro in f:
+            if com_posicao:
+                posicao, item = registro[:-1].split("\t", 1)
+                yield int(posicao), item
+            else:
+                yield registro[:-1]
+
+def _deduplicar_no_disco(itens, vistos, duplicados, posicao, n_particoes, pasta, saida_unicos, ao_progredir):
+    """Termina a deduplicação no disco: particiona por hash, agrupa cada partição e intercala os resultados.
+
+    Os itens que já estão na memória (e já foram gravados) entram nas partições com posição -1,
+    então só as primeiras ocorrências posteriores são acrescentadas a `saida_unicos`, na ordem original.
+    Retorna (linhas não vazias lidas, caminhos dos duplicados ordenados de cada partição).
+    """
+    caminhos = [os.path.join(pasta, f"particao_{p}.txt") for p in range(n_particoes)]
+    particoes = [open(c, "w", encoding="utf-8", newline="\n") for c in caminhos]
+    try:
+        for item in vistos:
+            particoes[hash(item) % n_particoes].write(f"-1\t{item}\n" * (2 if item in duplicados else 1))
+        vistos.clear(); duplicados.clear()
+        for item in itens:
+            particoes[hash(item) % n_particoes].write(f"{posicao}\t{item}\n")
+            posicao += 1
+    finally:
+        for f in particoes:
+            f.close()
+
+    novos, repetidos = [], []
+    for p, caminho in enumerate(caminhos):
+        novos_p, repetidos_p = _deduplicar_particao(caminho)
+        os.remove(caminho)
+        novos.append(os.path.join(pasta, f"novos_{p}.txt"))
+        with open(novos[-1], "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"{posicao_item}\t{item}\n" for posicao_item, item in novos_p)
+        repetidos.append(os.path.join(pasta, f"duplicados_{p}.txt"))
+        with open(repetidos[-1], "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"{item}\n" for item in repetidos_p)
+        del novos_p, repetidos_p
+        if ao_progredir:
+            ao_progredir("particoes", p + 1, n_particoes)
+
+    for _, item in heapq.merge(*(_ler_sequencia(c, True) for c in novos)):
+        saida_unicos.escrever(item)
+    return posicao, repetidos
+
+def deduplicar_linhas(origem, destino_unicos, destino_duplicados, limite_itens=LIMITE_ITENS_MEMORIA,
+                      pasta_temp=None, encoding="utf-8", ao_progredir=None):
+    """Separa as linhas de um arquivo de texto em únicas (ordem da 1ª ocorrência) e duplicadas (ordenadas).
+
+    O arquivo é lido linha a linha. Enquanto couberem `limite_itens` itens distintos, tudo é
+    feito com um set na memória; passando disso, o restante é particionado por hash em arquivos
+    temporários e deduplicado partição por partição, com memória limitada.
+    ao_progredir(fase, feito, total) recebe a fase "leitura" (bytes) e depois "particoes".
+    Retorna um dict com linhas, unicos, duplicados e particoes (0 quando tudo coube na memória).
+    """
+    itens = _ler_itens(origem, encoding, ao_progredir)
+    vistos, duplicados, linhas = {}, set(), 0  # vistos: dict para manter a ordem ao ir para o disco
+
+    with _SaidaLinhas(destino_unicos, encoding) as saida_unicos:
+        for item in itens:
+            linhas += 1
+            if item in vistos:
+                duplicados.add(item)
+                continue
+            vistos[item] = None
+            saida_unicos.escrever(item)
+            if len(vistos) >= limite_itens:
+                break
+        else:
+            with _SaidaLinhas(destino_duplicados, encoding) as saida_duplicados:
+                for item in sorted(duplicados):
+                    saida_duplicados.escrever(item)
+                return {"linhas": linhas, "unicos": saida_unicos.total,
+                        "duplicados": saida_duplicados.total, "particoes": 0}
+
+        n_particoes = min(max(os.path.getsize(origem) // BYTES_POR_PARTICAO, PARTICOES_MIN), PARTICOES_MAX)
+        with tempfile.TemporaryDirectory(prefix="dedup_", dir=pasta_temp) as pasta:
+            linhas, repetidos = _deduplicar_no_disco(itens, vistos, duplicados, linhas, n_particoes,
+                                                     pasta, saida_unicos, ao_progredir)
+            with _SaidaLinhas(destino_duplicados, encoding) as saida_duplicados:
+                for item in heapq.merge(*(_ler_sequencia(c, False) for c in repetidos)):
+                    saida_duplicados.escrever(item)
+    return {"linhas": linhas, "unicos": saida_unicos.total,
+            "duplicados": saida_duplicados.total, "particoes": n_particoes}
@@ -0,0 +1,218 @@
+import io
+import os
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import xlsxwriter
+
+from paralelo import mapear_em_ordem, WORKERS_PADRAO
+from planilhas import EscritorEmBlocos, gravar_tabela, formato_por_caminho, extensao_saida, MAX_LINHAS_EXCEL, OPCOES_XLSX
+
+# --- CONFIGURAÇÕES ---
+LINHAS_POR_BLOCO = 50_000           # Linhas lidas do CSV por vez no modo streaming
+LIMITE_SPOOL_ZIP = 32 * 1024 ** 2   # Acima disso o ZIP de saída vai para o disco
+BLOCO_BYTES_CSV = 8 * 1024 ** 2     # Bytes lidos por vez na divisão byte a byte
+LINHAS_POR_AVISO_XLSX = 5_000       # Frequência dos avisos de progresso na divisão de Excel
+
+
+# --- DIVISÃO EM STREAMING (CSV) ---
+
+def dividir_csv_em_zip(arquivo, linhas_por_parte, prefixo="parte", linhas_por_bloco=LINHAS_POR_BLOCO,
+                       formato="csv", compressao=None):
+    """Divide um CSV em partes de N linhas sem carregá-lo inteiro na memória.
+
+    O CSV é lido em blocos e cada bloco é gravado direto numa entrada do ZIP (no formato
+    de saída escolhido), que fica num arquivo temporário. Retorna (arquivo_zip, num_partes,
+    total_linhas); o arquivo já vem posicionado no início e deve ser fechado por quem chamou.
+    """
+    if linhas_por_parte <= 0:
+        raise ValueError("O número de linhas por parte deve ser maior que zero.")
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+
+    # dtype=str mantém os valores exatamente como no original (zeros à esquerda, etc.)
+    leitor = pd.read_csv(arquivo, chunksize=min(linhas_por_parte, linhas_por_bloco),
+                         dtype=str, keep_default_na=False)
+    destino = tempfile.SpooledTemporaryFile(max_size=LIMITE_SPOOL_ZIP)
+    extensao = extensao_saida(formato, compressao)
+    # Saídas já comprimidas não ganham nada com o deflate do ZIP
+    metodo = zipfile.ZIP_DEFLATED if formato in ("csv", "xlsx") and compressao is None else zipfile.ZIP_STORED
+    num_partes, total_linhas = 0, 0
+    entrada = parte = None
+    linhas_na_parte = 0
+
+    try:
+        with zipfile.ZipFile(destino, "w", metodo) as zf:
+            for bloco in leitor:
+                inicio = 0
+                while inicio < len(bloco):
+                    if parte is None:
+                        num_partes += 1
+                        entrada = zf.open(f"{prefixo}_{num_partes}{extensao}", "w", force_zip64=True)
+                        parte = EscritorEmBlocos(entrada, formato, compressao)
+                    n = min(linhas_por_parte - linhas_na_parte, len(bloco) - inicio)
+                    parte.escrever(bloco.iloc[inicio:inicio + n])
+                    inicio += n; linhas_na_parte += n; total_linhas += n
+                    if linhas_na_parte == linhas_por_parte:
+                        parte.fechar(); entrada.close()
+                        entrada = parte = None; linhas_na_parte = 0
+            if parte is not None:
+                parte.fechar(); entrada.close()
+    except Exception:
+        destino.close()
+        raise
+
+    destino.seek(0)
+    return destino, num_partes, total_linhas
+
+
+# --- DIVISÃO BYTE A BYTE (CSV -> CSV) ---
+
+def _fins_de_registro(bloco, dentro_aspas, aspas):
+    """Posições logo após cada quebra de linha fora de aspas, e se o bloco termina dentro de aspas.
+
+    A paridade da contagem de aspas (soma acumulada em uint8, que preserva o bit par/ímpar)
+    diz se cada byte está dentro de um campo entre aspas; tudo vetorizado, sem laço em Python.
+    """
+    dados = np.frombuffer(bloco, dtype=np.uint8)
+    quebras = dados == ord("\n")
+    marcas = dados == ord(aspas)
+    if not dentro_aspas and not marcas.any():
+        return np.flatnonzero(quebras) + 1, False
+    paridade = np.cumsum(marcas, dtype=np.uint8) & 1
+    if dentro_aspas:
+        paridade ^= 1
+    return np.flatnonzero(quebras & (paridade == 0)) + 1, bool(paridade[-1])
+
+def dividir_csv_bruto(arquivo, linhas_por_parte, pasta_destino, prefixo=None, aspas='"',
+                      tamanho_bloco=BLOCO_BYTES_CSV, ao_progredir=None):
+    """Divide um CSV em partes de N registros copiando os bytes originais, sem pandas.
+
+    O cabeçalho (primeiro registro) é repetido no início de cada parte. Os fins de registro
+    são as quebras de linha fora de aspas, então campos com quebras de linha ficam inteiros.
+    Não há inferência de tipos nem nova serialização: a memória é a de um bloco e a
+    velocidade é a do disco. Retorna a lista de caminhos gravados;
+    ao_progredir(bytes_lidos, total_bytes) é chamado a cada bloco.
+    """
+    if linhas_por_parte <= 0:
+        raise ValueError("O número de linhas por parte deve ser maior que zero.")
+    prefixo = prefixo or Path(arquivo).stem
+    total, lidos = os.path.getsize(arquivo), 0
+    cabecalho, partes, saida = bytearray(), [], None
+    restantes, lendo_cabecalho, dentro_aspas = 1, True, False
+
+    def escrever(dados):
+        nonlocal saida
+        if lendo_cabecalho:
+            cabecalho.extend(dados)
+        elif len(dados):
+            if saida is None:  # A parte só é criada quando há dados para ela
+                partes.append(os.path.join(pasta_destino, f"{prefixo}_parte_{len(partes) + 1}.csv"))
+                saida = open(partes[-1], "wb")
+                saida.write(cabecalho)
+            saida.write(dados)
+
+    try:
+        with open(arquivo, "rb") as f:
+            for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+                fins, dentro_aspas = _fins_de_registro(bloco, dentro_aspas, aspas)
+                mv, inicio, usados = memoryview(bloco), 0, 0
+                while len(fins) - usados >= restantes:
+                    usados += restantes
+                    fim = int(fins[usados - 1])  # Fim do registro que completa a parte (ou o cabeçalho)
+                    escrever(mv[inicio:fim]); inicio = fim
+                    if saida is not None:
+                        saida.close(); saida = None
+                    lendo_cabecalho, restantes = False, linhas_por_parte
+                restantes -= len(fins) - usados
+                escrever(mv[inicio:])
+                lidos += len(bloco)
+                if ao_progredir:
+                    ao_progredir(lidos, total)
+    finally:
+        if saida is not None:
+            saida.close()
+    return partes
+
+
+# --- DIVISÃO EM STREAMING (XLSX -> XLSX) ---
+
+def _nome_seguro(texto):
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(texto)).strip() or "aba"
+
+def dividir_xlsx_streaming(arquivo, linhas_por_parte, pasta_destino, prefixo=None, todas_abas=False, ao_progredir=None):
+    """Divide uma planilha .xlsx em partes de N linhas com memória constante.
+
+    As linhas são lidas de um workbook somente leitura (openpyxl) e gravadas direto em
+    workbooks xlsxwriter em constant_memory, então as partes aparecem desde o início.
+    O cabeçalho de cada aba é repetido em todas as partes dela; com todas_abas, cada aba
+    é dividida separadamente ({prefixo}_{aba}_parte_N.xlsx). Retorna os caminhos gravados;
+    ao_progredir(aba, linhas_lidas, total_estimado) recebe o total do cabeçalho da aba (ou None).
+    """
+    if not 0 < linhas_por_parte < MAX_LINHAS_EXCEL:
+        raise ValueError(f"O número de linhas por parte deve estar entre 1 e {MAX_LINHAS_EXCEL - 1}.")
+    prefixo = prefixo or Path(arquivo).stem
+    partes = []
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        abas = wb.worksheets if todas_abas else wb.worksheets[:1]
+        for ws in abas:
+            nome_base = f"{prefixo}_{_nome_seguro(ws.title)}" if todas_abas else prefixo
+            total = ws.max_row - 1 if ws.max_row else None  # Dimensão declarada no arquivo (pode faltar)
+            linhas = ws.iter_rows(values_only=True)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                continue  # Aba vazia
+            saida, linha_saida, lidas, n_parte = None, 0, 0, 0
+            try:
+                for linha in linhas:
+                    if saida is None:
+                        n_parte += 1
+                        partes.append(os.path.join(pasta_destino, f"{nome_base}_parte_{n_parte}.xlsx"))
+                        saida = xlsxwriter.Workbook(partes[-1], OPCOES_XLSX)
+                        folha = saida.add_worksheet(ws.title)
+                        folha.write_row(0, 0, cabecalho); linha_saida = 1
+                    folha.write_row(linha_saida, 0, linha); linha_saida += 1; lidas += 1
+                    if linha_saida > linhas_por_parte:
+                        saida.close(); saida = None
+                    if ao_progredir and lidas % LINHAS_POR_AVISO_XLSX == 0:
+                        ao_progredir(ws.title, lidas, total)
+            finally:
+                if saida is not None:
+                    saida.close()
+            if ao_progredir:
+                ao_progredir(ws.title, lidas, lidas)
+    finally:
+        wb.close()
+    return partes
+
+
+# --- ESCRITA PARALELA DE PARTES ---
+
+def _serializar_parte(nome, df, constant_memory, formato="xlsx", compressao=None):
+    """Serializa uma parte em memória no formato escolhido (executa num processo do pool)."""
+    buf = io.BytesIO()
+    gravar_tabela(df, buf, formato, compressao, constant_memory)
+    return nome, buf.getvalue()
+
+def _gravar_parte(caminho, df, constant_memory, formato=None, compressao=None):
+    """Grava uma parte em disco (sem formato, usa o indicado pela extensão; executa num processo do pool)."""
+    if formato is None:
+        formato, compressao = formato_por_caminho(caminho)
+    gravar_tabela(df, str(caminho), formato, compressao, constant_memory)
+    return caminho
+
+def serializar_partes(partes, workers=WORKERS_PADRAO, constant_memory=False, formato="xlsx", compressao=None):
+    """Serializa partes (nome, df) em paralelo, devolvendo (nome, bytes) na ordem original."""
+    tarefas = ((nome, df, constant_memory, formato, compressao) for nome, df in partes)
+    yield from mapear_em_ordem(_serializar_parte, tarefas, workers)
+
+def gravar_partes(partes, workers=WORKERS_PADRAO, constant_memory=False, formato=None, compressao=None):
+    """Grava partes (caminho, df) em disco em paralelo, devolvendo cada caminho na ordem original."""
+    tarefas = ((caminho, df, constant_memory, formato, compressao) for caminho, df in partes)
+    yield from mapear_em_ordem(_gravar_parte, tarefas, workers)
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from hashes import ALGORITMOS, WORKERS_HASH, listar_arquivos, hash_arquivos
+
+# --- CONFIGURAÇÕES ---
+TAMANHO_AMOSTRA = 64 * 1024  # Bytes lidos do início e do fim de cada candidato antes do hash completo
+ACOES_DUPLICADOS = {"Substituir cópias por hardlink": "hardlink", "Apagar cópias": "apagar", "Mover cópias para outra pasta": "mover"}
+SUFIXO_TEMPORARIO = ".toolbox_tmp"
+
+
+# --- BUSCA EM ETAPAS ---
+
+def hash_amostra(caminho, algoritmo="BLAKE2b", tamanho_amostra=TAMANHO_AMOSTRA):
+    """Hash dos primeiros e últimos `tamanho_amostra` bytes (arquivos com até 2x isso são lidos inteiros)."""
+    h = hashlib.new(ALGORITMOS[algoritmo])
+    with open(caminho, "rb") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        h.update(f.read(tamanho_amostra))
+        if tamanho > tamanho_amostra:
+            f.seek(max(tamanho - tamanho_amostra, tamanho_amostra))
+            h.update(f.read(tamanho_amostra))
+    return h.hexdigest()
+
+def _amostra_ou_erro(caminho, algoritmo):
+    try:
+        return hash_amostra(caminho, algoritmo), None
+    except OSError as e:
+        return None, e.strerror or str(e)
+
+def _agrupar(chaves_e_itens):
+    """Agrupa (chave, item) por chave e devolve [(chave, itens)] só dos grupos com mais de um item."""
+    grupos = defaultdict(list)
+    for chave, item in chaves_e_itens:
+        grupos[chave].append(item)
+    return [(chave, itens) for chave, itens in grupos.items() if len(itens) > 1]
+
+def encontrar_duplicados(raiz, algoritmo="BLAKE2b", workers=WORKERS_HASH, tamanho_minimo=1,
+                         ao_progredir=None, indice=None):
+    """Encontra arquivos com conteúdo idêntico numa pasta, lendo o mínimo possível do disco.
+
+    1) agrupa por tamanho; 2) nos grupos restantes, compara o hash do início e do fim
+    (TAMANHO_AMOSTRA); 3) só os que ainda empatam são lidos inteiros, em paralelo.
+    Arquivos que já são hardlinks do mesmo conteúdo são lidos uma vez só e não contam como espaço recuperável.
+    ao_progredir(etapa, feito, total) recebe as etapas "tamanho", "amostra" e "completo".
+    Retorna {"grupos", "arquivos", "erros"}; cada grupo tem tamanho, digest, arquivos e recuperavel (bytes),
+    do maior espaço recuperável para o menor.
+    """
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de hash não suportado: {algoritmo}")
+    arquivos = listar_arquivos(raiz)
+    erros = []
+
+    # Etapa 1: tamanho (só metadados). Arquivos com o mesmo inode são hardlinks: um representa os outros.
+    candidatos = [grupo for _, grupo in _agrupar((tam, rel) for rel, tam in arquivos if tam >= tamanho_minimo)]
+    vinculos = {}  # representante -> todos os caminhos com o mesmo inode
+    for i, grupo in enumerate(candidatos, 1):
+        por_inode = defaultdict(list)
+        for rel in grupo:
+            try:
+                st = os.stat(os.path.join(raiz, rel))
+            except OSError as e:
+                erros.append((rel, e.strerror or str(e))); continue
+            por_inode[(st.st_dev, st.st_ino)].append(rel)
+        for rels in por_inode.values():
+            vinculos[rels[0]] = rels
+        if ao_progredir:
+            ao_progredir("tamanho", i, len(candidatos))
+    tamanhos = {rel: tam for rel, tam in arquivos if rel in vinculos}
+    representantes = [rel for grupo in candidatos for rel in grupo if rel in vinculos]
+
+    # Etapa 2: hash do início e do fim de cada representante, em paralelo
+    amostras = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        caminhos = [os.path.join(raiz, rel) for rel in representantes]
+        for i, (rel, (digest, erro)) in enumerate(zip(representantes, pool.map(_amostra_ou_erro, caminhos, [algoritmo] * len(caminhos))), 1):
+            if erro: erros.append((rel, erro))
+            else: amostras.append(((tamanhos[rel], digest), rel))
+            if ao_progredir:
+                ao_progredir("amostra", i, len(representantes))
+
+    # Etapa 3: hash completo só de quem ainda empata e não foi lido inteiro na amostra
+    finais, pendentes = [], []
+    for (tamanho, digest), grupo in _agrupar(amostras):
+        if tamanho <= 2 * TAMANHO_AMOSTRA:
+            finais.append((tamanho, digest, grupo))  # A amostra já cobriu o arquivo inteiro
+        else:
+            pendentes.extend((rel, tamanho) for rel in grupo)
+    completos = []
+    progresso = (lambda i, n, *_: ao_progredir("completo", i, n)) if ao_progredir else None
+    for rel, digest, erro in hash_arquivos(raiz, pendentes, algoritmo, workers, progresso, indice):
+        if erro: erros.append((rel, erro))
+        else: completos.append(((tamanhos[rel], digest), rel))
+    finais.extend((tamanho, digest, grupo) for (tamanho, digest), grupo in _agrupar(completos))
+
+    grupos = []
+    for tamanho, digest, representantes_grupo in finais:
+        todos = sorted(rel for rep in representantes_grupo for rel in vinculos[rep])
+        grupos.append({"tamanho": tamanho, "digest": digest, "arquivos": todos,
+                       "recuperavel": tamanho * (len(representantes_grupo) - 1)})
+    grupos.sort(key=lambda g: (-g["recuperavel"], g["arquivos"][0]))
+    return {"grupos": grupos, "arquivos": len(arquivos), "erros": erros}
+
+def resumo_duplicados(resultado):
+    """Texto curto com o total de grupos, cópias e espaço recuperável."""
+    grupos = resultado["grupos"]
+    copias = sum(len(g["arquivos"]) - 1 for g in grupos)
+    recuperavel = sum(g["recuperavel"] for g in grupos)
+    texto = (f"{resultado['arquivos']} arquivo(s) analisado(s): {len(grupos)} grupo(s) de duplicados, "
+             f"{copias} cópia(s), {recuperavel / 1024**2:,.1f} MB recuperáveis.")
+    if resultado["erros"]:
+        texto += f" {len(resultado['erros'])} arquivo(s) não puderam ser lidos."
+    return texto
+
+
+# --- AÇÕES SOBRE OS DUPLICADOS ---
+
+def _destino_livre(caminho):
+    base, ext = os.path.splitext(caminho)
+    n = 1
+    while os.path.exists(caminho):
+        caminho = f"{base} ({n}){ext}"; n += 1
+    return caminho
+
+def aplicar_acao_duplicados(raiz, grupos, acao, destino=None, ao_progredir=None):
+    """Mantém o primeiro arquivo de cada grupo e trata as cópias: "hardlink", "apagar" ou "mover" (para `destino`).
+
+    Antes de mexer numa cópia confere se o tamanho não mudou desde a busca. A troca por hardlink
+    é atômica (link temporário + os.replace). Retorna {"processados", "bytes_liberados", "erros"};
+    cópias que são hardlinks entre si liberam o espaço uma vez só, como no recuperavel da busca.
+    """
+    if acao not in ACOES_DUPLICADOS.values():
+        raise ValueError(f"Ação inválida: {acao}")
+    if acao == "mover" and not destino:
+        raise ValueError("Escolha a pasta para onde as cópias serão movidas.")
+    processados, liberados, erros = 0, 0, []
+    for i, grupo in enumerate(grupos, 1):
+        mantido = os.path.join(raiz, grupo["arquivos"][0])
+        inodes_liberados = set()
+        for rel in grupo["arquivos"][1:]:
+            caminho = os.path.join(raiz, rel)
+            try:
+                if os.path.samefile(mantido, caminho):
+                    continue  # Já é um hardlink do arquivo mantido
+                st = os.stat(caminho)
+                if st.st_size != grupo["tamanho"] or os.path.getsize(mantido) != grupo["tamanho"]:
+                    raise OSError("o arquivo mudou desde a busca")
+                if acao == "hardlink":
+                    temporario = caminho + SUFIXO_TEMPORARIO
+                    os.link(mantido, temporario)
+                    try:
+                        os.replace(temporario, caminho)
+                    except OSError:
+                        os.remove(temporario); raise
+                elif acao == "apagar":
+                    os.remove(caminho)
+                else:
+                    alvo = _destino_livre(os.path.join(destino, rel))
+                    os.makedirs(os.path.dirname(alvo), exist_ok=True)
+                    shutil.move(caminho, alvo)
+                processados += 1
+                if (st.st_dev, st.st_ino) not in inodes_liberados:
+                    inodes_liberados.add((st.st_dev, st.st_ino))
+                    liberados += grupo["tamanho"]
+            except OSError as e:
+                erros.append((rel, e.strerror or str(e)))
+        if ao_progredir:
+            ao_progredir(i, len(grupos))
+    return {"processados": processados, "bytes_liberados": liberados, "erros": erros}
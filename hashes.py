@@ -0,0 +1,381 @@
+import hashlib
+import mmap
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from pastas import pasta_cache_privada
+
+# --- CONFIGURAÇÕES ---
+ALGORITMOS = {"MD5": "md5", "SHA-1": "sha1", "SHA-256": "sha256", "SHA-512": "sha512", "BLAKE2b": "blake2b"}
+BLOCO_LEITURA = 4 * 1024 * 1024
+BLOCOS_EM_ESPERA = 4            # Blocos lidos à frente de cada thread de hash (limita a memória)
+LIMITE_MMAP = 64 * 1024 * 1024  # A partir deste tamanho o arquivo é lido via mmap
+WORKERS_HASH = min(32, (os.cpu_count() or 1) * 4)  # Threads: leitura em disco também libera o GIL
+SUBPASTA_INDICE = "hashes"      # Dentro da pasta de cache privada do usuário (pastas.py)
+NOME_INDICE = "indice.sqlite3"
+LIMITE_INDICE = 2_000_000       # Entradas no índice; acima disso as menos usadas são removidas
+LOTE_INDICE = 500               # Alterações acumuladas antes de cada commit no SQLite
+JANELA_MTIME = 2.0              # Arquivos alterados há menos que isso não entram no índice (mtime pode não mudar)
+
+
+# --- HASH EM STREAMING ---
+
+def _blocos(arquivo, tamanho_bloco):
+    """Lê um caminho, arquivo aberto ou upload em blocos (sem copiar quando há getbuffer)."""
+    if isinstance(arquivo, (str, bytes)) or hasattr(arquivo, "__fspath__"):
+        with open(arquivo, "rb") as f:
+            yield from iter(lambda: f.read(tamanho_bloco), b"")
+        return
+    if hasattr(arquivo, "getbuffer"):
+        with arquivo.getbuffer() as buf:
+            for inicio in range(0, len(buf), tamanho_bloco):
+                yield buf[inicio:inicio + tamanho_bloco]
+        return
+    arquivo.seek(0)
+    yield from iter(lambda: arquivo.read(tamanho_bloco), b"")
+
+def _consumir(h, fila):
+    while (bloco := fila.get()) is not None:
+        h.update(bloco)
+
+def calcular_hashes(arquivo, algoritmos=("MD5", "SHA-256"), tamanho_bloco=BLOCO_LEITURA):
+    """Calcula vários hashes numa única leitura do arquivo, cada algoritmo na sua thread.
+
+    O hashlib libera o GIL para blocos grandes, então os algoritmos rodam de fato em paralelo
+    enquanto o arquivo é lido uma vez só. Retorna {algoritmo: hexdigest}.
+    """
+    invalidos = [a for a in algoritmos if a not in ALGORITMOS]
+    if invalidos:
+        raise ValueError(f"Algoritmo de hash não suportado: {', '.join(invalidos)}")
+    hashes = {a: hashlib.new(ALGORITMOS[a]) for a in algoritmos}
+
+    if len(hashes) <= 1:
+        for bloco in _blocos(arquivo, tamanho_bloco):
+            for h in hashes.values():
+                h.update(bloco)
+        return {a: h.hexdigest() for a, h in hashes.items()}
+
+    filas = [queue.Queue(maxsize=BLOCOS_EM_ESPERA) for _ in hashes]
+    threads = [threading.Thread(target=_consumir, args=(h, fila), daemon=True) for h, fila in zip(hashes.values(), filas)]
+    for t in threads:
+        t.start()
+    try:
+        for bloco in _blocos(arquivo, tamanho_bloco):
+            for fila in filas:
+                fila.put(bloco)
+    finally:
+        for fila in filas:
+            fila.put(None)
+        for t in threads:
+            t.join()
+    return {a: h.hexdigest() for a, h in hashes.items()}
+
+
+# --- CACHE DE HASHES ---
+
+class CacheHashes:
+    """Guarda os hashes já calculados por arquivo, para que reruns não leiam o conteúdo de novo."""
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()  # chave do arquivo -> {algoritmo: hexdigest}
+        self._lock = threading.Lock()
+
+    def calcular(self, arquivo, chave, algoritmos=("MD5", "SHA-256")):
+        """Retorna os hashes pedidos, calculando (numa só leitura) apenas os que ainda não estão em cache."""
+        with self._lock:
+            conhecidos = dict(self._itens.get(chave, {}))
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+        faltando = [a for a in algoritmos if a not in conhecidos]
+        with self._lock:
+            self.hits += len(algoritmos) - len(faltando)
+            self.misses += len(faltando)
+        if faltando:
+            conhecidos.update(calcular_hashes(arquivo, faltando))
+            with self._lock:
+                self._itens.setdefault(chave, {}).update(conhecidos)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+        return {a: conhecidos[a] for a in algoritmos}
+
+    def resumo(self):
+        """Texto curto com as estatísticas, para exibição na interface."""
+        with self._lock:
+            return f"Cache de hashes: {self.hits} reaproveitados • {self.misses} calculados • {len(self._itens)} arquivo(s)"
+
+
+# --- HASH DE PASTAS E MANIFESTOS ---
+
+def listar_arquivos(raiz):
+    """Percorre a pasta com os.scandir e devolve [(caminho_relativo, tamanho)] em ordem estável (separador '/')."""
+    arquivos, pendentes = [], [""]
+    while pendentes:
+        relativo = pendentes.pop()
+        with os.scandir(os.path.join(raiz, relativo)) as entradas:
+            entradas = sorted(entradas, key=lambda e: e.name)
+        subpastas = []
+        for e in entradas:
+            caminho = f"{relativo}/{e.name}" if relativo else e.name
+            if e.is_dir(follow_symlinks=False):
+                subpastas.append(caminho)
+            elif e.is_file():
+                arquivos.append((caminho, e.stat().st_size))
+        pendentes.extend(reversed(subpastas))
+    return arquivos
+
+def hash_arquivo(caminho, algoritmo="SHA-256", tamanho_bloco=BLOCO_LEITURA):
+    """Hash de um arquivo em disco; arquivos grandes são lidos via mmap, sem cópias para o Python."""
+    h = hashlib.new(ALGORITMOS[algoritmo])
+    with open(caminho, "rb") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho < LIMITE_MMAP:
+            for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+                h.update(bloco)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as mv:
+                for inicio in range(0, tamanho, tamanho_bloco):
+                    h.update(mv[inicio:inicio + tamanho_bloco])
+    return h.hexdigest()
+
+def hash_arquivo_indexado(caminho, algoritmo="SHA-256", indice=None):
+    """Como hash_arquivo, mas consulta (e alimenta) o índice persistente antes de ler o arquivo."""
+    if indice is None:
+        return hash_arquivo(caminho, algoritmo)
+    caminho = os.path.abspath(caminho)
+    st = os.stat(caminho)
+    digest = indice.obter(caminho, algoritmo, st)
+    if digest is None:
+        digest = hash_arquivo(caminho, algoritmo)
+        indice.guardar(caminho, algoritmo, st, digest)
+    return digest
+
+def _hash_ou_erro(caminho, algoritmo, indice=None):
+    try:
+        return hash_arquivo_indexado(caminho, algoritmo, indice), None
+    except OSError as e:
+        return None, e.strerror or str(e)
+
+def hash_diretorio(raiz, algoritmo="SHA-256", workers=WORKERS_HASH, ignorar=(), ao_progredir=None, indice=None):
+    """Calcula o hash de todos os arquivos de uma pasta num pool de threads (ver hash_arquivos)."""
+    arquivos = [(rel, tam) for rel, tam in listar_arquivos(raiz) if rel not in ignorar]
+    yield from hash_arquivos(raiz, arquivos, algoritmo, workers, ao_progredir, indice)
+
+def hash_arquivos(raiz, arquivos, algoritmo="SHA-256", workers=WORKERS_HASH, ao_progredir=None, indice=None):
+    """Calcula o hash de uma lista [(caminho_relativo, tamanho)] num pool de threads.
+
+    Gera (caminho_relativo, hexdigest, erro) na ordem da lista; ao_progredir recebe
+    (arquivos_feitos, total_arquivos, bytes_feitos, total_bytes) a cada arquivo concluído.
+    Com um IndiceHashes, arquivos inalterados não são lidos de novo.
+    """
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de hash não suportado: {algoritmo}")
+    total_bytes, feitos_bytes = sum(tam for _, tam in arquivos), 0
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        caminhos = (os.path.join(raiz, rel) for rel, _ in arquivos)
+        resultados = pool.map(_hash_ou_erro, caminhos, repeat(algoritmo), repeat(indice))
+        for i, ((rel, tam), (digest, erro)) in enumerate(zip(arquivos, resultados), 1):
+            feitos_bytes += tam
+            if ao_progredir:
+                ao_progredir(i, len(arquivos), feitos_bytes, total_bytes)
+            yield rel, digest, erro
+    finally:
+        # Se a leitura for interrompida (ex.: cancelamento), os arquivos ainda na fila não são lidos
+        pool.shutdown(wait=True, cancel_futures=True)
+        if indice is not None:
+            indice.salvar()
+
+def _escapar(nome):
+    return nome.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+def _desescapar(nome):
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "r": "\r"}.get(m.group(1), m.group(1)), nome)
+
+def gravar_manifesto(resultados, destino):
+    """Grava um manifesto no formato do sha256sum ('<hash>  <caminho>'); devolve quantas linhas foram gravadas."""
+    linhas = 0
+    with open(destino, "w", encoding="utf-8", newline="\n") as f:
+        for rel, digest in resultados:
+            nome = _escapar(rel)
+            # Como no coreutils, nomes com '\' ou quebra de linha levam uma '\' no início da linha
+            prefixo = "\\" if nome != rel else ""
+            f.write(f"{prefixo}{digest}  {nome}\n")
+            linhas += 1
+    return linhas
+
+def ler_manifesto(caminho):
+    """Lê um manifesto do sha256sum/md5sum/b2sum e devolve [(caminho_relativo, hexdigest)]."""
+    entradas = []
+    with open(caminho, encoding="utf-8") as f:
+        for n, linha in enumerate(f, 1):
+            linha = linha.rstrip("\n").rstrip("\r")
+            if not linha.strip() or linha.startswith("#"):
+                continue
+            escapado = linha.startswith("\\")
+            m = re.fullmatch(r"([0-9a-fA-F]+) [ *](.+)", linha[1:] if escapado else linha)
+            if not m:
+                raise ValueError(f"Linha {n} do manifesto em formato inválido: {linha[:80]}")
+            nome = _desescapar(m.group(2)) if escapado else m.group(2)
+            entradas.append((nome[2:] if nome.startswith("./") else nome, m.group(1).lower()))
+    return entradas
+
+def algoritmo_do_manifesto(entradas, padrao="SHA-256"):
+    """Deduz o algoritmo pelo tamanho dos hashes (SHA-512 e BLAKE2b empatam; nesse caso usa o padrão)."""
+    por_tamanho = {32: "MD5", 40: "SHA-1", 64: "SHA-256"}
+    tamanhos = {len(d) for _, d in entradas}
+    if len(tamanhos) == 1 and next(iter(tamanhos)) in por_tamanho:
+        return por_tamanho[tamanhos.pop()]
+    return padrao if padrao in ("SHA-512", "BLAKE2b") else "SHA-512"
+
+def verificar_manifesto(manifesto, raiz=None, algoritmo=None, workers=WORKERS_HASH, ao_progredir=None, indice=None):
+    """Confere uma pasta contra um manifesto existente.
+
+    O algoritmo é deduzido pelo tamanho dos hashes; o informado só desempata SHA-512 e BLAKE2b. Retorna um dicionário com as contagens e as listas de arquivos divergentes, ausentes,
+    com erro de leitura e novos (presentes na pasta, mas fora do manifesto).
+    """
+    entradas = ler_manifesto(manifesto)
+    raiz = raiz or os.path.dirname(os.path.abspath(manifesto))
+    algoritmo = algoritmo_do_manifesto(entradas, algoritmo or "SHA-256")
+    esperado = dict(entradas)
+    relatorio = {"ok": 0, "divergentes": [], "ausentes": [], "erros": [], "novos": []}
+
+    nome_manifesto = os.path.relpath(os.path.abspath(manifesto), raiz).replace(os.sep, "/")
+    presentes = [(rel, tam) for rel, tam in listar_arquivos(raiz) if rel != nome_manifesto]
+    relatorio["novos"] = [rel for rel, _ in presentes if rel not in esperado]
+    nomes_presentes = {rel for rel, _ in presentes}
+    relatorio["ausentes"] = [rel for rel in esperado if rel not in nomes_presentes]
+
+    # Só os arquivos listados no manifesto são lidos
+    a_conferir = [(rel, tam) for rel, tam in presentes if rel in esperado]
+    for rel, digest, erro in hash_arquivos(raiz, a_conferir, algoritmo, workers, ao_progredir, indice):
+        if erro:
+            relatorio["erros"].append((rel, erro))
+        elif digest != esperado[rel]:
+            relatorio["divergentes"].append(rel)
+        else:
+            relatorio["ok"] += 1
+    return relatorio
+
+def resumo_verificacao(relatorio):
+    """Texto do relatório de verificação, para exibição na interface."""
+    linhas = [f"{relatorio['ok']} arquivo(s) conferem. {len(relatorio['divergentes'])} divergente(s), "
+              f"{len(relatorio['ausentes'])} ausente(s), {len(relatorio['erros'])} com erro, {len(relatorio['novos'])} novo(s)."]
+    for titulo, chave in (("DIVERGENTE", "divergentes"), ("AUSENTE", "ausentes"), ("NOVO", "novos")):
+        linhas += [f"{titulo}: {rel}" for rel in relatorio[chave]]
+    linhas += [f"ERRO: {rel} ({erro})" for rel, erro in relatorio["erros"]]
+    return "\n".join(linhas)
+
+
+# --- ÍNDICE PERSISTENTE DE HASHES ---
+
+class IndiceHashes:
+    """Índice em SQLite de hashes já calculados, chaveado por (caminho, algoritmo).
+
+    Um hash só é reaproveitado se tamanho, inode e mtime do arquivo forem os mesmos de quando ele foi lido.
+    O arquivo padrão fica na pasta de cache privada do usuário.
+    """
+    def __init__(self, caminho=None, limite_itens=LIMITE_INDICE):
+        self.caminho = str(caminho or pasta_cache_privada(SUBPASTA_INDICE) / NOME_INDICE)
+        self.limite_itens = limite_itens
+        self.hits = 0
+        self.misses = 0
+        self._pendentes = []   # (caminho, algoritmo, tamanho, inode, mtime_ns, digest, usado_em)
+        self._usados = []      # (usado_em, caminho, algoritmo)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (caminho TEXT, algoritmo TEXT, tamanho INTEGER, inode INTEGER, "
+                "mtime_ns INTEGER, digest TEXT, usado_em REAL, PRIMARY KEY (caminho, algoritmo))")
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_usado_em ON hashes (usado_em)")
+
+    def obter(self, caminho, algoritmo, st):
+        """Retorna o hash guardado se o arquivo não mudou desde que foi lido, senão None."""
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT tamanho, inode, mtime_ns, digest FROM hashes WHERE caminho = ? AND algoritmo = ?",
+                (caminho, algoritmo)).fetchone()
+            if linha and tuple(linha[:3]) == (st.st_size, st.st_ino, st.st_mtime_ns):
+                self.hits += 1
+                self._usados.append((time.time(), caminho, algoritmo))
+                if len(self._usados) >= LOTE_INDICE:
+                    self._gravar_pendentes()
+                return linha[3]
+            self.misses += 1
+            return None
+
+    def guardar(self, caminho, algoritmo, st, digest):
+        """Registra o hash calculado para o estado (tamanho, inode, mtime) em que o arquivo foi lido."""
+        if time.time() - st.st_mtime < JANELA_MTIME:
+            return  # Alterado agora há pouco: uma nova escrita poderia manter o mesmo mtime
+        with self._lock:
+            self._pendentes.append((caminho, algoritmo, st.st_size, st.st_ino, st.st_mtime_ns, digest, time.time()))
+            if len(self._pendentes) >= LOTE_INDICE:
+                self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        with self._conexao:
+            self._conexao.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)", self._pendentes)
+            self._conexao.executemany("UPDATE hashes SET usado_em = ? WHERE caminho = ? AND algoritmo = ?", self._usados)
+        self._pendentes, self._usados = [], []
+
+    def salvar(self):
+        """Grava as alterações pendentes e remove as entradas menos usadas acima do limite."""
+        with self._lock:
+            self._gravar_pendentes()
+            with self._conexao:
+                excesso = self._conexao.execute("SELECT COUNT(*) FROM hashes").fetchone()[0] - self.limite_itens
+                if excesso > 0:
+                    self._conexao.execute(
+                        "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY usado_em LIMIT ?)", (excesso,))
+
+    def podar(self):
+        """Remove entradas de arquivos que sumiram ou mudaram; retorna quantas foram removidas."""
+        with self._lock:
+            self._gravar_pendentes()
+            linhas = self._conexao.execute("SELECT caminho, algoritmo, tamanho, inode, mtime_ns FROM hashes").fetchall()
+        removidas = []
+        for caminho, algoritmo, tamanho, inode, mtime_ns in linhas:
+            try:
+                st = os.stat(caminho)
+                if (st.st_size, st.st_ino, st.st_mtime_ns) == (tamanho, inode, mtime_ns):
+                    continue
+            except OSError:
+                pass
+            removidas.append((caminho, algoritmo))
+        with self._lock, self._conexao:
+            self._conexao.executemany("DELETE FROM hashes WHERE caminho = ? AND algoritmo = ?", removidas)
+        return len(removidas)
+
+    def limpar(self):
+        """Apaga todo o índice e zera as estatísticas."""
+        with self._lock, self._conexao:
+            self._pendentes, self._usados = [], []
+            self._conexao.execute("DELETE FROM hashes")
+            self.hits = self.misses = 0
+
+    def estatisticas(self):
+        """Retorna acertos/leituras da sessão e o total de entradas no índice."""
+        with self._lock:
+            itens = self._conexao.execute("SELECT COUNT(*) FROM hashes").fetchone()[0] + len(self._pendentes)
+            return {"hits": self.hits, "misses": self.misses, "itens": itens, "limite_itens": self.limite_itens}
+
+    def resumo(self):
+        """Texto curto com as estatísticas, para exibição na interface."""
+        e = self.estatisticas()
+        return f"Índice de hashes: {e['hits']} reaproveitados • {e['misses']} lidos • {e['itens']:,} entrada(s)"
+
+    def fechar(self):
+        self.salvar()
+        self._conexao.close()
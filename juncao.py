@@ -0,0 +1,220 @@
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from planilhas import ler_em_blocos, LINHAS_POR_BLOCO
+
+# --- CONFIGURAÇÕES ---
+PARTICOES_PADRAO = 32
+TIPOS_JUNCAO = {"Interna (inner)": "inner", "Esquerda (left)": "left", "Completa (outer)": "outer"}
+LIMITE_LINHAS_JUNCAO = 5_000_000          # Acima disso a junção em memória é recusada ou vai para o disco
+LIMITE_BYTES_JUNCAO = 2 * 1024 ** 3
+ACOES_EXCESSO = {"Recusar a junção": "recusar", "Usar junção em disco": "disco"}
+
+
+# --- NORMALIZAÇÃO DA CHAVE ---
+
+def normalizar_chave(serie):
+    """Normaliza a coluna chave (texto, sem espaços nas pontas, minúsculo) como na união em memória."""
+    return serie.astype(str).str.strip().str.lower()
+
+def codificar_chaves(chave1, chave2):
+    """Normaliza as duas chaves e as codifica com um dicionário comum: (códigos1, códigos2, valores).
+
+    Os códigos são inteiros na ordem alfabética dos valores, então juntar por eles equivale a
+    juntar pelos textos normalizados (inclusive na ordem do outer), sem tocar nas colunas originais.
+    """
+    normalizada1, normalizada2 = normalizar_chave(chave1), normalizar_chave(chave2)
+    codigos, valores = pd.factorize(pd.concat([normalizada1, normalizada2], ignore_index=True),
+                                    sort=True, use_na_sentinel=False)
+    return codigos[:len(normalizada1)], codigos[len(normalizada1):], valores
+
+
+# --- ESTIMATIVA DE CARDINALIDADE ---
+
+def bytes_por_linha(*dfs):
+    """Soma o tamanho médio de uma linha de cada DataFrame (base para estimar o resultado)."""
+    return sum(df.memory_usage(deep=True).sum() / max(len(df), 1) for df in dfs)
+
+def analisar_chaves(chave1, chave2, how="inner", bytes_linha=0, top=10, valores=None):
+    """Estima o tamanho do resultado da junção a partir das contagens das chaves já normalizadas.
+
+    Usa apenas value_counts (sem junção de teste): cada chave em comum gera
+    contagem1 * contagem2 linhas, o que expõe explosões muitos-para-muitos.
+    Com chaves codificadas (codificar_chaves), `valores` traduz os códigos de volta nas chaves exibidas.
+    """
+    c1, c2 = pd.Series(chave1).value_counts(), pd.Series(chave2).value_counts()
+    comuns = c1.index.intersection(c2.index)
+    n1, n2 = c1.reindex(comuns), c2.reindex(comuns)
+    pares = n1 * n2
+
+    linhas = int(pares.sum())
+    if how in ("left", "outer"): linhas += int(c1.sum() - n1.sum())
+    if how == "outer": linhas += int(c2.sum() - n2.sum())
+
+    explosivas = pares[(n1 > 1) & (n2 > 1)].sort_values(ascending=False).head(top)
+    top_duplicadas = pd.DataFrame({
+        "chave": explosivas.index if valores is None else valores.take(explosivas.index), "linhas_p1": n1[explosivas.index].to_numpy(),
+        "linhas_p2": n2[explosivas.index].to_numpy(), "linhas_geradas": explosivas.to_numpy(),
+    })
+    return {
+        "distintas_p1": len(c1), "distintas_p2": len(c2), "chaves_comuns": len(comuns),
+        "duplicadas_p1": int((c1 > 1).sum()), "duplicadas_p2": int((c2 > 1).sum()),
+        "linhas_estimadas": linhas, "bytes_estimados": int(linhas * bytes_linha),
+        "top_duplicadas": top_duplicadas,
+    }
+
+def excede_limites(analise, limite_linhas=LIMITE_LINHAS_JUNCAO, limite_bytes=LIMITE_BYTES_JUNCAO):
+    """Indica se o resultado estimado passa de algum dos limites configurados."""
+    return analise["linhas_estimadas"] > limite_linhas or analise["bytes_estimados"] > limite_bytes
+
+def resumo_analise(analise):
+    """Texto curto descrevendo a estimativa, para mensagens na interface."""
+    texto = (f"Resultado estimado: {analise['linhas_estimadas']:,} linhas "
+             f"(~{analise['bytes_estimados'] / 1024**2:,.0f} MB). "
+             f"Chaves distintas: {analise['distintas_p1']:,} x {analise['distintas_p2']:,}, "
+             f"{analise['chaves_comuns']:,} em comum.")
+    if len(analise["top_duplicadas"]):
+        piores = ", ".join(f"'{c}' ({n:,})" for c, n in zip(analise["top_duplicadas"]["chave"].head(3), analise["top_duplicadas"]["linhas_geradas"].head(3)))
+        texto += f" Chaves repetidas nos dois lados: {piores}."
+    return texto
+
+
+# --- JUNÇÃO EM MEMÓRIA ---
+
+def _codigos_resultado(codigos1, codigos2, linhas1, linhas2):
+    """Código da chave de cada linha do resultado: o da esquerda, ou o da direita nas linhas sem par.
+
+    Usa atribuição com máscara (e não np.where) para nunca indexar com -1 o lado de uma planilha sem linhas.
+    """
+    com_esquerda = linhas1 >= 0
+    codigos = np.empty(len(linhas1), dtype=codigos1.dtype)
+    codigos[com_esquerda] = codigos1[linhas1[com_esquerda]]
+    codigos[~com_esquerda] = codigos2[linhas2[~com_esquerda]]
+    return codigos
+
+def _indices_juncao(codigos1, codigos2, n_valores, how):
+    """Posições (linhas1, linhas2) de cada linha do resultado, calculadas só com os códigos inteiros.
+
+    Os códigos são densos (0..n_valores-1), então as linhas de cada chave da direita são achadas
+    por contagem (bincount + argsort estável), sem tabela hash. -1 marca o lado sem par.
+    """
+    contagem2 = np.bincount(codigos2, minlength=n_valores)
+    inicio2 = np.concatenate(([0], np.cumsum(contagem2)[:-1]))
+    ordem2 = np.argsort(codigos2, kind="stable")
+
+    pares = contagem2[codigos1]
+    repeticoes = pares if how == "inner" else np.maximum(pares, 1)
+    linhas1 = np.repeat(np.arange(len(codigos1)), repeticoes)
+    deslocamento = np.arange(len(linhas1)) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    com_par = np.repeat(pares > 0, repeticoes)
+    linhas2 = np.full(len(linhas1), -1, dtype=np.int64)
+    linhas2[com_par] = ordem2[(np.repeat(inicio2[codigos1], repeticoes) + deslocamento)[com_par]]
+
+    if how == "outer":
+        # Acrescenta as linhas da direita sem par e ordena pela chave (os códigos seguem a ordem alfabética)
+        sem_par = np.flatnonzero(np.bincount(codigos1, minlength=n_valores)[codigos2] == 0)
+        linhas1 = np.concatenate((linhas1, np.full(len(sem_par), -1, dtype=np.int64)))
+        linhas2 = np.concatenate((linhas2, sem_par))
+        codigos = _codigos_resultado(codigos1, codigos2, linhas1, linhas2)
+        ordem = np.argsort(codigos, kind="stable")
+        linhas1, linhas2 = linhas1[ordem], linhas2[ordem]
+    return linhas1, linhas2
+
+def _tomar_linhas(df, linhas):
+    """Linhas de df nas posições indicadas; -1 vira linha ausente (NaN), como no merge."""
+    df = df.set_axis(pd.RangeIndex(len(df)))
+    resultado = df.take(linhas) if len(linhas) and linhas.min() >= 0 else df.reindex(linhas)
+    return resultado.set_axis(pd.RangeIndex(len(linhas)))
+
+def juntar_por_codigos(df1, df2, chave, codigos1, codigos2, valores, how="inner"):
+    """Junta df1 e df2 pela chave codificada em inteiros (codificar_chaves), sem copiar nem alterar as tabelas.
+
+    Equivale a pd.merge(on=chave) com a chave normalizada: mesmas linhas na mesma ordem,
+    mesma ordem de colunas e sufixos _x/_y nas colunas repetidas.
+    """
+    linhas1, linhas2 = _indices_juncao(codigos1, codigos2, len(valores), how)
+    esquerda = _tomar_linhas(df1.drop(columns=chave), linhas1)
+    direita = _tomar_linhas(df2.drop(columns=chave), linhas2)
+    repetidas = set(esquerda.columns) & set(direita.columns)
+    esquerda = esquerda.rename(columns={c: f"{c}_x" for c in repetidas})
+    direita = direita.rename(columns={c: f"{c}_y" for c in repetidas})
+
+    codigos = codigos1[linhas1] if how != "outer" else _codigos_resultado(codigos1, codigos2, linhas1, linhas2)
+    esquerda.insert(list(df1.columns).index(chave), chave, valores.take(codigos).array)
+    return pd.concat([esquerda, direita], axis=1)
+
+
+# --- JUNÇÃO PARTICIONADA EM DISCO ---
+
+def _particionar(blocos, chave, pasta, prefixo, n_particoes):
+    """Distribui os blocos de uma tabela em N arquivos pelo hash da chave normalizada.
+
+    Cada partição é uma sequência de DataFrames serializados com pickle, acrescentados
+    ao mesmo arquivo. Retorna um DataFrame vazio com as colunas e tipos da tabela (para montar partições vazias).
+    """
+    modelo = None
+    for bloco in blocos:
+        if chave not in bloco.columns:
+            raise ValueError(f"A chave '{chave}' não existe na planilha.")
+        bloco = bloco.assign(**{chave: normalizar_chave(bloco[chave])})
+        if modelo is None:
+            modelo = bloco.iloc[:0]
+        ids = pd.util.hash_pandas_object(bloco[chave], index=False).to_numpy() % n_particoes
+        for p, parte in bloco.groupby(ids, sort=False):
+            with open(os.path.join(pasta, f"{prefixo}_{p}.pkl"), "ab") as f:
+                pickle.dump(parte, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return modelo
+
+def _carregar_particao(pasta, prefixo, p, modelo):
+    """Lê todos os blocos de uma partição como um único DataFrame (vazio com os tipos de `modelo`, se não houver blocos)."""
+    caminho = os.path.join(pasta, f"{prefixo}_{p}.pkl")
+    if not os.path.exists(caminho):
+        return modelo.copy()
+    partes = []
+    with open(caminho, "rb") as f:
+        while True:
+            try: partes.append(pickle.load(f))
+            except EOFError: break
+    return pd.concat(partes, ignore_index=True)
+
+def juntar_fora_da_memoria(fonte1, fonte2, chave, how="inner", colunas1=None, colunas2=None,
+                           nome1=None, nome2=None, n_particoes=PARTICOES_PADRAO,
+                           linhas_por_bloco=LINHAS_POR_BLOCO, pasta_temp=None):
+    """Junta duas planilhas grandes sem mantê-las inteiras na memória (hash join particionado).
+
+    As duas tabelas são lidas em blocos e particionadas em disco pela chave normalizada;
+    depois cada par de partições é unido separadamente. Gera os blocos do resultado,
+    que devem ser gravados por quem chamou (ex.: EscritorEmBlocos).
+    """
+    if how not in ("inner", "left", "outer"):
+        raise ValueError(f"Tipo de junção inválido: {how}")
+    if colunas1 is not None and chave not in colunas1: colunas1 = [chave, *colunas1]
+    if colunas2 is not None and chave not in colunas2: colunas2 = [chave, *colunas2]
+
+    with tempfile.TemporaryDirectory(prefix="juncao_", dir=pasta_temp) as pasta:
+        modelo1 = _particionar(ler_em_blocos(fonte1, nome1, linhas_por_bloco, colunas1, [chave]), chave, pasta, "p1", n_particoes)
+        modelo2 = _particionar(ler_em_blocos(fonte2, nome2, linhas_por_bloco, colunas2, [chave]), chave, pasta, "p2", n_particoes)
+        if modelo1 is None or modelo2 is None:
+            return  # Uma das planilhas está vazia
+
+        for p in range(n_particoes):
+            esquerda = _carregar_particao(pasta, "p1", p, modelo1)
+            if esquerda.empty and how != "outer":
+                continue
+            direita = _carregar_particao(pasta, "p2", p, modelo2)
+            if direita.empty and how == "inner":
+                continue
+            # A esquerda é unida em fatias, para que uma chave muito repetida não exploda a memória
+            how_fatia = "inner" if how == "inner" else "left"
+            for inicio in range(0, len(esquerda), linhas_por_bloco):
+                resultado = pd.merge(esquerda.iloc[inicio:inicio + linhas_por_bloco], direita, on=chave, how=how_fatia)
+                if len(resultado):
+                    yield resultado
+            if how == "outer":
+                sobra = direita[~direita[chave].isin(esquerda[chave])]
+                if len(sobra):
+                    yield pd.merge(esquerda.iloc[0:0], sobra, on=chave, how="right")
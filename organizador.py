@@ -0,0 +1,329 @@
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURAÇÕES ---
+CATEGORIAS = {
+    "Imagens": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp"], "Vídeos": [".mp4", ".mov", ".avi", ".mkv", ".wmv"], "Músicas": [".mp3", ".wav", ".aac", ".flac"],
+    "Documentos": [".pdf", ".docx", ".doc", ".xlsx", ".xls", ".pptx", ".ppt", ".txt", ".csv"], "Compactados": [".zip", ".rar", ".7z", ".tar", ".gz"], "Executáveis": [".exe", ".msi"],
+}
+CATEGORIA_PADRAO = "Outros"
+INDICE_EXTENSOES = {ext: cat for cat, exts in CATEGORIAS.items() for ext in exts}  # Montado uma vez só
+PREFIXO_LOG = ".toolbox_organizador_"  # Logs de desfazer gravados na pasta organizada
+WORKERS_COPIA = 4                      # Cópias simultâneas quando origem e destino estão em discos diferentes
+INTERVALO_POLLING = 5.0                # Segundos entre as varreduras quando não há inotify
+JANELA_LOTE = 1.0                      # Eventos que chegam dentro desta janela são organizados juntos
+ESPERA_MAXIMA_LOTE = 5.0
+
+
+# --- PLANEJAMENTO (DRY RUN) ---
+
+def pasta_alvo(nome, modo):
+    """Nome da subpasta de destino de um arquivo, por categoria ou por extensão."""
+    ext = os.path.splitext(nome)[1].lower()
+    if modo == "categoria":
+        return INDICE_EXTENSOES.get(ext, CATEGORIA_PADRAO)
+    if modo == "extensao":
+        return ext[1:].upper() if ext else CATEGORIA_PADRAO
+    raise ValueError(f"Modo de organização inválido: {modo}")
+
+def _nome_livre(pasta, nome, reservados):
+    """Evita sobrescrever: acrescenta ' (n)' se o nome já existe na pasta ou já foi usado no plano."""
+    base, ext = os.path.splitext(nome)
+    candidato, n = nome, 1
+    while os.path.join(pasta, candidato) in reservados or os.path.exists(os.path.join(pasta, candidato)):
+        candidato = f"{base} ({n}){ext}"; n += 1
+    reservados.add(os.path.join(pasta, candidato))
+    return candidato
+
+def _e_pasta_alvo(nome, modo):
+    """Indica se uma subpasta do destino parece ter sido criada pelo organizador (não é percorrida)."""
+    if nome == CATEGORIA_PADRAO or nome in CATEGORIAS:
+        return True
+    return modo == "extensao" and nome.isupper() and nome.isalnum()
+
+def listar_para_organizar(pasta, modo="categoria", destino=None, recursivo=False):
+    """Lista (com os.scandir) os arquivos a organizar; no modo recursivo, desce nas subpastas.
+
+    As pastas de categoria/extensão já existentes no destino são puladas, para que
+    arquivos organizados não sejam movidos de novo. Retorna {caminho: (tamanho, mtime_ns)}.
+    """
+    destino = os.path.abspath(destino or pasta)
+    arquivos, pendentes = {}, [os.path.abspath(pasta)]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with os.scandir(atual) as entradas:
+                for e in entradas:
+                    if e.is_file(follow_symlinks=False):
+                        if not e.name.startswith(PREFIXO_LOG):
+                            st = e.stat(follow_symlinks=False)
+                            arquivos[e.path] = (st.st_size, st.st_mtime_ns)
+                    elif recursivo and e.is_dir(follow_symlinks=False) and not (atual == destino and _e_pasta_alvo(e.name, modo)):
+                        pendentes.append(e.path)
+        except FileNotFoundError:
+            continue  # Pasta removida durante a varredura
+    return arquivos
+
+def planejar_arquivos(caminhos, modo="categoria", destino=None):
+    """Plano de movimentação [(origem, destino)] para uma lista de arquivos já conhecida."""
+    plano, reservados = [], set()
+    for origem in sorted(caminhos):
+        nome = os.path.basename(origem)
+        pasta_destino = os.path.join(destino or os.path.dirname(origem), pasta_alvo(nome, modo))
+        plano.append((origem, os.path.join(pasta_destino, _nome_livre(pasta_destino, nome, reservados))))
+    return plano
+
+def planejar_organizacao(pasta, modo="categoria", destino=None, recursivo=False):
+    """Monta o plano completo de movimentação sem mexer em nada: [(origem, destino)].
+
+    Os arquivos de `pasta` (e das subpastas, se recursivo) vão para
+    `destino`/<categoria ou extensão>; por padrão o destino é a própria pasta.
+    """
+    destino = os.path.abspath(destino or pasta)
+    return planejar_arquivos(listar_para_organizar(pasta, modo, destino, recursivo), modo, destino)
+
+def resumo_plano(plano, limite=200):
+    """Texto de pré-visualização: contagem por pasta de destino e as primeiras movimentações."""
+    por_pasta = Counter(os.path.basename(os.path.dirname(d)) for _, d in plano)
+    linhas = [f"{len(plano)} arquivo(s) a mover:"]
+    linhas.extend(f"  {pasta}: {n}" for pasta, n in sorted(por_pasta.items()))
+    linhas.append("")
+    linhas.extend(f"{os.path.basename(o)} -> {os.path.relpath(d, os.path.dirname(o))}" for o, d in plano[:limite])
+    if len(plano) > limite:
+        linhas.append(f"... e mais {len(plano) - limite}.")
+    return "\n".join(linhas)
+
+
+# --- EXECUÇÃO E DESFAZER ---
+
+def _copiar_e_remover(origem, destino):
+    shutil.copy2(origem, destino)
+    os.remove(origem)
+
+def _mover_lote(movimentos, workers, registrar, ao_progredir):
+    """Move com os.rename; o que estiver em outro disco (EXDEV) é copiado em paralelo. Retorna (renomeados, copiados, erros)."""
+    renomeados, entre_discos, erros, feitos, total = 0, [], [], 0, len(movimentos)
+    for origem, destino in movimentos:
+        try:
+            os.rename(origem, destino)
+            registrar(origem, destino); renomeados += 1
+        except OSError as e:
+            if e.errno == errno.EXDEV: entre_discos.append((origem, destino)); continue
+            erros.append((origem, e.strerror or str(e)))
+        feitos += 1
+        if ao_progredir: ao_progredir(feitos, total)
+    copiados = 0
+    if entre_discos:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = [(o, d, pool.submit(_copiar_e_remover, o, d)) for o, d in entre_discos]
+            for origem, destino, futuro in futuros:
+                try:
+                    futuro.result(); registrar(origem, destino); copiados += 1
+                except OSError as e:
+                    erros.append((origem, e.strerror or str(e)))
+                feitos += 1
+                if ao_progredir: ao_progredir(feitos, total)
+    return renomeados, copiados, erros
+
+def novo_log(pasta):
+    """Caminho para um novo log de organização na pasta (o nome ordena por data)."""
+    return os.path.join(pasta, f"{PREFIXO_LOG}{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() // 1000 % 1_000_000:06d}.jsonl")
+
+def executar_plano(plano, pasta_log=None, workers=WORKERS_COPIA, ao_progredir=None, caminho_log=None):
+    """Executa um plano de planejar_organizacao e grava um log (JSON Lines) para desfazer.
+
+    As pastas de destino são criadas uma vez só; cada arquivo é registrado no log assim que
+    é movido, então mesmo uma execução interrompida pode ser desfeita. Com `caminho_log`,
+    o registro é acrescentado a um log existente (ex.: todos os lotes do modo contínuo).
+    Retorna {"movidos", "copiados", "erros", "log"}.
+    """
+    if not plano:
+        return {"movidos": 0, "copiados": 0, "erros": [], "log": caminho_log}
+    caminho_log = caminho_log or novo_log(pasta_log or os.path.dirname(plano[0][0]))
+    with open(caminho_log, "a", encoding="utf-8") as log:
+        def registrar(origem, destino):
+            log.write(json.dumps({"origem": origem, "destino": destino}, ensure_ascii=False) + "\n"); log.flush()
+        for pasta in sorted({os.path.dirname(d) for _, d in plano}):
+            if not os.path.isdir(pasta):
+                os.makedirs(pasta)
+                log.write(json.dumps({"pasta_criada": pasta}, ensure_ascii=False) + "\n")
+        movidos, copiados, erros = _mover_lote(plano, workers, registrar, ao_progredir)
+    return {"movidos": movidos + copiados, "copiados": copiados, "erros": erros, "log": caminho_log}
+
+def ultimo_log(pasta):
+    """Caminho do log de organização mais recente da pasta, ou None."""
+    with os.scandir(pasta) as entradas:
+        logs = sorted(e.path for e in entradas if e.is_file() and e.name.startswith(PREFIXO_LOG))
+    return logs[-1] if logs else None
+
+def desfazer_organizacao(caminho_log, workers=WORKERS_COPIA, ao_progredir=None):
+    """Devolve os arquivos de um log às posições originais e remove as pastas criadas que ficaram vazias.
+
+    Arquivos que já não estão no destino ou cuja origem foi ocupada são listados em erros.
+    O log é apagado quando tudo é desfeito. Retorna {"restaurados", "erros"}.
+    """
+    movimentos, pastas = [], []
+    with open(caminho_log, encoding="utf-8") as f:
+        for linha in f:
+            registro = json.loads(linha)
+            if "pasta_criada" in registro: pastas.append(registro["pasta_criada"])
+            else: movimentos.append((registro["destino"], registro["origem"]))
+    movimentos.reverse()
+    pendentes, erros = [], []
+    for atual, original in movimentos:
+        if not os.path.exists(atual): erros.append((atual, "arquivo não encontrado"))
+        elif os.path.exists(original): erros.append((original, "já existe um arquivo com este nome"))
+        else: pendentes.append((atual, original))
+    restaurados, copiados, erros_movendo = _mover_lote(pendentes, workers, lambda o, d: None, ao_progredir)
+    erros.extend(erros_movendo)
+    for pasta in reversed(pastas):
+        try: os.rmdir(pasta)
+        except OSError: pass  # Não está vazia (ou já foi removida)
+    if not erros:
+        os.remove(caminho_log)
+    return {"restaurados": restaurados + copiados, "erros": erros}
+
+
+# --- MODO CONTÍNUO (OBSERVAR A PASTA) ---
+
+class _Inotify:
+    """Acesso mínimo ao inotify do Linux via ctypes: avisa quando arquivos terminam de ser gravados ou chegam."""
+    IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x8, 0x80, 0x100
+    IN_Q_OVERFLOW, IN_ISDIR = 0x4000, 0x40000000
+    MASCARA = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._pastas = {}  # watch descriptor -> pasta
+
+    def adicionar(self, pasta):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(pasta), self.MASCARA)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou: {pasta}")
+        self._pastas[wd] = pasta
+
+    def ler(self, timeout):
+        """Eventos [(pasta, máscara, nome)] que chegarem em até `timeout` segundos."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        eventos, i = [], 0
+        while i < len(dados):
+            wd, mascara, _, tamanho = struct.unpack_from("iIII", dados, i)
+            nome = dados[i + 16:i + 16 + tamanho].rstrip(b"\0")
+            eventos.append((self._pastas.get(wd), mascara, os.fsdecode(nome)))
+            i += 16 + tamanho
+        return eventos
+
+    def fechar(self):
+        os.close(self.fd)
+
+def _subpastas(pasta, modo, destino):
+    """Todas as subpastas a observar no modo recursivo (sem as pastas de categoria do destino)."""
+    pendentes = [pasta]
+    while pendentes:
+        atual = pendentes.pop()
+        yield atual
+        with os.scandir(atual) as entradas:
+            pendentes.extend(e.path for e in entradas if e.is_dir(follow_symlinks=False)
+                             and not (atual == destino and _e_pasta_alvo(e.name, modo)))
+
+def _observar_inotify(pasta, parar, recursivo, modo, destino):
+    inotify = _Inotify()
+    try:
+        pasta = os.path.abspath(pasta)
+        for p in (_subpastas(pasta, modo, destino) if recursivo else [pasta]):  # Uma observação por pasta
+            inotify.adicionar(p)
+        while not parar():
+            eventos = inotify.ler(0.5)
+            if not eventos:
+                continue
+            lote, inicio = set(), time.monotonic()
+            while eventos:
+                for pasta_evento, mascara, nome in eventos:
+                    if pasta_evento is None or not nome:
+                        if mascara & inotify.IN_Q_OVERFLOW:  # Fila do kernel cheia: varre tudo de novo
+                            lote.update(listar_para_organizar(pasta, modo, destino, recursivo))
+                        continue
+                    caminho = os.path.join(pasta_evento, nome)
+                    if mascara & inotify.IN_ISDIR:
+                        if recursivo and mascara & (inotify.IN_CREATE | inotify.IN_MOVED_TO) and not (
+                                pasta_evento == destino and _e_pasta_alvo(nome, modo)):
+                            inotify.adicionar(caminho)  # Pasta nova: observa e pega o que já chegou nela
+                            lote.update(listar_para_organizar(caminho, modo, destino, True))
+                    elif mascara & (inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO) and not nome.startswith(PREFIXO_LOG):
+                        lote.add(caminho)
+                if time.monotonic() - inicio > ESPERA_MAXIMA_LOTE or parar():
+                    break
+                eventos = inotify.ler(JANELA_LOTE)
+            lote = sorted(c for c in lote if os.path.isfile(c))
+            if lote:
+                yield lote
+    finally:
+        inotify.fechar()
+
+def _observar_polling(pasta, parar, recursivo, modo, destino, intervalo):
+    """Compara varreduras sucessivas; um arquivo é entregue quando tamanho e data não mudam entre duas delas."""
+    anterior, entregues = {}, {}
+    while not parar():
+        atual = listar_para_organizar(pasta, modo, destino, recursivo)
+        prontos = sorted(c for c, assinatura in atual.items()
+                         if anterior.get(c) == assinatura and entregues.get(c) != assinatura)
+        entregues = {c: a for c, a in entregues.items() if c in atual}
+        entregues.update((c, atual[c]) for c in prontos)  # Não repete arquivos que não puderam ser movidos
+        anterior = atual
+        if prontos:
+            yield prontos
+        fim = time.monotonic() + intervalo
+        while time.monotonic() < fim and not parar():
+            time.sleep(min(0.5, intervalo))
+
+def observar_pasta(pasta, parar, modo="categoria", destino=None, recursivo=False, intervalo=INTERVALO_POLLING, usar_inotify=True):
+    """Gera lotes de arquivos novos (já completos) que chegam à pasta, até parar() retornar True.
+
+    No Linux usa inotify (só reage a eventos, sem varrer a pasta); se não estiver disponível,
+    varre com os.scandir a cada `intervalo` segundos e entrega apenas a diferença.
+    """
+    destino = os.path.abspath(destino or pasta)
+    if usar_inotify and sys.platform.startswith("linux"):
+        try:
+            yield from _observar_inotify(pasta, parar, recursivo, modo, destino)
+            return
+        except OSError:
+            pass  # Sem inotify (limite de observações, sistema de arquivos de rede...): usa a varredura
+    yield from _observar_polling(pasta, parar, recursivo, modo, destino, intervalo)
+
+def organizar_continuamente(pasta, parar, modo="categoria", destino=None, recursivo=False, ao_organizar=None, **opcoes):
+    """Organiza o que já existe na pasta e depois cada lote de arquivos novos, até parar() retornar True.
+
+    Todos os lotes vão para o mesmo log, então "desfazer" reverte a sessão inteira.
+    ao_organizar(resultado_do_lote, totais) é chamado após cada lote. Retorna os totais.
+    """
+    destino = os.path.abspath(destino or pasta)
+    caminho_log = novo_log(pasta)
+    totais = {"movidos": 0, "copiados": 0, "erros": [], "lotes": 0, "log": caminho_log}
+    def organizar(caminhos):
+        r = executar_plano(planejar_arquivos(caminhos, modo, destino), caminho_log=caminho_log)
+        totais["movidos"] += r["movidos"]; totais["copiados"] += r["copiados"]; totais["erros"].extend(r["erros"]); totais["lotes"] += 1
+        if ao_organizar:
+            ao_organizar(r, totais)
+    organizar(listar_para_organizar(pasta, modo, destino, recursivo))
+    for lote in observar_pasta(pasta, parar, modo, destino, recursivo, **opcoes):
+        organizar(lote)
+    return totais
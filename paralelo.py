@@ -0,0 +1,57 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIGURAÇÕES ---
+WORKERS_PADRAO = os.cpu_count() or 1
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+# --- POOL DE PROCESSOS COMPARTILHADO ---
+
+def obter_pool():
+    """Pool de processos único para todas as ferramentas, limitando o total de processos na máquina."""
+    global _pool
+    with _lock_pool:
+        if _pool is None or getattr(_pool, "_broken", False):
+            _pool = ProcessPoolExecutor(max_workers=WORKERS_PADRAO)
+        return _pool
+
+def encerrar_pool():
+    """Encerra o pool compartilhado, descartando o que ainda está na fila (ex.: ao fechar o programa)."""
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# --- EXECUÇÃO EM PROCESSOS ---
+
+def mapear_em_ordem(func, tarefas, workers=WORKERS_PADRAO):
+    """Executa func(*tarefa) no pool compartilhado e devolve os resultados na ordem das tarefas.
+
+    No máximo `workers` tarefas desta chamada ficam no pool ao mesmo tempo (mesmo que o pool
+    compartilhado tenha mais processos), o que também evita acumular todos os resultados na memória.
+    Se quem consome parar antes do fim (ex.: tarefa cancelada), o que ainda não começou é descartado.
+    """
+    if workers <= 1:
+        for tarefa in tarefas:
+            yield func(*tarefa)
+        return
+
+    pool = obter_pool()
+    pendentes = deque()
+    try:
+        for tarefa in tarefas:
+            pendentes.append(pool.submit(func, *tarefa))
+            if len(pendentes) >= workers:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
@@ -0,0 +1,29 @@
+import os
+import stat
+from pathlib import Path
+
+
+# --- PASTAS DE CACHE DO USUÁRIO ---
+
+def pasta_cache_usuario():
+    """Raiz dos caches em disco do usuário atual: LOCALAPPDATA no Windows, XDG_CACHE_HOME (ou ~/.cache) nos demais."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "toolbox"
+
+def pasta_cache_privada(nome):
+    """Cria (modo 0700) e devolve a subpasta `nome` do cache do usuário.
+
+    Recusa link simbólico ou pasta de outro dono; se a pasta for do usuário mas estiver aberta a outros, fecha as permissões.
+    """
+    pasta = pasta_cache_usuario() / nome
+    pasta.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.name != "nt":
+        info = os.lstat(pasta)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+            raise PermissionError(f"A pasta de cache {pasta} não pertence ao usuário atual.")
+        if info.st_mode & 0o077:
+            os.chmod(pasta, 0o700)
+    return pasta
@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from paralelo import mapear_em_ordem, WORKERS_PADRAO
+from pastas import pasta_cache_privada
+
+# --- CONFIGURAÇÕES ---
+LOTE_PDFS = 20                  # Arquivos anexados antes de descarregar o documento parcial no disco
+BLOCO_COPIA = 1024 * 1024
+PAGINAS_POR_TAREFA = 8          # Páginas renderizadas por tarefa do pool (cada uma abre o documento)
+FORMATOS_IMAGEM = {"JPEG": ".jpg", "PNG": ".png", "WebP": ".webp"}
+SUBPASTA_CACHE_PAGINAS = "paginas"  # Dentro da pasta de cache privada do usuário (pastas.py)
+LIMITE_CACHE_PAGINAS = 1024 ** 3  # 1 GB de imagens em disco
+
+
+# --- UNIÃO EM DISCO ---
+
+def _caminho_pdf(arquivo, pasta, indice):
+    """Devolve um caminho em disco para o PDF, copiando uploads em blocos para a pasta temporária."""
+    if isinstance(arquivo, (str, os.PathLike)):
+        return str(arquivo)
+    caminho = os.path.join(pasta, f"entrada_{indice}.pdf")
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    with open(caminho, "wb") as f:
+        shutil.copyfileobj(arquivo, f, BLOCO_COPIA)
+    return caminho
+
+def _descarregar(doc, parcial):
+    """Grava o documento parcial no disco e o reabre, liberando os objetos já copiados da memória."""
+    if doc.name == parcial:
+        doc.saveIncr()
+    else:
+        doc.save(parcial)
+    doc.close()
+    return fitz.open(parcial)
+
+def unir_pdfs(arquivos, destino, lote=LOTE_PDFS, pasta_temp=None, ao_progredir=None):
+    """Une vários PDFs (caminhos ou uploads) num único arquivo em disco, com memória limitada.
+
+    Cada entrada é lida de um arquivo temporário e anexada ao documento parcial, que é
+    salvo incrementalmente no disco a cada `lote` arquivos. No fim, o resultado é gravado
+    em `destino` com coleta de lixo e compressão dos streams. Retorna o número de páginas.
+    """
+    arquivos = list(arquivos)
+    if not arquivos:
+        raise ValueError("Selecione pelo menos um PDF.")
+
+    with tempfile.TemporaryDirectory(prefix="pdfs_", dir=pasta_temp) as pasta:
+        parcial = os.path.join(pasta, "parcial.pdf")
+        doc = fitz.open()
+        try:
+            for i, arquivo in enumerate(arquivos, 1):
+                caminho = _caminho_pdf(arquivo, pasta, i)
+                with fitz.open(caminho) as origem:
+                    doc.insert_pdf(origem)
+                if not isinstance(arquivo, (str, os.PathLike)):
+                    os.remove(caminho)  # A cópia do upload não é mais necessária
+                if i % lote == 0 and i < len(arquivos) and doc.page_count:
+                    doc = _descarregar(doc, parcial)
+                if ao_progredir:
+                    ao_progredir(i, len(arquivos))
+
+            if not doc.page_count:
+                raise ValueError("Os PDFs enviados não têm páginas.")
+            paginas = doc.page_count
+            doc.save(destino, garbage=3, deflate=True)
+        finally:
+            doc.close()
+    return paginas
+
+
+# --- RASTERIZAÇÃO EM PARALELO ---
+
+def _codificar_pagina(pix, formato, qualidade):
+    """Codifica um pixmap em JPEG, PNG ou WebP."""
+    if formato == "PNG":
+        return pix.tobytes("png")
+    if formato == "JPEG":
+        return pix.tobytes("jpg", jpg_quality=qualidade)
+    buf = io.BytesIO()
+    Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(buf, "WEBP", quality=qualidade)
+    return buf.getvalue()
+
+def _renderizar_paginas(caminho, paginas, dpi, formato, qualidade):
+    """Renderiza uma lista de páginas com um documento aberto só para esta tarefa (executa num processo do pool)."""
+    with fitz.open(caminho) as doc:
+        return [(i, _codificar_pagina(doc[i].get_pixmap(dpi=dpi, alpha=False), formato, qualidade))
+                for i in paginas]
+
+def rasterizar_pdf(arquivo, dpi=150, formato="JPEG", qualidade=85, workers=WORKERS_PADRAO,
+                   paginas_por_tarefa=PAGINAS_POR_TAREFA, pasta_temp=None, ao_progredir=None, cache=None):
+    """Converte as páginas de um PDF (caminho ou upload) em imagens, usando vários processos.
+
+    As páginas são divididas em faixas distribuídas pelo pool; gera (índice_da_página, bytes)
+    na ordem das páginas, sem esperar o documento inteiro ficar pronto. Com um CachePaginas,
+    só as páginas que ainda não estão no cache são renderizadas.
+    """
+    if formato not in FORMATOS_IMAGEM:
+        raise ValueError(f"Formato de imagem não suportado: {formato}")
+    if formato == "PNG":
+        qualidade = 0  # Não afeta o PNG; assim a chave do cache não depende dela
+    with tempfile.TemporaryDirectory(prefix="pdf_img_", dir=pasta_temp) as pasta:
+        caminho = _caminho_pdf(arquivo, pasta, 0)
+        with fitz.open(caminho) as doc:
+            total = doc.page_count
+        documento = hash_arquivo(caminho) if cache is not None else None
+        chave = lambda i: (documento, i, dpi, formato, qualidade)
+
+        faltando = [i for i in range(total) if cache is None or not cache.contem(chave(i))]
+        tarefas = ((caminho, faltando[j:j + paginas_por_tarefa], dpi, formato, qualidade)
+                   for j in range(0, len(faltando), paginas_por_tarefa))
+        renderizadas = (pagina for faixa in mapear_em_ordem(_renderizar_paginas, tarefas, workers) for pagina in faixa)
+        a_renderizar = set(faltando)
+
+        for i in range(total):
+            dados = None if i in a_renderizar else cache.ler(chave(i))
+            if i in a_renderizar:
+                _, dados = next(renderizadas)
+                if cache is not None:
+                    cache.guardar(chave(i), dados)
+            elif dados is None:
+                # A página saiu do cache depois da verificação: renderiza aqui mesmo
+                dados = _renderizar_paginas(caminho, [i], dpi, formato, qualidade)[0][1]
+                cache.guardar(chave(i), dados)
+            yield i, dados
+            if ao_progredir:
+                ao_progredir(i + 1, total)
+
+
+# --- CACHE DE PÁGINAS RENDERIZADAS ---
+
+def hash_arquivo(caminho):
+    """Calcula o hash BLAKE2b de um arquivo em disco, lendo em blocos."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_COPIA), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+class CachePaginas:
+    """Cache LRU em disco de páginas renderizadas, chaveado por (hash do documento, página, dpi, formato, qualidade).
+
+    A ordem de uso é a data de modificação dos arquivos, então o cache sobrevive entre execuções.
+    Sem `pasta`, usa uma pasta só do usuário atual, para que ninguém plante imagens no cache.
+    """
+    def __init__(self, pasta=None, limite_bytes=LIMITE_CACHE_PAGINAS):
+        self.pasta = Path(pasta) if pasta else pasta_cache_privada(SUBPASTA_CACHE_PAGINAS)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()  # nome do arquivo -> tamanho em bytes
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        entradas = sorted((e for e in os.scandir(self.pasta) if e.is_file() and not e.name.endswith(".tmp")),
+                          key=lambda e: e.stat().st_mtime)
+        for e in entradas:
+            self._itens[e.name] = e.stat().st_size
+            self._total_bytes += self._itens[e.name]
+
+    def _nome(self, chave):
+        documento, pagina, dpi, formato, qualidade = chave
+        return f"{documento}_{pagina}_{dpi}_{qualidade}{FORMATOS_IMAGEM[formato]}"
+
+    def contem(self, chave):
+        """Indica se a página está no cache (sem contar como acerto)."""
+        with self._lock:
+            return self._nome(chave) in self._itens
+
+    def ler(self, chave):
+        """Retorna os bytes da página em cache (contando um acerto), ou None se ela não estiver lá."""
+        nome = self._nome(chave)
+        with self._lock:
+            if nome not in self._itens:
+                return None
+            self._itens.move_to_end(nome)
+        try:
+            dados = (self.pasta / nome).read_bytes()
+            os.utime(self.pasta / nome)  # Marca como usada recentemente
+        except FileNotFoundError:
+            with self._lock:  # Removida por outro processo que usa a mesma pasta
+                self._total_bytes -= self._itens.pop(nome, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return dados
+
+    def guardar(self, chave, dados):
+        """Grava a página no cache e remove as menos usadas se o limite for ultrapassado."""
+        if len(dados) > self.limite_bytes:
+            return
+        nome = self._nome(chave)
+        temporario = self.pasta / f"{nome}.{os.getpid()}.{threading.get_ident()}.tmp"
+        temporario.write_bytes(dados)
+        os.replace(temporario, self.pasta / nome)  # Escrita atômica: leitores nunca veem arquivo pela metade
+        with self._lock:
+            self.misses += 1  # Cada página guardada foi renderizada
+            self._total_bytes += len(dados) - self._itens.get(nome, 0)
+            self._itens[nome] = len(dados)
+            self._itens.move_to_end(nome)
+            removidos = []
+            while self._total_bytes > self.limite_bytes and len(self._itens) > 1:
+                nome_removido, tamanho = self._itens.popitem(last=False)
+                self._total_bytes -= tamanho
+                removidos.append(nome_removido)
+        for nome_removido in removidos:
+            try: os.remove(self.pasta / nome_removido)
+            except FileNotFoundError: pass
+
+    def limpar(self):
+        """Apaga todas as páginas do cache e zera as estatísticas."""
+        with self._lock:
+            nomes = list(self._itens)
+            self._itens.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = 0
+        for nome in nomes:
+            try: os.remove(self.pasta / nome)
+            except FileNotFoundError: pass
+
+    def estatisticas(self):
+        """Retorna contadores de acertos/renderizações e ocupação atual do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "itens": len(self._itens),
+                "bytes": self._total_bytes, "limite_bytes": self.limite_bytes,
+            }
+
+    def resumo(self):
+        """Texto curto com as estatísticas, para exibição na interface."""
+        e = self.estatisticas()
+        return (f"Cache de páginas: {e['hits']} acertos • {e['misses']} renderizações • "
+                f"{e['itens']} página(s) • {e['bytes'] / 1024**2:.1f}/{e['limite_bytes'] / 1024**2:.0f} MB")
@@ -0,0 +1,644 @@
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import xlsxwriter
+
+from pastas import pasta_cache_privada
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --- CONFIGURAÇÕES ---
+LIMITE_CACHE_PADRAO = 512 * 1024 ** 2  # 512 MB de DataFrames em memória
+SUBPASTA_CACHE_PARQUET = "parquet"    # Dentro da pasta de cache privada do usuário (pastas.py)
+LIMITE_CACHE_PARQUET = 2 * 1024 ** 3   # 2 GB de cópias Parquet em disco
+BLOCO_HASH = 1024 * 1024
+LINHAS_POR_BLOCO = 50_000
+MAX_LINHAS_EXCEL = 1_048_576
+# Opções de toda planilha gravada pelo xlsxwriter: textos como "=..." ou URLs ficam como texto
+OPCOES_XLSX = {"constant_memory": True, "nan_inf_to_errors": True, "remove_timezone": True,
+               "default_date_format": "yyyy-mm-dd hh:mm:ss", "strings_to_formulas": False, "strings_to_urls": False}
+LINHAS_ESPERA_SCHEMA = 100_000  # Parquet/Feather: linhas guardadas até as colunas só com nulos revelarem seu tipo
+FRACAO_CATEGORIAS = 0.5  # Texto vira category quando os valores distintos são no máximo esta fração das linhas
+
+
+# --- LEITURA DE UPLOADS ---
+
+def hash_conteudo(arquivo):
+    """Calcula o hash BLAKE2b do conteúdo de um upload sem duplicar os bytes em memória."""
+    h = hashlib.blake2b(digest_size=20)
+    if hasattr(arquivo, "getbuffer"):
+        with arquivo.getbuffer() as buf:
+            h.update(buf)
+        return h.hexdigest()
+
+    posicao = arquivo.tell()
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(BLOCO_HASH), b""):
+        h.update(bloco)
+    arquivo.seek(posicao)
+    return h.hexdigest()
+
+def eh_excel(nome):
+    """Indica se o nome do arquivo corresponde a uma planilha Excel."""
+    return str(nome).lower().endswith(('.xlsx', '.xls'))
+
+def ler_planilha(arquivo, nome=None, colunas_texto=(), **opcoes):
+    """Lê um upload (ou caminho) como DataFrame, escolhendo o leitor pela extensão.
+
+    As colunas em `colunas_texto` (ex.: a chave de junção) são lidas como texto, sem inferência de tipo.
+    """
+    nome = nome or getattr(arquivo, "name", str(arquivo))
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    if opcoes.get("usecols") is not None and not callable(opcoes["usecols"]):
+        # O pandas não aceita listas que misturam nomes texto e numéricos (comum no Excel)
+        opcoes["usecols"] = frozenset(opcoes["usecols"]).__contains__
+    if colunas_texto:
+        opcoes["dtype"] = {**(opcoes.get("dtype") or {}), **dict.fromkeys(colunas_texto, str)}
+    if eh_excel(nome):
+        return pd.read_excel(arquivo, **opcoes)
+    return pd.read_csv(arquivo, **opcoes)
+
+def ler_cabecalho(arquivo, nome=None):
+    """Lê só o cabeçalho (zero linhas) e devolve a lista de colunas da planilha."""
+    return list(ler_planilha(arquivo, nome, nrows=0).columns)
+
+def ler_colunas(arquivo, colunas, otimizar=False, cache=None, chave=None):
+    """Leitura projetada de um caminho: só as colunas indicadas (função de módulo, pode rodar em outro processo).
+
+    Com `cache` (CacheParquet), planilhas Excel são lidas da cópia Parquet. A coluna `chave` é lida como
+    texto (como em ler_em_blocos) e nunca tem o tipo reduzido.
+    """
+    texto = [chave] if chave is not None else ()
+    leitor = cache.ler if cache else ler_planilha
+    df = leitor(arquivo, usecols=list(colunas), colunas_texto=texto)
+    return otimizar_tipos(df, preservar=texto) if otimizar else df
+
+def projecao(chave, colunas):
+    """Monta o usecols de uma leitura projetada: a chave mais as colunas escolhidas (None = todas)."""
+    if not colunas:
+        return None
+    return [chave, *[c for c in colunas if c != chave]]
+
+def _texto_celula(valor):
+    """Valor de célula do Excel como texto, igual ao pd.read_excel com dtype=str (vazio continua NaN)."""
+    if pd.isna(valor):
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))  # O pandas lê 4.0 do Excel como o inteiro 4
+    return str(valor)
+
+def _colunas_como_texto(df, colunas_texto):
+    """Converte para texto as colunas indicadas de um DataFrame lido do Excel com tipos inferidos."""
+    texto = set(colunas_texto)
+    posicoes = [i for i, c in enumerate(df.columns) if c in texto]
+    if not posicoes:
+        return df
+    df = df.copy(deep=False)
+    for i in posicoes:
+        df.isetitem(i, df.iloc[:, i].map(_texto_celula))
+    return df
+
+def ler_em_blocos(arquivo, nome=None, linhas_por_bloco=LINHAS_POR_BLOCO, usecols=None, colunas_texto=()):
+    """Lê uma planilha em blocos de DataFrame, sem carregá-la inteira na memória.
+
+    CSVs usam o chunksize do pandas; arquivos .xlsx são percorridos linha a linha
+    com o openpyxl em modo somente leitura (apenas a primeira aba). As colunas em `colunas_texto`
+    são lidas como texto, para que o tipo não mude de um bloco para outro.
+    """
+    nome = str(nome or getattr(arquivo, "name", str(arquivo)))
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    filtro = frozenset(usecols).__contains__ if usecols is not None else None
+    tipos = dict.fromkeys(colunas_texto, str) or None
+    if not eh_excel(nome):
+        yield from pd.read_csv(arquivo, chunksize=linhas_por_bloco, usecols=filtro, dtype=tipos)
+        return
+    if nome.lower().endswith('.xls'):
+        # O formato antigo não tem leitura em streaming; lê de uma vez e fatia
+        df = pd.read_excel(arquivo, usecols=filtro, dtype=tipos)
+        for i in range(0, len(df), linhas_por_bloco):
+            yield df.iloc[i:i + linhas_por_bloco]
+        return
+
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        # Nomes mantêm o tipo da célula (ex.: 2023 numérico), como no pd.read_excel
+        cabecalho = [c if c is not None else f"Unnamed: {i}" for i, c in enumerate(cabecalho)]
+        indices = [i for i, c in enumerate(cabecalho) if filtro is None or filtro(c)]
+        colunas = [cabecalho[i] for i in indices]
+        largura = len(cabecalho)
+
+        bloco = []
+        for linha in linhas:
+            if len(linha) < largura:
+                linha = tuple(linha) + (None,) * (largura - len(linha))
+            bloco.append([linha[i] for i in indices])
+            if len(bloco) >= linhas_por_bloco:
+                yield _colunas_como_texto(pd.DataFrame(bloco, columns=colunas), colunas_texto)
+                bloco = []
+        if bloco:
+            yield _colunas_como_texto(pd.DataFrame(bloco, columns=colunas), colunas_texto)
+    finally:
+        wb.close()
+
+
+# --- OTIMIZAÇÃO DE TIPOS ---
+
+def _so_texto(serie):
+    return pd.api.types.infer_dtype(serie, skipna=True) in ("string", "empty")
+
+def otimizar_tipos(df, fracao_categorias=FRACAO_CATEGORIAS, texto_arrow=False, preservar=()):
+    """Devolve o DataFrame com tipos menores.
+
+    Textos repetitivos viram category, inteiros vão para o menor tipo que comporta os valores e
+    floats para float32 quando a conversão é exata. Com texto_arrow (e pyarrow instalado), os
+    demais textos usam string[pyarrow]. O uso de memória antes e depois fica em df.attrs["memoria"].
+    As colunas em `preservar` (ex.: a chave de junção) ficam como estão: um float32 muda o texto
+    do número (16777216.0 vira '1.6777216e+07'), e é pelo texto que as chaves são comparadas.
+    """
+    antes = int(df.memory_usage(deep=True).sum())
+    preservar = set(preservar)
+    colunas = {}
+    for i, nome in enumerate(df.columns):
+        if nome in preservar:
+            continue
+        serie = df.iloc[:, i]
+        if pd.api.types.is_string_dtype(serie.dtype) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            if not _so_texto(serie):
+                continue  # Colunas mistas (ex.: números e textos do Excel) ficam como estão
+            if len(serie) and serie.nunique() <= fracao_categorias * len(serie):
+                colunas[i] = serie.astype("category")
+            elif texto_arrow and pa is not None and getattr(serie.dtype, "storage", None) != "pyarrow":
+                colunas[i] = serie.astype(pd.StringDtype("pyarrow"))
+        elif pd.api.types.is_integer_dtype(serie.dtype) and isinstance(serie.dtype, np.dtype):
+            colunas[i] = pd.to_numeric(serie, downcast="integer")
+        elif serie.dtype == np.float64:
+            reduzida = serie.astype(np.float32)
+            if np.array_equal(reduzida.to_numpy(np.float64), serie.to_numpy(), equal_nan=True):
+                colunas[i] = reduzida
+    if colunas:
+        df = df.copy(deep=False)
+        for i, serie in colunas.items():
+            df.isetitem(i, serie)
+    df.attrs["memoria"] = (antes, int(df.memory_usage(deep=True).sum()))
+    return df
+
+def resumo_memoria(df):
+    """Texto com a memória do DataFrame antes e depois de otimizar_tipos ("" se ele não foi otimizado)."""
+    if "memoria" not in df.attrs:
+        return ""
+    antes, depois = df.attrs["memoria"]
+    return f"Memória: {antes / 1024**2:,.1f} MB → {depois / 1024**2:,.1f} MB ({(depois - antes) / max(antes, 1):+.0%})"
+
+
+# --- FORMATOS DE SAÍDA ---
+
+# formato -> rótulo, extensão, compressões aceitas (a primeira é a padrão) e tipo MIME
+FORMATOS_SAIDA = {
+    "xlsx": {"rotulo": "Excel (.xlsx)", "extensao": ".xlsx", "compressoes": [None],
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "csv": {"rotulo": "CSV (.csv)", "extensao": ".csv", "compressoes": [None, "gzip", "bz2", "xz"], "mime": "text/csv"},
+    "parquet": {"rotulo": "Parquet (.parquet)", "extensao": ".parquet", "compressoes": ["snappy", "zstd", "gzip", None],
+                "mime": "application/vnd.apache.parquet"},
+    "feather": {"rotulo": "Feather (.feather)", "extensao": ".feather", "compressoes": ["lz4", "zstd", None],
+                "mime": "application/vnd.apache.arrow.file"},
+}
+SUFIXOS_COMPRESSAO_CSV = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+def extensao_saida(formato, compressao=None):
+    """Extensão do arquivo de saída (ex.: '.csv.gz' para CSV com gzip)."""
+    extensao = FORMATOS_SAIDA[formato]["extensao"]
+    if formato == "csv" and compressao:
+        extensao += SUFIXOS_COMPRESSAO_CSV[compressao]
+    return extensao
+
+def formato_por_caminho(caminho):
+    """Deduz (formato, compressão) pela extensão de um caminho de saída."""
+    sufixos = [s.lower() for s in Path(str(caminho)).suffixes]
+    compressao = next((c for c, suf in SUFIXOS_COMPRESSAO_CSV.items() if sufixos and sufixos[-1] == suf), None)
+    if compressao:
+        sufixos = sufixos[:-1]
+    ultimo = sufixos[-1].lstrip('.') if sufixos else "csv"
+    formato = {"xls": "xlsx", "txt": "csv"}.get(ultimo, ultimo)
+    if formato not in FORMATOS_SAIDA:
+        raise ValueError(f"Formato de saída não suportado: .{ultimo}")
+    if compressao is None:
+        compressao = FORMATOS_SAIDA[formato]["compressoes"][0]
+    return formato, compressao
+
+
+# --- ESCRITA EM BLOCOS ---
+
+class EscritorEmBlocos:
+    """Grava blocos de DataFrame sucessivos num único arquivo, com memória constante.
+
+    Formatos: CSV (com compressão opcional), XLSX (xlsxwriter em constant_memory),
+    Parquet (um row group por bloco) e Feather (um record batch por bloco).
+    """
+    def __init__(self, destino, formato=None, compressao=None):
+        self.destino = destino
+        if formato is None:
+            formato, compressao_padrao = formato_por_caminho(destino)
+            compressao = compressao or compressao_padrao
+        if formato not in FORMATOS_SAIDA:
+            raise ValueError(f"Formato de saída não suportado: {formato}")
+        if compressao not in FORMATOS_SAIDA[formato]["compressoes"]:
+            raise ValueError(f"Compressão '{compressao}' não suportada para {formato}.")
+        if formato in ("parquet", "feather") and pa is None:
+            raise ValueError("Instale 'pyarrow' para gravar em Parquet ou Feather.")
+        self.formato, self.compressao = formato, compressao
+        self.linhas = 0
+        self._colunas = None
+        self._texto = self._compactador = None
+        self._wb = self._ws = None
+        self._arrow = self._schema = None
+        self._pendentes = []  # Tabelas Arrow ainda não gravadas, enquanto o schema tem colunas sem tipo
+
+    def escrever(self, df):
+        """Acrescenta as linhas de um bloco ao arquivo de saída."""
+        if self._colunas is None:
+            self._abrir(df)
+        elif list(df.columns) != self._colunas_originais:
+            df = df[self._colunas_originais]  # Mantém a ordem de colunas do primeiro bloco
+        if self.formato == "csv":
+            df.to_csv(self._texto, index=False, header=False)
+        elif self.formato == "xlsx":
+            if self.linhas + len(df) >= MAX_LINHAS_EXCEL:
+                raise ValueError("O resultado passou do limite de linhas do Excel. Salve em CSV ou Parquet.")
+            valores = df.astype(object).where(df.notna(), None)
+            for i, linha in enumerate(valores.itertuples(index=False, name=None), start=self.linhas + 1):
+                self._ws.write_row(i, 0, linha)
+        else:
+            self._escrever_arrow(self._tabela_arrow(df))
+        self.linhas += len(df)
+
+    def _tabela_arrow(self, df):
+        tabela = pa.Table.from_pandas(df.rename(columns=str), preserve_index=False)
+        if self.formato == "feather":
+            # O formato IPC não aceita dicionários diferentes entre blocos: categorias são gravadas como valores
+            campos = [pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f for f in tabela.schema]
+            tabela = tabela.cast(pa.schema(campos, metadata=tabela.schema.metadata))
+        return tabela
+
+    def _escrever_arrow(self, tabela):
+        if self._arrow is not None:
+            self._arrow.write_table(tabela if tabela.schema.equals(self._schema) else tabela.cast(self._schema))
+            return
+        # Uma coluna só com nulos no primeiro bloco (ex.: lado direito sem par numa junção left) não tem tipo;
+        # os blocos esperam até que ela apareça com valores, e o tipo desse bloco vale para o arquivo
+        if self._schema is None:
+            self._schema = tabela.schema
+        else:
+            campos = [novo if pa.types.is_null(atual.type) else atual for atual, novo in zip(self._schema, tabela.schema)]
+            self._schema = pa.schema(campos, metadata=self._schema.metadata)
+        self._pendentes.append(tabela)
+        if (not any(pa.types.is_null(f.type) for f in self._schema)
+                or sum(len(t) for t in self._pendentes) >= LINHAS_ESPERA_SCHEMA):
+            self._abrir_arrow()
+
+    def _abrir_arrow(self):
+        destino = str(self.destino) if isinstance(self.destino, os.PathLike) else self.destino
+        if self.formato == "parquet":
+            self._arrow = pq.ParquetWriter(destino, self._schema, compression=self.compressao or "none")
+        else:
+            opcoes = pa.ipc.IpcWriteOptions(compression=self.compressao)
+            self._arrow = pa.ipc.new_file(destino, self._schema, options=opcoes)
+        pendentes, self._pendentes = self._pendentes, []
+        for tabela in pendentes:
+            self._escrever_arrow(tabela)
+
+    def _abrir(self, df):
+        self._colunas_originais = list(df.columns)
+        self._colunas = [str(c) for c in df.columns]
+        destino = str(self.destino) if isinstance(self.destino, os.PathLike) else self.destino
+        if self.formato == "csv":
+            self._abrir_texto(destino)
+            csv.writer(self._texto).writerow(self._colunas)
+        elif self.formato == "xlsx":
+            self._wb = xlsxwriter.Workbook(destino, OPCOES_XLSX)
+            self._ws = self._wb.add_worksheet()
+            self._ws.write_row(0, 0, self._colunas)
+        # Parquet/Feather: o arquivo é aberto em _abrir_arrow, quando o schema estiver definido (nomes sempre texto)
+
+    def _abrir_texto(self, destino):
+        eh_caminho = isinstance(destino, str)
+        if self.compressao is None:
+            self._texto = (open(destino, "w", encoding="utf-8", newline="") if eh_caminho else
+                           io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True))
+            return
+        # Com um objeto de arquivo, os compactadores não fecham o buffer de quem chamou
+        abrir = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[self.compressao]
+        self._compactador = abrir(destino, "wb")
+        self._texto = io.TextIOWrapper(self._compactador, encoding="utf-8", newline="")
+
+    def fechar(self, colunas=None):
+        """Finaliza o arquivo (gravando só o cabeçalho, se nenhum bloco chegou)."""
+        if self._colunas is None:
+            self.escrever(pd.DataFrame(columns=list(colunas or [])))
+        if self._arrow is None and self._pendentes:
+            self._abrir_arrow()  # Colunas que terminaram só com nulos ficam com o tipo null
+        if self._texto is not None:
+            self._texto.flush()
+            if self._compactador is None and not isinstance(self.destino, (str, os.PathLike)):
+                self._texto.detach()  # Não fecha o buffer de quem chamou
+            else:
+                self._texto.close()
+            self._texto = self._compactador = None
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+        if self._arrow is not None:
+            self._arrow.close()
+            self._arrow = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+def gravar_tabela(df, destino, formato="xlsx", compressao=None, constant_memory=False):
+    """Grava um DataFrame inteiro em um caminho ou buffer, no formato escolhido."""
+    if formato == "xlsx" and not constant_memory:
+        opcoes = {**OPCOES_XLSX, "constant_memory": False}  # O to_excel grava coluna por coluna
+        with pd.ExcelWriter(destino, engine="xlsxwriter", engine_kwargs={"options": opcoes}) as writer:
+            df.to_excel(writer, index=False)
+        return
+    # O to_excel do pandas grava coluna por coluna, o que é incompatível com o modo
+    # constant_memory do xlsxwriter (que exige linhas em ordem); o escritor em blocos grava linha a linha.
+    with EscritorEmBlocos(destino, formato, compressao) as escritor:
+        escritor.escrever(df)
+        escritor.fechar(df.columns)
+
+
+# --- CACHE DE INGESTÃO ---
+
+class CacheIngestao:
+    """Cache LRU de DataFrames já lidos, chaveado pelo hash do conteúdo e pelas opções de leitura."""
+    def __init__(self, limite_bytes=LIMITE_CACHE_PADRAO, parquet=None):
+        self.limite_bytes = limite_bytes
+        self.parquet = parquet  # CacheParquet opcional para as leituras que não estão na memória
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()  # chave -> (df, tamanho em bytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def ler(self, arquivo, nome=None, otimizar=False, texto_arrow=False, preservar=(), **opcoes):
+        """Retorna o DataFrame do upload, lendo o arquivo apenas se ele não estiver em cache.
+
+        Com otimizar, os tipos são reduzidos (otimizar_tipos, exceto nas colunas de `preservar`) antes de
+        guardar, então o cache também ocupa menos. O DataFrame devolvido é uma cópia rasa: atribuir colunas
+        nele não altera o cache.
+        """
+        chave = (hash_conteudo(arquivo), repr(sorted(opcoes.items())), otimizar, texto_arrow, repr(list(preservar)) if otimizar else "")
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return self._itens[chave][0].copy(deep=False)
+            self.misses += 1
+
+        df = self.parquet.ler(arquivo, nome, **opcoes) if self.parquet else ler_planilha(arquivo, nome, **opcoes)
+        if otimizar:
+            df = otimizar_tipos(df, texto_arrow=texto_arrow, preservar=preservar)
+        self._guardar(chave, df)
+        return df.copy(deep=False)
+
+    def _guardar(self, chave, df):
+        tamanho = int(df.memory_usage(deep=True).sum())
+        if tamanho > self.limite_bytes:
+            return  # Maior que o cache inteiro: não vale a pena guardar
+        with self._lock:
+            if chave in self._itens:
+                return
+            self._itens[chave] = (df, tamanho)
+            self._total_bytes += tamanho
+            while self._total_bytes > self.limite_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self._total_bytes -= tamanho_removido
+
+    def colunas(self, arquivo, nome=None):
+        """Lista as colunas do upload lendo apenas o cabeçalho (também fica em cache)."""
+        return list(self.ler(arquivo, nome, nrows=0).columns)
+
+    def limpar(self):
+        """Esvazia o cache e zera as estatísticas."""
+        with self._lock:
+            self._itens.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = 0
+
+    def estatisticas(self):
+        """Retorna contadores de acertos/falhas e ocupação atual do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "itens": len(self._itens),
+                "bytes": self._total_bytes, "limite_bytes": self.limite_bytes,
+            }
+
+    def resumo(self):
+        """Texto curto com as estatísticas, para exibição na interface."""
+        e = self.estatisticas()
+        return (f"Cache de planilhas: {e['hits']} acertos • {e['misses']} leituras • "
+                f"{e['itens']} arquivo(s) • {e['bytes'] / 1024**2:.1f}/{e['limite_bytes'] / 1024**2:.0f} MB")
+
+
+# --- CACHE PARQUET DE PLANILHAS EXCEL ---
+
+# Tipos de nome de coluna que a cópia Parquet sabe guardar: etiqueta -> (tipo, conversão para texto, leitura do texto)
+TIPOS_NOME_COLUNA = {
+    "str": (str, str, str),
+    "int": ((int, np.integer), int, int),
+    "float": ((float, np.floating), float, float),
+    "timestamp": (pd.Timestamp, pd.Timestamp.isoformat, pd.Timestamp),
+    "datetime": (datetime, datetime.isoformat, datetime.fromisoformat),
+}
+
+def _filtro_colunas(usecols):
+    return usecols if callable(usecols) else frozenset(usecols).__contains__
+
+def _codificar_colunas(colunas):
+    """Nomes de colunas em JSON, cada um com a etiqueta do seu tipo (None se algum tipo não for suportado)."""
+    etiquetados = []
+    for nome in colunas:
+        etiqueta = next((e for e, (tipo, _, _) in TIPOS_NOME_COLUNA.items()
+                         if isinstance(nome, tipo) and not isinstance(nome, (bool, np.bool_))), None)
+        if etiqueta is None:
+            return None
+        etiquetados.append([etiqueta, TIPOS_NOME_COLUNA[etiqueta][1](nome)])
+    return json.dumps(etiquetados).encode()
+
+def _decodificar_colunas(texto):
+    return [TIPOS_NOME_COLUNA[etiqueta][2](valor) for etiqueta, valor in json.loads(texto)]
+
+class CacheParquet:
+    """Cópias Parquet de planilhas Excel, para não interpretar o XML de novo a cada leitura.
+
+    A chave é o hash do conteúdo (uploads) ou caminho + tamanho + mtime (arquivos no disco).
+    Como no CachePaginas, a ordem de uso é a data de modificação dos arquivos (LRU em disco) e a
+    pasta padrão é privada do usuário. Os nomes das colunas ficam nos metadados, em JSON.
+    """
+    def __init__(self, pasta=None, limite_bytes=LIMITE_CACHE_PARQUET):
+        if pasta:
+            self.pasta = Path(pasta)
+            self.pasta.mkdir(parents=True, exist_ok=True)
+        else:
+            self.pasta = pasta_cache_privada(SUBPASTA_CACHE_PARQUET)
+        self.limite_bytes = limite_bytes
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()  # nome do arquivo -> tamanho em bytes
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        entradas = sorted((e for e in os.scandir(self.pasta) if e.is_file() and e.name.endswith(".parquet")),
+                          key=lambda e: e.stat().st_mtime)
+        for e in entradas:
+            self._itens[e.name] = e.stat().st_size
+            self._total_bytes += self._itens[e.name]
+
+    def __reduce__(self):
+        # Em outro processo (pool de leitura) o cache é reaberto na mesma pasta
+        return CacheParquet, (str(self.pasta), self.limite_bytes)
+
+    def _nome(self, arquivo):
+        if hasattr(arquivo, "read"):
+            return f"{hash_conteudo(arquivo)}.parquet"
+        st = os.stat(arquivo)
+        origem = f"{os.path.abspath(arquivo)}|{st.st_size}|{st.st_mtime_ns}"
+        return f"{hashlib.blake2b(origem.encode(), digest_size=20).hexdigest()}.parquet"
+
+    def _colunas_em_cache(self, nome):
+        """Colunas originais da cópia Parquet (None se ela não estiver no cache)."""
+        with self._lock:
+            if nome not in self._itens:
+                return None
+            self._itens.move_to_end(nome)
+        try:
+            metadados = pq.read_schema(self.pasta / nome).metadata
+            colunas = _decodificar_colunas(metadados[b"toolbox_colunas"])
+            os.utime(self.pasta / nome)  # Marca como usada recentemente
+        except (FileNotFoundError, pa.ArrowInvalid, TypeError, KeyError, ValueError):
+            with self._lock:  # Removida por outro processo que usa a mesma pasta, ou metadados ilegíveis
+                self._total_bytes -= self._itens.pop(nome, 0)
+            return None
+        return colunas
+
+    def colunas(self, arquivo, nome=None):
+        """Lista as colunas da planilha, pelo esquema da cópia Parquet quando ela existe."""
+        nome = nome or getattr(arquivo, "name", str(arquivo))
+        colunas = self._colunas_em_cache(self._nome(arquivo)) if pq is not None and eh_excel(nome) else None
+        return colunas if colunas is not None else ler_cabecalho(arquivo, nome)
+
+    def ler(self, arquivo, nome=None, usecols=None, nrows=None, colunas_texto=()):
+        """Lê a planilha; se for Excel, passa pela cópia Parquet (criada na primeira leitura completa).
+
+        Do Parquet só saem as colunas pedidas em usecols. Sem pyarrow, ou para CSV, é o mesmo que ler_planilha.
+        As colunas em `colunas_texto` voltam como texto, iguais às de ler_planilha.
+        """
+        nome = nome or getattr(arquivo, "name", str(arquivo))
+        if pq is None or not eh_excel(nome):
+            return ler_planilha(arquivo, nome, colunas_texto, usecols=usecols, nrows=nrows)
+        nome_cache = self._nome(arquivo)
+        colunas = self._colunas_em_cache(nome_cache)
+        if colunas is None:
+            if nrows is not None:
+                return ler_planilha(arquivo, nome, colunas_texto, usecols=usecols, nrows=nrows)  # Leitura parcial não cria a cópia
+            df = ler_planilha(arquivo, nome)
+            self._guardar(nome_cache, df)
+            df = df if usecols is None else df[[c for c in df.columns if _filtro_colunas(usecols)(c)]]
+            return _colunas_como_texto(df, colunas_texto)
+
+        posicoes = [i for i, c in enumerate(colunas) if usecols is None or _filtro_colunas(usecols)(c)]
+        try:
+            if nrows == 0:
+                tabela = pq.read_schema(self.pasta / nome_cache).empty_table().select([f"c{i}" for i in posicoes])
+            else:
+                tabela = pq.read_table(self.pasta / nome_cache, columns=[f"c{i}" for i in posicoes])
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._itens.pop(nome_cache, 0)
+            return self.ler(arquivo, nome, usecols, nrows, colunas_texto)
+        df = tabela.to_pandas()
+        df.columns = [colunas[i] for i in posicoes]
+        with self._lock:
+            self.hits += 1
+        return _colunas_como_texto(df if nrows is None else df.head(nrows), colunas_texto)
+
+    def _guardar(self, nome, df):
+        """Grava a cópia Parquet (se os tipos permitirem) e remove as menos usadas acima do limite."""
+        with self._lock:
+            self.misses += 1
+        colunas = _codificar_colunas(df.columns)
+        if colunas is None:
+            return  # Nome de coluna de tipo sem representação em JSON: a planilha fica sem cópia
+        try:
+            tabela = pa.Table.from_pandas(df.set_axis([f"c{i}" for i in range(df.shape[1])], axis=1), preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return  # Colunas com tipos misturados não cabem em Parquet: a planilha fica sem cópia
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b"toolbox_colunas": colunas})
+        temporario = self.pasta / f"{nome}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(tabela, temporario)
+        tamanho = temporario.stat().st_size
+        if tamanho > self.limite_bytes:
+            os.remove(temporario); return
+        os.replace(temporario, self.pasta / nome)  # Escrita atômica: leitores nunca veem arquivo pela metade
+        with self._lock:
+            self._total_bytes += tamanho - self._itens.get(nome, 0)
+            self._itens[nome] = tamanho
+            self._itens.move_to_end(nome)
+            removidos = []
+            while self._total_bytes > self.limite_bytes and len(self._itens) > 1:
+                nome_removido, tamanho_removido = self._itens.popitem(last=False)
+                self._total_bytes -= tamanho_removido
+                removidos.append(nome_removido)
+        for nome_removido in removidos:
+            try: os.remove(self.pasta / nome_removido)
+            except FileNotFoundError: pass
+
+    def limpar(self):
+        """Apaga todas as cópias Parquet e zera as estatísticas."""
+        with self._lock:
+            nomes = list(self._itens)
+            self._itens.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = 0
+        for nome in nomes:
+            try: os.remove(self.pasta / nome)
+            except FileNotFoundError: pass
+
+    def estatisticas(self):
+        """Retorna contadores de acertos/conversões e ocupação atual do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "itens": len(self._itens),
+                "bytes": self._total_bytes, "limite_bytes": self.limite_bytes,
+            }
+
+    def resumo(self):
+        """Texto curto com as estatísticas, para exibição na interface."""
+        e = self.estatisticas()
+        return (f"Cache Parquet: {e['hits']} acertos • {e['misses']} conversões • "
+                f"{e['itens']} arquivo(s) • {e['bytes'] / 1024**2:.1f}/{e['limite_bytes'] / 1024**2:.0f} MB")
@@ -0,0 +1,118 @@
+import io
+
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+from juncao import codificar_chaves, juntar_fora_da_memoria, juntar_por_codigos, normalizar_chave
+from planilhas import EscritorEmBlocos, FORMATOS_SAIDA, ler_colunas
+
+
+def _csv(df):
+    arquivo = io.BytesIO(df.to_csv(index=False).encode())
+    arquivo.name = "tabela.csv"
+    return arquivo
+
+def _ler(caminho, formato, compressao):
+    if formato == "csv":
+        return pd.read_csv(caminho, compression=compressao)
+    if formato == "xlsx":
+        return pd.read_excel(caminho)
+    if formato == "parquet":
+        return pd.read_parquet(caminho)
+    return feather.read_feather(caminho)
+
+def _juntar_em_disco(df1, df2, destino, formato, how, compressao=None):
+    with EscritorEmBlocos(destino, formato, compressao) as escritor:
+        for bloco in juntar_fora_da_memoria(_csv(df1), _csv(df2), "id", how=how, n_particoes=8, linhas_por_bloco=16):
+            escritor.escrever(bloco)
+        escritor.fechar(["id", "valor", "nome"])
+    return escritor.linhas
+
+
+@pytest.mark.parametrize("formato", list(FORMATOS_SAIDA))
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+def test_juncao_em_disco_em_todos_os_formatos(tmp_path, formato, how):
+    # Poucas chaves à direita: várias partições vazias e blocos em que "nome" só tem nulos
+    esquerda = pd.DataFrame({"id": [f"K{i}" for i in range(200)], "valor": range(200)})
+    direita = pd.DataFrame({"id": ["k3", "k150", "x"], "nome": ["três", "cento e cinquenta", "sem par"]})
+    compressao = FORMATOS_SAIDA[formato]["compressoes"][0]
+    destino = tmp_path / f"saida.{formato}"
+
+    linhas = _juntar_em_disco(esquerda, direita, destino, formato, how, compressao)
+
+    esperado = pd.merge(esquerda.assign(id=esquerda["id"].str.lower()), direita, on="id", how=how)
+    resultado = _ler(destino, formato, compressao)
+    assert linhas == len(esperado) == len(resultado)
+    chave = ["id", "valor"]
+    obtido = resultado.sort_values(chave, ignore_index=True)[["id", "valor", "nome"]]
+    esperado = esperado.sort_values(chave, ignore_index=True)
+    assert obtido["id"].tolist() == esperado["id"].tolist()
+    assert obtido["nome"].fillna("").tolist() == esperado["nome"].fillna("").tolist()
+
+
+@pytest.mark.parametrize("formato", ["parquet", "feather"])
+def test_blocos_categoricos_com_dicionarios_diferentes(tmp_path, formato):
+    destino = tmp_path / f"saida.{formato}"
+    with EscritorEmBlocos(destino, formato) as escritor:
+        escritor.escrever(pd.DataFrame({"setor": pd.Categorical(["RH", "TI"])}))
+        escritor.escrever(pd.DataFrame({"setor": pd.Categorical(["Vendas", "RH"])}))
+    assert _ler(destino, formato, None)["setor"].astype(str).tolist() == ["RH", "TI", "Vendas", "RH"]
+
+
+def test_coluna_so_com_nulos_recebe_o_tipo_do_bloco_seguinte(tmp_path):
+    destino = tmp_path / "saida.parquet"
+    with EscritorEmBlocos(destino, "parquet") as escritor:
+        escritor.escrever(pd.DataFrame({"id": [1, 2], "nome": pd.Series([None, None], dtype=object)}))
+        escritor.escrever(pd.DataFrame({"id": [3], "nome": pd.Series(["c"], dtype=object)}))
+    assert pd.read_parquet(destino)["nome"].tolist()[2] == "c"
+
+
+def test_otimizar_nao_altera_a_chave(tmp_path):
+    # Na primeira planilha a chave cabe exata em float32; na segunda, não (0.1), então só uma seria reduzida
+    caminho1, caminho2 = tmp_path / "p1.csv", tmp_path / "p2.csv"
+    pd.DataFrame({"id": [16777216.0, 1.5], "valor": [1, 2]}).to_csv(caminho1, index=False)
+    pd.DataFrame({"id": [16777216.0, 0.1], "nome": ["a", "b"]}).to_csv(caminho2, index=False)
+    df1 = ler_colunas(str(caminho1), ["id", "valor"], otimizar=True, chave="id")
+    df2 = ler_colunas(str(caminho2), ["id", "nome"], otimizar=True, chave="id")
+    codigos1, codigos2, _ = codificar_chaves(df1["id"], df2["id"])
+    assert codigos1[0] == codigos2[0]
+
+
+@pytest.mark.parametrize("lado_vazio", ["esquerda", "direita"])
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+def test_juncao_em_memoria_com_planilha_sem_linhas(lado_vazio, how):
+    esquerda = pd.DataFrame({"id": ["a", "B"], "valor": [1, 2]})
+    direita = pd.DataFrame({"id": ["b", "c"], "nome": ["bê", "cê"]})
+    if lado_vazio == "esquerda":
+        esquerda = esquerda.iloc[:0]
+    else:
+        direita = direita.iloc[:0]
+    codigos1, codigos2, valores = codificar_chaves(esquerda["id"], direita["id"])
+    resultado = juntar_por_codigos(esquerda, direita, "id", codigos1, codigos2, valores, how)
+    esperado = pd.merge(esquerda.assign(id=normalizar_chave(esquerda["id"])),
+                        direita.assign(id=normalizar_chave(direita["id"])), on="id", how=how)
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False, check_index_type=False)
+
+
+@pytest.mark.parametrize("extensao", [".csv", ".xlsx"])
+def test_chave_com_vazio_une_igual_em_disco_e_em_memoria(tmp_path, extensao):
+    # Um bloco com chave vazia seria lido como float ("4.0") e os demais como inteiro ("4")
+    esquerda = pd.DataFrame({"id": [1, 2, None, 4, 5, 6], "valor": range(6)})
+    direita = pd.DataFrame({"id": [4, 5, 6], "nome": ["d", "e", "f"]})
+    caminho1, caminho2 = tmp_path / f"p1{extensao}", tmp_path / f"p2{extensao}"
+    if extensao == ".csv":
+        caminho1.write_text("id,valor\n1,0\n2,1\n,2\n4,3\n5,4\n6,5\n")
+        caminho2.write_text("id,nome\n4,d\n5,e\n6,f\n")
+    else:
+        esquerda.to_excel(caminho1, index=False)
+        direita.to_excel(caminho2, index=False)
+
+    df1 = ler_colunas(str(caminho1), ["id", "valor"], chave="id")
+    df2 = ler_colunas(str(caminho2), ["id", "nome"], chave="id")
+    codigos1, codigos2, valores = codificar_chaves(df1["id"], df2["id"])
+    em_memoria = juntar_por_codigos(df1, df2, "id", codigos1, codigos2, valores)
+    assert sorted(em_memoria["id"]) == ["4", "5", "6"]
+    for linhas_por_bloco in (3, 100):
+        blocos = list(juntar_fora_da_memoria(str(caminho1), str(caminho2), "id", linhas_por_bloco=linhas_por_bloco))
+        assert sorted(pd.concat(blocos)["id"]) == ["4", "5", "6"]